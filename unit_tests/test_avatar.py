@@ -79,3 +79,100 @@ class TestAvatarCase(unittest.TestCase):
         Test non-zero value of current avatar login time
         """
         self.assertGreater(self.my_avatar.login_time, 0)
+
+
+class TestPresenceCase(unittest.TestCase):
+    """
+    Test case of presence directory of session
+    """
+
+    presence = None
+    events = []
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.presence = vrsent.verse_presence.VersePresence(session=None)
+        cls.presence.add_listener(lambda event, record: cls.events.append((event, record.avatar_id)))
+        cls.presence.avatar_join(10)
+        cls.presence.avatar_join(11)
+        cls.presence.set_username(1001, 'user')
+        cls.presence.set_user(10, 1001)
+        cls.presence.set_info(10, 'hostname', 'localhost')
+        cls.presence.set_info(10, 'hostname', 'localhost')
+        cls.presence.avatar_leave(11)
+        cls.tested = True
+
+    def test_presence_records(self):
+        """
+        Test of records of avatars
+        """
+        self.assertEqual(len(self.presence), 1)
+        self.assertEqual(self.presence[10].username, 'user')
+        self.assertEqual(self.presence[10].hostname, 'localhost')
+        self.assertEqual([record.avatar_id for record in self.presence.user_records(1001)], [10])
+
+    def test_presence_events(self):
+        """
+        Test of events sent to listeners. Unchanged values do not send events.
+        """
+        self.assertEqual(self.events, [
+            (vrsent.verse_presence.PRESENCE_JOIN, 10),
+            (vrsent.verse_presence.PRESENCE_JOIN, 11),
+            (vrsent.verse_presence.PRESENCE_UPDATE, 10),
+            (vrsent.verse_presence.PRESENCE_UPDATE, 10),
+            (vrsent.verse_presence.PRESENCE_LEAVE, 11)])
+
+    def test_session_presence(self):
+        """
+        Test of record of current avatar in presence directory of session
+        """
+        record = vrsent.session.presence[vrsent.session.avatar_id]
+        self.assertGreater(len(record.hostname), 0)
+        self.assertEqual(record.username, vrsent.session.avatars[vrsent.session.avatar_id].username)
+
+
+class TestPresenceBatchCase(unittest.TestCase):
+    """
+    Test case of presence directory collecting events in batches
+    """
+
+    presence = None
+    events = []
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.presence = vrsent.verse_presence.VersePresence(session=None)
+        cls.presence.batch = True
+        cls.presence.add_listener(lambda event, record: cls.events.append((event, record.avatar_id)))
+        cls.presence.avatar_join(20)
+        cls.presence.set_info(20, 'hostname', 'localhost')
+        cls.presence.avatar_join(21)
+        cls.presence.avatar_leave(21)
+        cls.presence.flush()
+        cls.first = list(cls.events)
+        cls.presence.avatar_leave(20)
+        cls.presence.avatar_join(20)
+        cls.presence.flush()
+        cls.tested = True
+
+    def test_presence_join(self):
+        """
+        Test of joined avatar. Update is included in pending join and avatar,
+        which joined and left during one batch, is not reported at all.
+        """
+        self.assertEqual(self.first, [(vrsent.verse_presence.PRESENCE_JOIN, 20)])
+
+    def test_presence_rejoin(self):
+        """
+        Test of avatar, which left and joined again during one batch
+        """
+        self.assertEqual(self.events[len(self.first):], [(vrsent.verse_presence.PRESENCE_UPDATE, 20)])
+        self.assertEqual(len(self.presence.pending), 0)
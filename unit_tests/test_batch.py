@@ -0,0 +1,201 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+"""
+Module for testing class VerseNodeBatch from module vrsent. These tests
+do not require running Verse server.
+"""
+
+import sys
+if sys.version >= '2.7':
+    import unittest
+else:
+    import unittest2 as unittest
+import collections
+from vrsent import verse_session, verse_node
+
+
+class CreatedScheduler(object):
+    """
+    Object with interface of scheduler of create commands
+    """
+
+    def cb_receive_create(self, entity):
+        """
+        Node of these tests does not have any pending tag group or layer
+        """
+        pass
+
+    def forget(self, entity):
+        """
+        Node of these tests does not have any pending tag group or layer
+        """
+        pass
+
+
+class BatchSession(object):
+    """
+    Object with interface of session needed by nodes created in batch
+    """
+
+    create_nodes = verse_session.VerseSession.create_nodes
+
+    def __init__(self):
+        """
+        Constructor of BatchSession
+        """
+        self.state = 'CONNECTED'
+        self.avatar_id = 10
+        self.user_id = 1001
+        self.nodes = {}
+        self.my_node_queues = {}
+        self.lazy_store = None
+        self.outbox = None
+        self.shard = None
+        self.node_registry = None
+        self.create_scheduler = CreatedScheduler()
+        self.sent = []
+        self.last_id = 65535
+        verse_node.VerseNode(session=self, node_id=self.avatar_id, custom_type=0)
+
+    def send_node_create(self, prio, custom_type):
+        """
+        This method simulates sending of node create command
+        """
+        self.sent.append(('node_create', custom_type))
+
+    def send_node_destroy(self, prio, node_id):
+        """
+        This method simulates sending of node destroy command
+        """
+        self.sent.append(('node_destroy', node_id))
+
+    def send_node_link(self, prio, parent_id, node_id):
+        """
+        This method simulates sending of node link command
+        """
+        self.sent.append(('node_link', parent_id, node_id))
+
+    def send_node_subscribe(self, prio, node_id, version, crc32):
+        """
+        This method simulates sending of node subscribe command
+        """
+        self.sent.append(('node_subscribe', node_id))
+
+    def confirm(self, custom_type):
+        """
+        This method simulates receiving of node create command for the
+        oldest pending node with custom_type
+        """
+        self.last_id += 1
+        return verse_node.VerseNode.cb_receive_node_create(
+            self, self.last_id, self.avatar_id, self.user_id, custom_type)
+
+
+class TestNodeBatchCase(unittest.TestCase):
+    """
+    Test case of nodes created in batch with limited count of nodes
+    waiting for confirmation
+    """
+
+    session = None
+    batch = None
+    in_flight = None
+    queue = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.session = BatchSession()
+        cls.batch = cls.session.create_nodes(verse_node.VerseNode, 5, max_in_flight=2, custom_type=70)
+        cls.queue = list(cls.session.my_node_queues[70])
+        cls.in_flight = []
+        while cls.batch.done is False:
+            cls.session.confirm(70)
+            cls.in_flight.append(cls.batch.in_flight)
+        cls.tested = True
+
+    def test_pending_queue(self):
+        """
+        Test of deque of pending nodes. The oldest node is at the right end.
+        """
+        self.assertIsInstance(self.session.my_node_queues[70], collections.deque)
+        self.assertEqual(self.queue, [self.batch.nodes[1], self.batch.nodes[0]])
+        self.assertEqual(len(self.session.my_node_queues[70]), 0)
+
+    def test_max_in_flight(self):
+        """
+        Test of count of nodes waiting for confirmation
+        """
+        self.assertEqual(self.in_flight, [2, 2, 2, 1, 0])
+        self.assertEqual(self.session.sent.count(('node_create', 70)), 5)
+
+    def test_created_nodes(self):
+        """
+        Test of IDs of nodes assigned in order of creating
+        """
+        self.assertEqual(self.batch.wait(0), self.batch.nodes)
+        self.assertEqual([node.id for node in self.batch.nodes], list(range(65536, 65541)))
+
+
+class TestNodeBatchDestroyCase(unittest.TestCase):
+    """
+    Test case of node destroyed before confirmation of its creating
+    """
+
+    session = None
+    batch = None
+    destroyed = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.session = BatchSession()
+        cls.batch = cls.session.create_nodes(verse_node.VerseNode, 3, custom_type=71)
+        cls.destroyed = cls.batch.nodes[2]
+        cls.destroyed.destroy()
+        cls.session.confirm(71)
+        cls.session.confirm(71)
+        cls.done = cls.batch.done
+        # Verse server confirms destroyed node too
+        cls.session.confirm(71)
+        cls.tested = True
+
+    def test_forgotten_node(self):
+        """
+        Test of batch not waiting for destroyed node
+        """
+        self.assertTrue(self.done)
+        self.assertEqual(len(self.batch.wait(0)), 2)
+        self.assertNotIn(self.destroyed, self.batch.nodes)
+        self.assertEqual(self.batch.created, self.batch.count)
+
+    def test_destroy_command(self):
+        """
+        Test of destroy command sent after confirmation of destroyed node
+        """
+        self.assertIn(('node_destroy', self.destroyed.id), self.session.sent)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,242 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+"""
+Module for testing class VerseBridge from module vrsent. These tests do
+not require running Verse server.
+"""
+
+import sys
+if sys.version >= '2.7':
+    import unittest
+else:
+    import unittest2 as unittest
+import collections
+import contextlib
+import types
+from vrsent import verse_session, verse_scheduler, verse_snapshot, verse_bridge, verse_layer
+from test_checkpoint import PublishingSession, node_snapshot
+from test_batch import BatchSession
+
+
+class BridgedSession(BatchSession):
+    """
+    Object with interface of target session of bridge
+    """
+
+    in_callback_thread = verse_session.VerseSession.in_callback_thread
+    call_in_callback = verse_session.VerseSession.call_in_callback
+    send_queued = verse_session.VerseSession.send_queued
+
+    def __init__(self):
+        """
+        Constructor of BridgedSession
+        """
+        super(BridgedSession, self).__init__()
+        self.create_scheduler = verse_scheduler.VerseCreateScheduler(self)
+        self.thread_safe = False
+        self.lock = contextlib.nullcontext()
+        self.send_queue = collections.deque()
+        self._callback_thread = None
+        self.snapshots = None
+        self.suppress_unchanged = False
+        self.uploads = []
+
+    def send_taggroup_create(self, prio, node_id, custom_type):
+        """
+        This method simulates sending of tag group create command
+        """
+        self.sent.append(('taggroup_create', node_id, custom_type))
+
+    def send_layer_create(self, prio, node_id, parent_layer_id, data_type, count, custom_type):
+        """
+        This method simulates sending of layer create command
+        """
+        self.sent.append(('layer_create', node_id, parent_layer_id, custom_type))
+
+    def send_layer_subscribe(self, prio, node_id, layer_id, version, crc32):
+        """
+        This method simulates sending of layer subscribe command
+        """
+        self.sent.append(('layer_subscribe', node_id, layer_id))
+
+
+def layer_snapshot(layer_id, parent_layer_id, items):
+    """
+    This function returns snapshot of layer
+    """
+    return verse_snapshot.VerseLayerSnapshot(
+        layer_id, parent_layer_id, 30 + layer_id, 3, 1, types.MappingProxyType(items))
+
+
+def with_layers(node, layers):
+    """
+    This function returns snapshot of node with other layers
+    """
+    return node._replace(layers=types.MappingProxyType(dict((layer.id, layer) for layer in layers)))
+
+
+class TestBridgeCopyCase(unittest.TestCase):
+    """
+    Test case of copying of selected subtree and sending of changes
+    """
+
+    source = None
+    target = None
+    bridge = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.source = PublishingSession()
+        child = node_snapshot(65537, (2,), {0: (1,), 1: (2,)})._replace(parent_id=65536)
+        cls.source.publish({
+            65536: node_snapshot(65536, (1,), {}),
+            65537: child,
+            65538: node_snapshot(65538, (3,), {})})
+        cls.target = BridgedSession()
+        cls.bridge = verse_bridge.VerseBridge(cls.source, cls.target, roots=[65536])
+        cls.copied = set(cls.bridge.nodes)
+        cls.changes = cls.bridge.changes
+        # Change value of tag and values of items of layer
+        layer = child.layers[0]._replace(items=types.MappingProxyType({0: (10,), 2: (3,)}))
+        tg = child.tag_groups[0]
+        tag = tg.tags[0]._replace(value=(20,))
+        child = child._replace(
+            tag_groups=types.MappingProxyType({0: tg._replace(tags=types.MappingProxyType({0: tag}))}),
+            layers=types.MappingProxyType({0: layer}))
+        cls.source.publish({65537: child})
+        cls.tested = True
+
+    def test_copied_nodes(self):
+        """
+        Test of nodes of selected subtree
+        """
+        self.assertEqual(self.copied, {65536, 65537})
+        self.assertIs(self.bridge.nodes[65537].parent, self.bridge.nodes[65536])
+        self.assertEqual(len(self.target.uploads), 2)
+
+    def test_changed_values(self):
+        """
+        Test of changed value of tag and items of layer
+        """
+        self.assertEqual(self.bridge.tags[(65537, 0, 0)].value, (20,))
+        layer = self.bridge.layers[(65537, 0)]
+        self.assertEqual(layer.items[0], (10,))
+        self.assertEqual(layer.items[2], (3,))
+        self.assertEqual(self.bridge.changes, self.changes + 3)
+        self.assertEqual(self.bridge.ticks, 1)
+
+
+class TestBridgeLayersCase(unittest.TestCase):
+    """
+    Test case of order of creating of parent and child layers
+    """
+
+    source = None
+    target = None
+    bridge = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.source = PublishingSession()
+        node = node_snapshot(65536, (1,), {})
+        # Child layer is before its parent layer and other child layer
+        # does not have parent layer in source node yet
+        node = with_layers(node, [layer_snapshot(2, 1, {}), layer_snapshot(1, None, {}), layer_snapshot(4, 3, {})])
+        cls.source.publish({65536: node})
+        cls.target = BridgedSession()
+        cls.bridge = verse_bridge.VerseBridge(cls.source, cls.target, roots=[65536])
+        cls.waiting = set(cls.bridge.waiting_layers)
+        node = with_layers(node, list(node.layers.values()) + [layer_snapshot(3, None, {})])
+        cls.source.publish({65536: node})
+        cls.tested = True
+
+    def test_parent_layers(self):
+        """
+        Test of parent layers of copied layers
+        """
+        layers = self.bridge.layers
+        self.assertIs(layers[(65536, 2)].parent_layer, layers[(65536, 1)])
+        self.assertIs(layers[(65536, 4)].parent_layer, layers[(65536, 3)])
+
+    def test_waiting_layer(self):
+        """
+        Test of child layer waiting for parent layer, which was added later
+        """
+        self.assertEqual(self.waiting, {(65536, 4)})
+        self.assertEqual(len(self.bridge.waiting_layers), 0)
+
+    def test_create_commands(self):
+        """
+        Test of layer create commands sent after confirmation of node
+        and parent layer
+        """
+        node = self.bridge.nodes[65536]
+        self.target.confirm(node.custom_type)
+        created = [cmd[3] for cmd in self.target.sent if cmd[0] == 'layer_create']
+        self.assertEqual(sorted(created), [31, 33])
+        layer = self.bridge.layers[(65536, 1)]
+        verse_layer.VerseLayer.cb_receive_layer_create(self.target, node.id, None, 0, 3, 1, layer.custom_type)
+        created = [cmd[2:] for cmd in self.target.sent if cmd[0] == 'layer_create']
+        self.assertIn((0, 32), created)
+
+
+class TestBridgeQueueCase(unittest.TestCase):
+    """
+    Test case of changes queued for thread of thread safe target session
+    """
+
+    source = None
+    target = None
+    bridge = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.source = PublishingSession()
+        cls.source.publish({65536: node_snapshot(65536, (1,), {})})
+        cls.target = BridgedSession()
+        cls.target.thread_safe = True
+        cls.bridge = verse_bridge.VerseBridge(cls.source, cls.target, roots=[65536])
+        cls.queued = (len(cls.target.send_queue), len(cls.bridge.nodes))
+        cls.source.publish({65537: node_snapshot(65537, (2,), {})._replace(parent_id=65536)})
+        cls.target._callback_thread = verse_session.threading.current_thread().ident
+        cls.target.send_queued()
+        cls.tested = True
+
+    def test_queued_changes(self):
+        """
+        Test of changes applied by thread of target session
+        """
+        self.assertEqual(self.queued, (1, 0))
+        self.assertEqual(set(self.bridge.nodes), {65536, 65537})
+        self.assertEqual(self.bridge.ticks, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Module for testing class VerseCheckpointer from module vrsent. These
+tests do not require running Verse server.
+"""
+
+import sys
+if sys.version >= '2.7':
+    import unittest
+else:
+    import unittest2 as unittest
+import os
+import shutil
+import tempfile
+import types
+from vrsent import verse_checkpoint, verse_snapshot
+
+
+def node_snapshot(node_id, tag_value, items):
+    """
+    This function returns snapshot of node with one tag and one layer
+    """
+    tag = verse_snapshot.VerseTagSnapshot(0, 20, 3, 1, tag_value)
+    tg = verse_snapshot.VerseTagGroupSnapshot(0, 10, types.MappingProxyType({0: tag}))
+    layer = verse_snapshot.VerseLayerSnapshot(0, None, 30, 3, 1, types.MappingProxyType(items))
+    return verse_snapshot.VerseNodeSnapshot(
+        node_id, 3, 1001, 7, None,
+        verse_snapshot.EMPTY,
+        types.MappingProxyType({0: tg}),
+        types.MappingProxyType({0: layer}))
+
+
+class PublishingSession(object):
+    """
+    Object with interface of session and its publisher of snapshots
+    needed by checkpointer
+    """
+
+    def __init__(self):
+        """
+        Constructor of PublishingSession
+        """
+        self.snapshots = self
+        self.current = verse_snapshot.VerseSnapshot(0, {})
+        self.changed_ids = ()
+        self.listeners = []
+
+    def enable_snapshots(self):
+        """
+        This method returns publisher of snapshots
+        """
+        return self
+
+    def add_listener(self, callback):
+        """
+        This method adds listener of snapshots
+        """
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """
+        This method removes listener of snapshots
+        """
+        self.listeners.remove(callback)
+
+    def publish(self, changed_nodes, removed_ids=()):
+        """
+        This method publishes snapshot with changed and removed nodes
+        """
+        nodes = dict(self.current.nodes)
+        nodes.update(changed_nodes)
+        for node_id in removed_ids:
+            nodes.pop(node_id)
+        self.changed_ids = tuple(changed_nodes) + tuple(removed_ids)
+        self.current = verse_snapshot.VerseSnapshot(self.current.tick + 1, nodes)
+        for callback in self.listeners:
+            callback(self.current)
+
+
+class TestCheckpointCase(unittest.TestCase):
+    """
+    Test case of incremental checkpoints
+    """
+
+    directory = None
+    session = None
+    checkpointer = None
+    segment = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.directory = tempfile.mkdtemp()
+        cls.session = PublishingSession()
+        items = {item_id: (item_id,) for item_id in range(100)}
+        cls.session.publish({65536: node_snapshot(65536, (1,), items), 65537: node_snapshot(65537, (2,), {})})
+        cls.checkpointer = verse_checkpoint.VerseCheckpointer(cls.session, cls.directory, compact_segments=3)
+        cls.checkpointer.checkpoint()
+        # Change one item and remove other node
+        items = dict(items)
+        items[5] = (55,)
+        items.pop(6)
+        old_node = cls.session.current[65536]
+        layer = old_node.layers[0]._replace(items=types.MappingProxyType(items))
+        node = old_node._replace(layers=types.MappingProxyType({0: layer}))
+        cls.session.publish({65536: node}, removed_ids=(65537,))
+        cls.checkpointer.checkpoint()
+        cls.segment = verse_checkpoint._read_file(verse_checkpoint.segment_path(cls.directory, cls.checkpointer.seq))
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        shutil.rmtree(cls.directory)
+
+    def test_incremental_segment(self):
+        """
+        Test of writing only changed items and removed nodes to segment
+        """
+        changes = self.segment[3]
+        self.assertEqual(changes[65537], None)
+        change = changes[65536]
+        self.assertEqual(change[0], 'DIFF')
+        self.assertEqual(change[3], {})
+        self.assertEqual(change[4], {0: ((0, None, 30, 3, 1), {5: (55,)}, [6])})
+
+    def test_restore(self):
+        """
+        Test of restoring nodes from base and segments
+        """
+        snapshot = verse_checkpoint.restore(self.directory)
+        self.assertEqual(dict(snapshot.nodes), dict(self.session.current.nodes))
+
+    def test_compaction(self):
+        """
+        Test of merging segments to the base
+        """
+        checkpointer = verse_checkpoint.VerseCheckpointer(self.session, self.directory, compact_segments=2)
+        self.assertEqual(checkpointer.segments, 1)
+        node = node_snapshot(65538, (3,), {})
+        self.session.publish({65538: node})
+        checkpointer.checkpoint()
+        self.assertEqual(os.listdir(self.directory), [verse_checkpoint.BASE_NAME])
+        self.assertEqual(verse_checkpoint.restore(self.directory)[65538], node)
+        checkpointer.stop()
+
+    def test_compaction_after_restart(self):
+        """
+        Test of keeping restored nodes, that were not received again after
+        restart, in the base
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            shutil.rmtree(directory)
+            shutil.copytree(self.directory, directory)
+            restored = verse_checkpoint.restore(directory)
+            session = PublishingSession()
+            session.publish({70001: node_snapshot(70001, (4,), {})})
+            checkpointer = verse_checkpoint.VerseCheckpointer(session, directory, compact_segments=1)
+            checkpointer.checkpoint()
+            checkpointer.stop()
+            snapshot = verse_checkpoint.restore(directory)
+            self.assertEqual(sorted(snapshot.nodes), sorted(list(restored.nodes) + [70001]))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+"""
+Module for testing estimation of data_type from module vrsent. These
+tests do not require running Verse server.
+"""
+
+import sys
+if sys.version >= '2.7':
+    import unittest
+else:
+    import unittest2 as unittest
+import verse as vrs
+from vrsent import verse_entity
+
+
+class TestEstimateDataTypeCase(unittest.TestCase):
+    """
+    Test case of estimation of data_type from items of value
+    """
+
+    def test_narrowest_int(self):
+        """
+        Test of the narrowest integer type fitting all items
+        """
+        data_type = verse_entity.estimate_data_type((1, 300), verse_entity.DATA_TYPE_NARROWEST)
+        self.assertEqual(data_type, vrs.VALUE_TYPE_UINT16)
+
+    def test_mixed_items(self):
+        """
+        Test of integers mixed with real numbers. Type of all items is used,
+        not only type of the first item.
+        """
+        data_type = verse_entity.estimate_data_type((1, 2.5), verse_entity.DATA_TYPE_NARROWEST)
+        self.assertEqual(data_type, vrs.VALUE_TYPE_REAL64)
+        with self.assertRaises(TypeError):
+            verse_entity.estimate_data_type((1, 'text'))
+
+    def test_quantized_real(self):
+        """
+        Test of real numbers quantized to real_data_type
+        """
+        data_type = verse_entity.estimate_data_type((0.5, 2.0), real_data_type=vrs.VALUE_TYPE_REAL16)
+        self.assertEqual(data_type, vrs.VALUE_TYPE_REAL16)
+        data_type = verse_entity.estimate_data_type((0.1,), real_data_type=vrs.VALUE_TYPE_REAL16)
+        self.assertEqual(data_type, vrs.VALUE_TYPE_REAL64)
+
+    def test_invalid_arguments(self):
+        """
+        Test of invalid real_data_type, mode and unsupported items
+        """
+        with self.assertRaises(ValueError):
+            verse_entity.estimate_data_type((0.5,), real_data_type=vrs.VALUE_TYPE_UINT8)
+        with self.assertRaises(ValueError):
+            verse_entity.estimate_data_type((1,), mode='SMALLEST')
+        with self.assertRaises(ValueError):
+            verse_entity.estimate_data_type(())
+        with self.assertRaises(KeyError):
+            verse_entity.estimate_data_type((None,))
+
+
+class TestCheckDataTypeCase(unittest.TestCase):
+    """
+    Test case of checking of values of estimated data_type
+    """
+
+    def test_fitting_value(self):
+        """
+        Test of values fitting into data_type
+        """
+        verse_entity.check_data_type((0, 255), vrs.VALUE_TYPE_UINT8)
+        verse_entity.check_data_type((1, 0.5), vrs.VALUE_TYPE_REAL16)
+        verse_entity.check_data_type(('text',), vrs.VALUE_TYPE_STRING8)
+
+    def test_overflow(self):
+        """
+        Test of values not fitting into data_type
+        """
+        with self.assertRaises(ValueError):
+            verse_entity.check_data_type((256,), vrs.VALUE_TYPE_UINT8)
+        with self.assertRaises(ValueError):
+            verse_entity.check_data_type((1.5,), vrs.VALUE_TYPE_UINT64)
+        with self.assertRaises(ValueError):
+            verse_entity.check_data_type((0.1,), vrs.VALUE_TYPE_REAL16, max_error=0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Module for testing class VerseHandlerExecutor from module vrsent. These
+tests do not require running Verse server.
+"""
+
+import sys
+if sys.version >= '2.7':
+    import unittest
+else:
+    import unittest2 as unittest
+import threading
+import time
+from vrsent import verse_executor
+
+
+class TestHandlerExecutorCase(unittest.TestCase):
+    """
+    Test case of calling of handlers in pool of threads
+    """
+
+    executor = None
+    calls = []
+    tested = False
+
+    @classmethod
+    def handler(cls, node_id, taggroup_id, tag_id, value):
+        """
+        Handler with longer running time for odd values
+        """
+        time.sleep(0.01 if value % 2 == 1 else 0.0)
+        cls.calls.append((node_id, value))
+        return value
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.executor = verse_executor.VerseHandlerExecutor(session=None, max_workers=4, max_queue=4)
+        cls.executor.add_handler('tag_set_values', cls.handler)
+        for value in range(12):
+            cls.executor.dispatch('tag_set_values', (100 + value % 3, 0, 0, value))
+        cls.executor.wait()
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        cls.executor.shutdown()
+
+    def test_handler_order(self):
+        """
+        Test of order of handlers with the same node
+        """
+        for node_id in (100, 101, 102):
+            values = [value for handler_node_id, value in self.calls if handler_node_id == node_id]
+            self.assertEqual(values, sorted(values))
+            self.assertEqual(len(values), 4)
+
+    def test_handler_metrics(self):
+        """
+        Test of metrics of executor
+        """
+        self.assertEqual(self.executor.finished, 12)
+        self.assertEqual(self.executor.depth, 0)
+        self.assertLessEqual(self.executor.max_depth, 4)
+        self.assertEqual(self.executor.errors, 0)
+
+    def test_entity_key(self):
+        """
+        Test of keys of commands
+        """
+        executor = verse_executor.VerseHandlerExecutor(
+            session=None,
+            pool=self.executor.pool,
+            key=verse_executor.KEY_ENTITY)
+        self.assertEqual(executor.command_key('layer_create', (10, None, 3, 1, 1, 32)), ('layer', 10, 3))
+        self.assertEqual(self.executor.command_key('node_link', (1, 10)), 10)
+
+
+
+class TestExecutorBackpressureCase(unittest.TestCase):
+    """
+    Test case of full queue of executor and handlers taking lock held
+    by the thread dispatching commands
+    """
+
+    executor = None
+    lock = None
+    max_overflow = 0
+    thread = None
+    calls = []
+    tested = False
+
+    @classmethod
+    def handler(cls, node_id, taggroup_id, tag_id, value):
+        """
+        Handler taking lock of session
+        """
+        with cls.lock:
+            cls.calls.append(value)
+
+    @classmethod
+    def callback_update(cls):
+        """
+        This method simulates callback_update() dispatching more commands
+        than size of the queue, when lock of session is held
+        """
+        with cls.lock:
+            for value in range(20):
+                cls.executor.dispatch('tag_set_values', (100, 0, 0, value))
+            cls.max_overflow = len(cls.executor._overflow)
+        cls.executor.drain()
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.lock = threading.RLock()
+        cls.executor = verse_executor.VerseHandlerExecutor(session=None, max_workers=2, max_queue=4)
+        cls.executor.add_handler('tag_set_values', cls.handler)
+        cls.thread = threading.Thread(target=cls.callback_update)
+        cls.thread.daemon = True
+        cls.thread.start()
+        cls.thread.join(5.0)
+        cls.executor.wait(5.0)
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        cls.executor.shutdown(wait=False)
+
+    def test_no_deadlock(self):
+        """
+        Test of finishing of callback thread and all handlers
+        """
+        self.assertFalse(self.thread.is_alive())
+        self.assertEqual(self.calls, list(range(20)))
+
+    def test_overflow(self):
+        """
+        Test of keeping handlers in overflow queue, when queue is full
+        """
+        self.assertGreater(self.max_overflow, 0)
+        self.assertLessEqual(self.executor.max_depth, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
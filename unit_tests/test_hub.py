@@ -0,0 +1,199 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+"""
+Module for testing class VerseHub from module vrsent. These tests do not
+require running Verse server.
+"""
+
+import sys
+if sys.version >= '2.7':
+    import unittest
+else:
+    import unittest2 as unittest
+import os
+import socket
+import stat
+import tempfile
+import types
+from vrsent import verse_hub, verse_checkpoint
+from test_checkpoint import PublishingSession, node_snapshot
+
+
+class RecordingClient(verse_hub.VerseHubClient):
+    """
+    Client of hub recording received messages
+    """
+
+    def __init__(self, path, custom_types=None, node_ids=None):
+        """
+        Constructor of RecordingClient
+        """
+        self.messages = []
+        super(RecordingClient, self).__init__(path, custom_types, node_ids)
+
+    def _apply(self, message):
+        """
+        This method records message and applies it
+        """
+        self.messages.append(message)
+        super(RecordingClient, self)._apply(message)
+
+
+class TestHubCase(unittest.TestCase):
+    """
+    Test case of snapshot and changes of nodes sent to clients of hub
+    """
+
+    session = None
+    hub = None
+    clients = None
+    diffs = 0
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.session = PublishingSession()
+        node = node_snapshot(65536, (1,), {0: (1,), 1: (2,)})
+        cls.session.publish({65536: node, 65537: node_snapshot(65537, (2,), {})})
+        cls.path = os.path.join(tempfile.mkdtemp(), 'hub.sock')
+        cls.hub = verse_hub.VerseHub(cls.session, cls.path)
+        cls.mode = stat.S_IMODE(os.stat(cls.path).st_mode)
+        cls.clients = [RecordingClient(cls.path, node_ids=[65536]) for index in range(2)]
+        # Hub accepts one client per update
+        cls.session.publish({})
+        cls.session.publish({})
+        for client in cls.clients:
+            client.update(1.0)
+        # Count changes of nodes computed by hub
+        node_diff = verse_checkpoint.node_diff
+
+        def counted_diff(old_snapshot, new_snapshot):
+            cls.diffs += 1
+            return node_diff(old_snapshot, new_snapshot)
+        verse_checkpoint.node_diff = counted_diff
+        try:
+            layer = node.layers[0]._replace(items=types.MappingProxyType({0: (1,), 2: (3,)}))
+            node = node._replace(layers=types.MappingProxyType({0: layer}))
+            cls.session.publish({65536: node, 65537: node_snapshot(65537, (3,), {})})
+        finally:
+            verse_checkpoint.node_diff = node_diff
+        for client in cls.clients:
+            client.update(1.0)
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        for client in cls.clients:
+            client.close()
+        cls.hub.close()
+
+    def test_socket_mode(self):
+        """
+        Test of permissions of socket
+        """
+        self.assertEqual(self.mode, 0o600)
+
+    def test_item_diff(self):
+        """
+        Test of changed items of layer sent as diff
+        """
+        for client in self.clients:
+            message = client.messages[-1]
+            self.assertEqual(message[0], 'DELTA')
+            self.assertEqual(list(message[2]), [65536])
+            change = message[2][65536]
+            self.assertEqual(change[0], 'DIFF')
+            self.assertEqual(change[4][0][1:], ({2: (3,)}, [1]))
+            items = client.nodes[65536].layers[0].items
+            self.assertEqual(dict(items), {0: (1,), 2: (3,)})
+
+    def test_diff_once(self):
+        """
+        Test of change of node computed once for all clients
+        """
+        self.assertEqual(self.diffs, 1)
+
+
+class TestHubRequestCase(unittest.TestCase):
+    """
+    Test case of requests of clients, which are not trusted by hub
+    """
+
+    session = None
+    hub = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.session = PublishingSession()
+        cls.session.publish({65536: node_snapshot(65536, (1,), {})})
+        path = os.path.join(tempfile.mkdtemp(), 'hub.sock')
+        cls.hub = verse_hub.VerseHub(cls.session, path)
+        cls.client = verse_hub.VerseHubClient(path)
+        cls.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        cls.sock.connect(path)
+        # Request serialized by marshal is not accepted
+        cls.sock.sendall(verse_hub.frame(('SUBSCRIBE', None, None)))
+        cls.session.publish({})
+        cls.session.publish({})
+        cls.client.update(1.0)
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        cls.sock.close()
+        cls.client.close()
+        cls.hub.close()
+
+    def test_rejected_client(self):
+        """
+        Test of client disconnected after invalid request
+        """
+        self.assertEqual(len(self.hub.connections), 1)
+        self.assertEqual(self.sock.recv(1024), b'')
+
+    def test_valid_client(self):
+        """
+        Test of snapshot received by valid client
+        """
+        self.assertEqual(list(self.client.nodes), [65536])
+        self.assertEqual(self.client.tick, 2)
+
+    def test_invalid_requests(self):
+        """
+        Test of validation of requests
+        """
+        for data in (b'{}', b'["GET", 1]', b'["GET", "1", 2]', b'["SUBSCRIBE", [1.5], null]', b'["EXIT", 1, 2]', b'\xff'):
+            self.assertRaises(ValueError, verse_hub.load_request, data)
+        self.assertEqual(verse_hub.load_request(b'["SUBSCRIBE", [5], null]'), ('SUBSCRIBE', [5], None))
+
+
+if __name__ == '__main__':
+    unittest.main()
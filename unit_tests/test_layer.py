@@ -25,6 +25,10 @@ if sys.version >= '2.7':
     import unittest
 else:
     import unittest2 as unittest
+import os
+import struct
+import tempfile
+import verse as vrs
 import vrsent
 
 
@@ -176,3 +180,504 @@ class TestCreatedLayerCase(unittest.TestCase):
         Test of existence layer in dictionary of node
         """
         self.assertTrue(self.layer.id in self.node.layers)
+
+
+class TestLayerAggregateCase(unittest.TestCase):
+    """
+    Test case of aggregates of VerseLayer
+    """
+
+    node = None
+    layer = None
+    count = None
+    sum = None
+    bbox = None
+    histogram = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.node = vrsent.session.test_node
+        cls.layer = vrsent.session.test_node.test_layer
+        cls.count = cls.layer.add_observer(vrsent.verse_aggregate.VerseLayerCount())
+        cls.sum = cls.layer.add_observer(vrsent.verse_aggregate.VerseLayerSum())
+        cls.bbox = cls.layer.add_observer(vrsent.verse_aggregate.VerseLayerBoundingBox())
+        cls.histogram = cls.layer.add_observer(vrsent.verse_aggregate.VerseLayerHistogram(bin_size=5))
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        for observer in (cls.count, cls.sum, cls.bbox, cls.histogram):
+            cls.layer.remove_observer(observer)
+
+    def test_layer_aggregates(self):
+        """
+        Test of aggregates computed from items of layer
+        """
+        self.assertEqual(self.count.value, len(self.layer.items))
+        self.assertEqual(self.sum.value, (45,))
+        self.assertEqual(self.bbox.value, ((0,), (9,)))
+        self.assertEqual(self.histogram.value, {0: 5, 1: 5})
+
+    def test_bounding_box_update(self):
+        """
+        Test of incremental update of bounding box
+        """
+        bbox = vrsent.verse_aggregate.VerseLayerBoundingBox()
+        bbox.item_set(0, None, (1.0, 2.0))
+        bbox.item_set(1, None, (-1.0, 5.0))
+        self.assertEqual(bbox.value, ((-1.0, 2.0), (1.0, 5.0)))
+        self.assertFalse(bbox.dirty)
+        bbox.item_unset(1, (-1.0, 5.0))
+        self.assertTrue(bbox.dirty)
+
+
+class TestLayerGridCase(unittest.TestCase):
+    """
+    Test case of spatial index of VerseLayer
+    """
+
+    node = None
+    layer = None
+    grid = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.node = vrsent.session.test_node
+        cls.layer = vrsent.session.test_node.test_layer
+        cls.grid = cls.layer.add_observer(vrsent.verse_spatial.VerseLayerGrid(cell_size=2.0))
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        cls.layer.remove_observer(cls.grid)
+
+    def test_grid_queries(self):
+        """
+        Test of queries over items of layer
+        """
+        self.assertEqual(len(self.grid), len(self.layer.items))
+        self.assertEqual(self.grid.nearest((4.2,)), [4])
+        self.assertEqual(sorted(self.grid.radius((5,), 1.0)), [4, 5, 6])
+        self.assertEqual(sorted(self.grid.box((7,), (20,))), [7, 8, 9])
+
+    def test_grid_update(self):
+        """
+        Test of incremental update of grid
+        """
+        grid = vrsent.verse_spatial.VerseLayerGrid(cell_size=1.0)
+        grid.item_set(0, None, (0.5, 0.5, 0.5))
+        grid.item_set(1, None, (3.0, 3.0, 3.0))
+        grid.item_set(0, (0.5, 0.5, 0.5), (2.5, 2.5, 2.5))
+        self.assertEqual(grid.nearest((3.0, 3.0, 3.0), 2), [1, 0])
+        grid.item_unset(1, (3.0, 3.0, 3.0))
+        self.assertEqual(grid.radius((0.0, 0.0, 0.0), 1.0), [])
+        self.assertEqual(grid.nearest((0.0, 0.0, 0.0)), [0])
+        self.assertEqual(grid.min_cell, (2, 2, 2))
+        self.assertEqual(grid.max_cell, (2, 2, 2))
+        self.assertEqual(grid.nearest((-5.0, 9.0, 0.0)), [0])
+
+
+class TestEstimatedLayerCase(unittest.TestCase):
+    """
+    Test case of VerseLayer with data_type estimated from initial items
+    """
+
+    node = None
+    layer = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.node = vrsent.session.test_node
+        cls.layer = vrsent.VerseLayer(
+            node=cls.node,
+            parent_layer=None,
+            count=1,
+            custom_type=137,
+            items={0: (1,), 1: (200,)})
+        cls.tested = True
+
+    def test_estimated_data_type(self):
+        """
+        Test of data_type estimated from all initial items
+        """
+        self.assertTrue(self.layer.estimated)
+        self.assertEqual(self.layer.data_type, vrs.VALUE_TYPE_UINT64)
+
+    def test_estimated_overflow(self):
+        """
+        Test of value, which does not fit into estimated data_type
+        """
+        with self.assertRaises(ValueError):
+            self.layer.items[2] = (1.5,)
+        self.assertNotIn(2, self.layer.items)
+        self.layer.items[2] = (300,)
+        self.assertEqual(self.layer.items[2], (300,))
+
+
+class TestSuppressedLayerCase(unittest.TestCase):
+    """
+    Test case of suppressing of unchanged values of items of VerseLayer
+    """
+
+    layer = None
+    sent = None
+    suppressed = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.layer = vrsent.session.test_node.test_layer
+        vrsent.session.suppress_unchanged = True
+        suppressed = vrsent.session.suppressed_cmds.get('layer_set_value', 0)
+        cls.layer.items[250] = (10,)
+        cls.layer.items[250] = (10,)
+        # Value received from Verse server replaces last sent value
+        vrsent.VerseLayer.cb_receive_layer_set_value(
+            vrsent.session, cls.layer.node.id, cls.layer.id, 250, (20,))
+        cls.layer.items[250] = (20,)
+        cls.layer.items[250] = (10,)
+        cls.suppressed = vrsent.session.suppressed_cmds.get('layer_set_value', 0) - suppressed
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        cls.layer.items.pop(250)
+        vrsent.session.suppress_unchanged = False
+
+    def test_suppressed_values(self):
+        """
+        Test of values compared with last sent or received value
+        """
+        self.assertEqual(self.suppressed, 2)
+        self.assertEqual(self.layer._last_sent[250], (10,))
+        self.assertEqual(self.layer.items[250], (10,))
+
+
+class TestMappedLayerCase(unittest.TestCase):
+    """
+    Test case of VerseLayer with items stored in memory mapped file
+    """
+
+    node = None
+    layer = None
+    path = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.node = vrsent.session.test_node
+        cls.layer = vrsent.VerseLayer(
+            node=cls.node,
+            parent_layer=None,
+            data_type=vrs.VALUE_TYPE_REAL32,
+            count=3,
+            custom_type=130)
+        fd, cls.path = tempfile.mkstemp(suffix='.layer')
+        os.close(fd)
+        vrsent.verse_mmap.map_layer_items(cls.layer, cls.path)
+        cls.layer.items[2] = (1.0, 2.0, 3.0)
+        cls.layer.items[5000] = (4.0, 5.0, 6.0)
+        cls.layer.items[7] = (0.5, 0.5, 0.5)
+        cls.layer.items.pop(7)
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        cls.layer.items.close()
+        os.remove(cls.path)
+
+    def test_mapped_items(self):
+        """
+        Test of items stored in the file
+        """
+        self.assertEqual(len(self.layer.items), 2)
+        self.assertEqual(self.layer.items[2], (1.0, 2.0, 3.0))
+        self.assertEqual(sorted(self.layer.items.keys()), [2, 5000])
+        self.assertNotIn(7, self.layer.items)
+
+    def test_mapped_items_reopen(self):
+        """
+        Test of items read from existing file
+        """
+        self.layer.items.flush()
+        items = vrsent.verse_mmap.VerseMappedLayerItems(self.layer, self.path)
+        self.assertEqual(len(items), 2)
+        self.assertEqual(items[5000], (4.0, 5.0, 6.0))
+        items.close()
+
+    def test_mapped_items_invalid(self):
+        """
+        Test of negative ID of item and file with different layout
+        """
+        with self.assertRaises(ValueError):
+            self.layer.items[-1] = (1.0, 1.0, 1.0)
+        layer = vrsent.VerseLayer(
+            node=self.node,
+            parent_layer=None,
+            data_type=vrs.VALUE_TYPE_UINT8,
+            count=1,
+            custom_type=135)
+        with self.assertRaises(ValueError):
+            vrsent.verse_mmap.VerseMappedLayerItems(layer, self.path)
+
+    def test_mapped_items_scalar(self):
+        """
+        Test of scalar value stored in layer with one value per item
+        """
+        layer = vrsent.VerseLayer(
+            node=self.node,
+            parent_layer=None,
+            data_type=vrs.VALUE_TYPE_UINT8,
+            count=1,
+            custom_type=136)
+        fd, path = tempfile.mkstemp(suffix='.layer')
+        os.close(fd)
+        items = vrsent.verse_mmap.map_layer_items(layer, path)
+        layer.items[3] = 5
+        self.assertEqual(layer.items[3], (5,))
+        # Invalid values do not change the file
+        for value in (300, (1, 2)):
+            with self.assertRaises(struct.error):
+                items._store(4, value)
+        self.assertEqual(len(items), 1)
+        self.assertNotIn(4, items)
+        layer.clean()
+        self.assertIsNone(items.mmap)
+        os.remove(path)
+
+
+class TestLayerChangesCase(unittest.TestCase):
+    """
+    Test case of tracking of changed items of VerseLayer
+    """
+
+    node = None
+    layer = None
+    cursor1 = None
+    cursor2 = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.node = vrsent.session.test_node
+        cls.layer = vrsent.VerseLayer(
+            node=cls.node,
+            parent_layer=None,
+            data_type=vrs.VALUE_TYPE_UINT8,
+            count=1,
+            custom_type=131)
+        for item_id in range(10):
+            cls.layer.items[item_id] = (item_id,)
+        cls.cursor1 = cls.layer.open_cursor()
+        cls.layer.items[3] = (30,)
+        cls.layer.items[4] = (40,)
+        cls.cursor2 = cls.layer.open_cursor()
+        cls.layer.items[9] = (90,)
+        cls.layer.items.pop(5)
+        cls.tested = True
+
+    def test_layer_changes(self):
+        """
+        Test of changes consumed by independent cursors
+        """
+        self.assertEqual(self.layer.consume_changes(self.cursor1), [(3, 5), (9, 9)])
+        self.assertEqual(self.layer.consume_changes(self.cursor2), [(5, 5), (9, 9)])
+        self.assertEqual(self.layer.consume_changes(self.cursor1), [])
+        self.assertEqual(len(self.layer.changes.log), 0)
+
+
+class TestLayerUploadCase(unittest.TestCase):
+    """
+    Test case of chunked upload of items of VerseLayer
+    """
+
+    node = None
+    layer = None
+    upload = None
+    progress = []
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.node = vrsent.session.test_node
+        cls.layer = vrsent.session.test_node.test_layer
+        cls.upload = cls.layer.upload(
+            {item_id: (item_id % 256,) for item_id in range(100, 125)},
+            budget=10,
+            on_progress=lambda upload: cls.progress.append(upload.sent))
+        cls.upload.update()
+        cls.tested = True
+
+    def test_upload_chunk(self):
+        """
+        Test of sending of items in chunks
+        """
+        self.assertEqual(self.progress[0], 10)
+        self.assertEqual(self.upload.progress, 0.4)
+        self.assertIn(self.upload, vrsent.session.uploads)
+        self.upload.update()
+        self.upload.update()
+        self.assertEqual(self.progress, [10, 20, 25])
+        self.assertEqual(self.upload.future.result(), 25)
+        self.assertNotIn(self.upload, vrsent.session.uploads)
+        self.assertEqual(self.layer.items[124], (124,))
+
+
+class TestLayerSnapshotCase(unittest.TestCase):
+    """
+    Test case of snapshots of VerseLayer published by session
+    """
+
+    layer = None
+    snapshot1 = None
+    snapshot2 = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.layer = vrsent.session.test_node.test_layer
+        snapshots = vrsent.session.enable_snapshots()
+        cls.layer.items[200] = (1,)
+        cls.snapshot1 = snapshots.publish()
+        cls.layer.items[200] = (2,)
+        cls.snapshot2 = snapshots.publish()
+        cls.tested = True
+
+    def test_layer_snapshot(self):
+        """
+        Test of values of items in snapshots
+        """
+        node_id = self.layer.node.id
+        layer_id = self.layer.id
+        self.assertEqual(self.snapshot1[node_id].layers[layer_id].items[200], (1,))
+        self.assertEqual(self.snapshot2[node_id].layers[layer_id].items[200], (2,))
+        self.assertEqual(self.snapshot2.tick, self.snapshot1.tick + 1)
+
+    def test_shared_snapshot(self):
+        """
+        Test of sharing of unchanged nodes between snapshots
+        """
+        node_id = self.layer.node.id
+        for other_id, node_snapshot in self.snapshot2.nodes.items():
+            if other_id != node_id:
+                self.assertIs(node_snapshot, self.snapshot1[other_id])
+
+
+class TestSharedMirrorCase(unittest.TestCase):
+    """
+    Test case of items of VerseLayer published to shared memory
+    """
+
+    layer = None
+    mirror = None
+    reader = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.layer = vrsent.session.test_node.test_layer
+        cls.mirror = vrsent.session.enable_shared_mirror(size=4 * 1024 * 1024)
+        cls.reader = vrsent.verse_shared.VerseSharedMirrorReader(cls.mirror.name)
+        cls.layer.items[201] = (3,)
+        vrsent.session.snapshots.publish()
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        cls.reader.close()
+
+    def test_shared_item(self):
+        """
+        Test of item read from shared memory
+        """
+        node_snapshot = self.reader[self.layer.node.id]
+        self.assertEqual(node_snapshot.layers[self.layer.id].items[201], (3,))
+        self.assertEqual(self.reader.seq % 2, 0)
+        self.assertEqual(self.reader.seq, self.mirror.seq)
+
+
+class TestHubCase(unittest.TestCase):
+    """
+    Test case of items of VerseLayer sent by hub to local client
+    """
+
+    layer = None
+    hub = None
+    client = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.layer = vrsent.session.test_node.test_layer
+        path = os.path.join(tempfile.mkdtemp(), 'hub.sock')
+        cls.hub = vrsent.session.enable_hub(path)
+        cls.client = vrsent.verse_hub.VerseHubClient(path, node_ids=[cls.layer.node.id])
+        vrsent.session.snapshots.publish()
+        cls.client.update(1.0)
+        cls.layer.items[202] = (4,)
+        vrsent.session.snapshots.publish()
+        cls.client.update(1.0)
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        cls.client.close()
+
+    def test_hub_delta(self):
+        """
+        Test of item received in delta
+        """
+        node_snapshot = self.client.nodes[self.layer.node.id]
+        self.assertEqual(node_snapshot.layers[self.layer.id].items[202], (4,))
+        self.assertEqual(list(self.client.nodes), [self.layer.node.id])
@@ -0,0 +1,127 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Module for testing class VerseLazyStore from module vrsent. These
+tests do not require running Verse server.
+"""
+
+import sys
+if sys.version >= '2.7':
+    import unittest
+else:
+    import unittest2 as unittest
+import verse as vrs
+from vrsent import verse_lazy, verse_node
+from test_batch import BatchSession
+
+
+class LazySession(BatchSession):
+    """
+    Object with interface of session with lazy store subscribing records
+    """
+
+    def __init__(self):
+        """
+        Constructor of LazySession
+        """
+        super(LazySession, self).__init__()
+        self.snapshots = None
+        self.lazy_store = verse_lazy.VerseLazyStore(self, subscribe=True)
+
+    def send_taggroup_subscribe(self, prio, node_id, tg_id, version, crc32):
+        """
+        This method simulates sending of tag group subscribe command
+        """
+        self.sent.append(('taggroup_subscribe', node_id, tg_id))
+
+    def send_layer_subscribe(self, prio, node_id, layer_id, version, crc32):
+        """
+        This method simulates sending of layer subscribe command
+        """
+        self.sent.append(('layer_subscribe', node_id, layer_id))
+
+
+class TestLazyStoreCase(unittest.TestCase):
+    """
+    Test case of store of records of entities that were not accessed yet
+    """
+
+    store = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.store = verse_lazy.VerseLazyStore(session=None)
+        cls.store.add_tag_group(100, 0, 10)
+        cls.store.add_tag_group(100, 1, 11)
+        cls.store.add_tag(100, 0, 0, vrs.VALUE_TYPE_UINT8, 1, 20)
+        cls.store.add_tag(100, 1, 0, vrs.VALUE_TYPE_UINT8, 1, 20)
+        cls.store.set_tag_value(100, 1, 0, (5,))
+        cls.store.add_layer(100, None, 0, vrs.VALUE_TYPE_REAL32, 3, 30)
+        cls.store.add_layer(100, 0, 1, vrs.VALUE_TYPE_REAL32, 3, 31)
+        cls.store.add_layer(101, None, 0, vrs.VALUE_TYPE_REAL32, 3, 30)
+        cls.store.set_layer_value(101, 0, 5, (1.0, 2.0, 3.0))
+        cls.store.remove_tag_group(100, 0)
+        cls.store.remove_layer(100, 0)
+        cls.tested = True
+
+    def test_store_length(self):
+        """
+        Test of count of records in the store
+        """
+        self.assertEqual(len(self.store), 3)
+
+    def test_store_tag_group(self):
+        """
+        Test of removing of tag group with its tags
+        """
+        self.assertFalse(self.store.has_tag_group(100, 0))
+        self.assertFalse(self.store.has_tag(100, 0, 0))
+        self.assertTrue(self.store.has_tag(100, 1, 0))
+
+    def test_store_subscribed(self):
+        """
+        Test of tag group and layer subscribed only once, when record is
+        added, and not again, when they are created from record
+        """
+        session = LazySession()
+        verse_node.VerseNode(session=session, node_id=65536, custom_type=50)
+        session.lazy_store.add_tag_group(65536, 0, 10)
+        session.lazy_store.add_layer(65536, None, 0, vrs.VALUE_TYPE_REAL32, 3, 30)
+        tg = session.lazy_store.load_tag_group(65536, 0)
+        layer = session.lazy_store.load_layer(65536, 0)
+        subscribes = [cmd for cmd in session.sent if cmd[0] != 'node_subscribe']
+        self.assertEqual(subscribes, [('taggroup_subscribe', 65536, 0), ('layer_subscribe', 65536, 0)])
+        self.assertTrue(tg.subscribed)
+        self.assertTrue(layer.subscribed)
+        self.assertIsNone(session.lazy_store.skip_subscribe)
+
+    def test_store_child_layer(self):
+        """
+        Test of removing of layer with its child layers
+        """
+        self.assertFalse(self.store.has_layer(100, 1))
+        self.assertTrue(self.store.has_layer(101, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
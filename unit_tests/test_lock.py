@@ -0,0 +1,227 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+"""
+Module for testing class VerseLockManager from module vrsent. These tests
+do not require running Verse server.
+"""
+
+import sys
+if sys.version >= '2.7':
+    import unittest
+else:
+    import unittest2 as unittest
+import time
+from vrsent import verse_lock
+
+
+class LockedNode(object):
+    """
+    Object with interface of node needed by lock manager
+    """
+
+    def __init__(self, session, node_id):
+        """
+        Constructor of LockedNode
+        """
+        self.session = session
+        self.id = node_id
+        self._lock_state = 'UNLOCKED'
+        self.locker_id = None
+        session.nodes[node_id] = self
+
+    @property
+    def locked(self):
+        """
+        Getter of lock state
+        """
+        return self._lock_state == 'LOCKED'
+
+    @property
+    def locked_by_me(self):
+        """
+        Getter of locking by this client
+        """
+        return self.locker_id == self.session.avatar_id
+
+    def lock(self):
+        """
+        This method simulates sending of node lock command
+        """
+        self._lock_state = 'LOCKING'
+        self.session.sent.append(('lock', self.id))
+
+    def unlock(self):
+        """
+        This method simulates sending of node unlock command
+        """
+        self._lock_state = 'UNLOCKING'
+        self.session.sent.append(('unlock', self.id))
+
+
+class LockSession(object):
+    """
+    Object with interface of session needed by lock manager
+    """
+
+    def __init__(self, node_ids):
+        """
+        Constructor of LockSession
+        """
+        self.avatar_id = 10
+        self.nodes = {}
+        self.sent = []
+        self.lock_manager = verse_lock.VerseLockManager(self)
+        for node_id in node_ids:
+            LockedNode(self, node_id)
+
+    def receive_lock(self, node_id, avatar_id=10):
+        """
+        This method simulates receiving of node lock command
+        """
+        node = self.nodes[node_id]
+        node._lock_state = 'LOCKED'
+        node.locker_id = avatar_id
+        self.lock_manager.cb_receive_node_lock(node_id, avatar_id)
+
+    def receive_unlock(self, node_id, avatar_id=10):
+        """
+        This method simulates receiving of node unlock command
+        """
+        node = self.nodes[node_id]
+        node._lock_state = 'UNLOCKED'
+        node.locker_id = None
+        self.lock_manager.cb_receive_node_unlock(node_id, avatar_id)
+
+
+class TestLockOrderCase(unittest.TestCase):
+    """
+    Test case of locking of batch of nodes in order of node IDs
+    """
+
+    session = None
+    future = None
+    sent = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.session = LockSession((65536, 65537, 65538))
+        nodes = [cls.session.nodes[node_id] for node_id in (65538, 65536, 65537)]
+        cls.future = cls.session.lock_manager.lock_nodes(nodes)
+        cls.sent = []
+        for node_id in (65536, 65537, 65538):
+            cls.sent.append(list(cls.session.sent))
+            cls.session.receive_lock(node_id)
+        cls.tested = True
+
+    def test_lock_order(self):
+        """
+        Test of lock command sent after confirmation of previous node
+        """
+        self.assertEqual(self.sent[0], [('lock', 65536)])
+        self.assertEqual(self.sent[1], [('lock', 65536), ('lock', 65537)])
+        self.assertEqual(self.sent[2], [('lock', 65536), ('lock', 65537), ('lock', 65538)])
+
+    def test_future_result(self):
+        """
+        Test of result of future with nodes sorted by node ID
+        """
+        self.assertEqual([node.id for node in self.future.result(0)], [65536, 65537, 65538])
+        self.assertEqual(len(self.session.lock_manager.requests), 0)
+        self.assertEqual(self.session.lock_manager.stats[65537].acquired, 1)
+
+
+class TestLockContentionCase(unittest.TestCase):
+    """
+    Test case of node locked by other client
+    """
+
+    session = None
+    future = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.session = LockSession((65536,))
+        cls.future = cls.session.lock_manager.lock(cls.session.nodes[65536])
+        # Other client locked the node first
+        cls.session.receive_lock(65536, avatar_id=20)
+        cls.done = cls.future.done()
+        cls.session.receive_unlock(65536, avatar_id=20)
+        cls.session.receive_lock(65536)
+        cls.tested = True
+
+    def test_contention(self):
+        """
+        Test of lock requested again, when other client unlocked node
+        """
+        self.assertFalse(self.done)
+        self.assertEqual(self.session.sent, [('lock', 65536), ('lock', 65536)])
+        self.assertEqual(self.session.lock_manager.stats[65536].contention, 1)
+        self.assertEqual(self.future.result(0), [self.session.nodes[65536]])
+
+
+class TestLockTimeoutCase(unittest.TestCase):
+    """
+    Test case of batch of nodes, which was not locked in time
+    """
+
+    session = None
+    future = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.session = LockSession((65536, 65537))
+        nodes = list(cls.session.nodes.values())
+        cls.future = cls.session.lock_manager.lock_nodes(nodes, timeout=0.01)
+        cls.session.receive_lock(65536)
+        time.sleep(0.02)
+        cls.session.lock_manager.update()
+        # Confirmation of lock received after timeout
+        cls.session.receive_lock(65537)
+        cls.tested = True
+
+    def test_timeout_exception(self):
+        """
+        Test of future finished with exception
+        """
+        self.assertIsInstance(self.future.exception(0), verse_lock.VerseLockTimeout)
+        self.assertEqual(self.future.exception(0).node_ids, [65536, 65537])
+        self.assertEqual(self.session.lock_manager.stats[65537].timeouts, 1)
+
+    def test_unlocked_nodes(self):
+        """
+        Test of unlocking of nodes locked before timeout and after timeout
+        """
+        self.assertEqual(self.session.sent, [('lock', 65536), ('lock', 65537), ('unlock', 65536), ('unlock', 65537)])
+        self.assertEqual(len(self.session.lock_manager.requests), 0)
+        self.assertEqual(len(self.session.lock_manager.waiting), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Module for testing class VerseMultiplexer from module vrsent. These
+tests do not require running Verse server.
+"""
+
+import sys
+if sys.version >= '2.7':
+    import unittest
+else:
+    import unittest2 as unittest
+import collections
+import time
+from vrsent import verse_multiplexer, verse_scheduler, verse_lock
+
+
+class UpdatedSession(object):
+    """
+    Object with interface of session needed by multiplexer
+    """
+
+    def __init__(self, service, delay=0.0):
+        """
+        Constructor of UpdatedSession
+        """
+        self.hostname = 'localhost'
+        self.service = service
+        self.state = 'CONNECTED'
+        self.delay = delay
+        self.updates = 0
+
+    def callback_update(self):
+        """
+        This method simulates processing of received commands
+        """
+        time.sleep(self.delay)
+        self.updates += 1
+
+
+class FailingSession(UpdatedSession):
+    """
+    Object with interface of session, which raises exception in update
+    """
+
+    def callback_update(self):
+        """
+        This method simulates error in processing of received commands
+        """
+        raise RuntimeError('Broken session')
+
+
+class CountedUpload(object):
+    """
+    Object with interface of upload of items of layer
+    """
+
+    def __init__(self, total, sent):
+        """
+        Constructor of CountedUpload
+        """
+        self.total = total
+        self.sent = sent
+
+
+class BacklogSession(UpdatedSession):
+    """
+    Object with interface of session with commands waiting for sending
+    """
+
+    def __init__(self, service):
+        """
+        Constructor of BacklogSession
+        """
+        super(BacklogSession, self).__init__(service)
+        self.send_queue = collections.deque([1, 2])
+        self.create_scheduler = verse_scheduler.VerseCreateScheduler(self)
+        self.create_scheduler.ready.append((0, 0, 'tag'))
+        self.create_scheduler.waiting['tg'] = ['tag1', 'tag2']
+        self.create_scheduler.in_flight.add('node')
+        self.lock_manager = verse_lock.VerseLockManager(self)
+        self.lock_manager.requests.append('request')
+        self.uploads = [CountedUpload(10, 4), CountedUpload(None, 0)]
+
+
+class TestMultiplexerCase(unittest.TestCase):
+    """
+    Test case of scheduling of sessions by multiplexer
+    """
+
+    multiplexer = None
+    slow_session = None
+    sessions = []
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.multiplexer = verse_multiplexer.VerseMultiplexer(fps=100, budget=0.002)
+        cls.slow_session = UpdatedSession('12340', delay=0.005)
+        cls.sessions = [UpdatedSession(str(12341 + index)) for index in range(3)]
+        for session in [cls.slow_session] + cls.sessions:
+            cls.multiplexer.add_session(session)
+        for index in range(20):
+            cls.multiplexer.update()
+        cls.tested = True
+
+    def test_fair_updates(self):
+        """
+        Test of updates of sessions within their budget
+        """
+        for session in self.sessions:
+            self.assertEqual(session.updates, 20)
+
+    def test_slow_session(self):
+        """
+        Test of skipping of session that exceeded its budget
+        """
+        stats = self.multiplexer.session_stats(self.slow_session)
+        self.assertLess(self.slow_session.updates, 20)
+        self.assertEqual(stats.updates + stats.skipped, 20)
+
+    def test_disconnected_session(self):
+        """
+        Test of removing of disconnected session
+        """
+        multiplexer = verse_multiplexer.VerseMultiplexer()
+        session = UpdatedSession('12350')
+        multiplexer.add_session(session)
+        session.state = 'DISCONNECTED'
+        multiplexer.update()
+        self.assertEqual(len(multiplexer), 0)
+        self.assertEqual(session.updates, 0)
+
+    def test_failing_session(self):
+        """
+        Test of removing of session that raised exception, while other
+        sessions are updated further
+        """
+        multiplexer = verse_multiplexer.VerseMultiplexer()
+        failing_session = FailingSession('12351')
+        session = UpdatedSession('12352')
+        stats = multiplexer.add_session(failing_session)
+        multiplexer.add_session(session)
+        multiplexer.update()
+        multiplexer.update()
+        self.assertEqual(session.updates, 2)
+        self.assertEqual(len(multiplexer), 1)
+        self.assertEqual(multiplexer.failed, [stats])
+        self.assertIsInstance(stats.error, RuntimeError)
+
+    def test_backlog(self):
+        """
+        Test of backlog of session
+        """
+        multiplexer = verse_multiplexer.VerseMultiplexer()
+        session = BacklogSession('12353')
+        multiplexer.add_session(session)
+        multiplexer.update()
+        report = multiplexer.backlog()
+        self.assertEqual(len(report), 1)
+        self.assertIs(report[0][0], session)
+        backlog = report[0][1]
+        self.assertLess(backlog.pop('lag'), 1.0)
+        self.assertEqual(backlog, {
+            'skipped': 0,
+            'send_queue': 2,
+            'create_ready': 1,
+            'create_waiting': 2,
+            'create_in_flight': 1,
+            'lock_requests': 1,
+            'upload_items': 6})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -89,6 +89,39 @@ class TestLockNodeCase(unittest.TestCase):
         self.assertEqual(self.node.locker, avatar)
 
 
+class TestLockManagerNodeCase(unittest.TestCase):
+    """
+    Test case of VerseNode locked by lock manager of session
+    """
+
+    node = None
+    future = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.node = vrsent.session.test_lock_node
+        cls.future = vrsent.session.test_lock_future
+        cls.tested = True
+
+    def test_future_done(self):
+        """
+        This method tests if future of lock request is resolved
+        """
+        self.assertTrue(self.future.done())
+        self.assertEqual(self.future.result(), [self.node])
+
+    def test_lock_stats(self):
+        """
+        This method tests statistics of locking of the node
+        """
+        stats = self.node.session.lock_manager.stats[self.node.id]
+        self.assertEqual(stats.acquired, 1)
+
+
 class TestOwnerPermNodeCase(unittest.TestCase):
     """
     Test case of VerseNode with access permissions
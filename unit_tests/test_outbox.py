@@ -0,0 +1,227 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Module for testing class VerseOutbox from module vrsent. These
+tests do not require running Verse server.
+"""
+
+import sys
+if sys.version >= '2.7':
+    import unittest
+else:
+    import unittest2 as unittest
+import os
+import shutil
+import tempfile
+from vrsent import verse_outbox, verse_hub
+
+
+class JournaledEntity(object):
+    """
+    Object with interface of node or layer needed by outbox
+    """
+
+    def __init__(self, custom_type, entity_id=None, node=None, parent=None):
+        """
+        Constructor of JournaledEntity
+        """
+        self.id = entity_id
+        self.custom_type = custom_type
+        self.node = node
+        self.parent = parent
+        self.data_type = 3
+        self.count = 1
+        self.items = {}
+        self.layer_queue = {}
+        self.layers = {}
+
+
+class JournaledSession(object):
+    """
+    Object with interface of session needed by outbox
+    """
+
+    def __init__(self):
+        """
+        Constructor of JournaledSession
+        """
+        self.state = 'DISCONNECTED'
+        self.nodes = {}
+
+
+class TestOutboxCase(unittest.TestCase):
+    """
+    Test case of journal of outbox
+    """
+
+    directory = None
+    outbox = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.directory = tempfile.mkdtemp()
+        cls.outbox = verse_outbox.VerseOutbox(JournaledSession(), os.path.join(cls.directory, 'outbox'))
+        node = JournaledEntity(10, entity_id=65536)
+        layer = JournaledEntity(20, node=node)
+        for index in range(100):
+            cls.outbox.item_set(layer, index % 4, (index,))
+        cls.outbox.item_set(layer, 3, None)
+        cls.outbox.node_create(JournaledEntity(30, parent=node))
+        cls.outbox.close()
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        shutil.rmtree(cls.directory)
+
+    def test_coalesced_records(self):
+        """
+        Test of keeping only the last value of each item
+        """
+        self.assertEqual(
+            list(self.outbox.records.values()),
+            [('ITEM', 65536, 20, 3, 1, 0, (96,)),
+             ('ITEM', 65536, 20, 3, 1, 1, (97,)),
+             ('ITEM', 65536, 20, 3, 1, 2, (98,)),
+             ('ITEM', 65536, 20, 3, 1, 3, None),
+             ('NODE', 0, 30, 65536)])
+
+    def test_compaction(self):
+        """
+        Test of rewriting journal with overwritten records
+        """
+        self.assertLessEqual(self.outbox.appended, self.outbox.compact_ratio * 16)
+
+    def test_reload(self):
+        """
+        Test of reading records after restart of client
+        """
+        outbox = verse_outbox.VerseOutbox(JournaledSession(), self.outbox.path)
+        self.assertEqual(list(outbox.records.values()), list(self.outbox.records.values()))
+        outbox.close()
+
+    def test_incomplete_record(self):
+        """
+        Test of removing incomplete record written before crash
+        """
+        path = os.path.join(self.directory, 'incomplete')
+        shutil.copy(self.outbox.path, path)
+        with open(path, 'ab') as journal:
+            journal.write(verse_hub.LENGTH.pack(16) + b'\x01')
+        outbox = verse_outbox.VerseOutbox(JournaledSession(), path)
+        outbox.close()
+        self.assertEqual(len(outbox), 5)
+        size = sum(len(verse_hub.frame(record)) for record in self.outbox.records.values())
+        self.assertEqual(os.path.getsize(path), size)
+
+    def test_damaged_tail(self):
+        """
+        Test of keeping records before damaged frame written before power loss
+        """
+        path = os.path.join(self.directory, 'damaged')
+        shutil.copy(self.outbox.path, path)
+        with open(path, 'ab') as journal:
+            journal.write(b'\x00' * 8)
+        outbox = verse_outbox.VerseOutbox(JournaledSession(), path)
+        outbox.close()
+        self.assertEqual(list(outbox.records.values()), list(self.outbox.records.values()))
+        size = sum(len(verse_hub.frame(record)) for record in self.outbox.records.values())
+        self.assertEqual(os.path.getsize(path), size)
+
+
+class TestOutboxReplayCase(unittest.TestCase):
+    """
+    Test case of replaying and expiration of records of outbox
+    """
+
+    directory = None
+    outbox = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.directory = tempfile.mkdtemp()
+        session = JournaledSession()
+        cls.outbox = verse_outbox.VerseOutbox(session, os.path.join(cls.directory, 'outbox'), fsync_interval=3600.0)
+        node = JournaledEntity(10, entity_id=65536)
+        cls.layer = JournaledEntity(20, entity_id=0, node=node)
+        node.layers[0] = cls.layer
+        missing_layer = JournaledEntity(20, node=JournaledEntity(10, entity_id=65540))
+        cls.outbox.item_set(cls.layer, 0, (1,))
+        cls.outbox.item_set(missing_layer, 0, (2,))
+        cls.outbox.item_set(cls.layer, 1, (3,))
+        cls.dirty = cls.outbox._dirty
+        session.state = 'CONNECTED'
+        session.nodes[65536] = node
+        cls.outbox.update()
+        cls.appended = cls.outbox.appended
+        cls.pending = list(cls.outbox.records.values())
+        cls.reloaded = verse_outbox.VerseOutbox(JournaledSession(), cls.outbox.path)
+        cls.reloaded.close()
+        # Node 65540 is never received from Verse server
+        cls.outbox.max_age = 0.0
+        cls.outbox.update()
+        cls.outbox.close()
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        shutil.rmtree(cls.directory)
+
+    def test_delayed_sync(self):
+        """
+        Test of records synchronized to the disk in interval
+        """
+        self.assertTrue(self.dirty)
+        self.assertFalse(self.outbox._dirty)
+
+    def test_replayed_records(self):
+        """
+        Test of replayed records marked in the journal without rewriting
+        """
+        self.assertEqual(self.layer.items, {0: (1,), 1: (3,)})
+        self.assertEqual(self.appended, 5)
+        self.assertEqual(self.pending, [('ITEM', 65540, 20, 3, 1, 0, (2,))])
+        self.assertEqual(list(self.reloaded.records.values()), self.pending)
+
+    def test_expired_record(self):
+        """
+        Test of record of node, which was not received from Verse server
+        """
+        self.assertEqual(list(self.outbox.expired), self.pending)
+        self.assertEqual(len(self.outbox), 0)
+        self.assertEqual(self.outbox.replayed, 2)
+        self.assertEqual(os.path.getsize(self.outbox.path), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Module for testing class VerseNodeRegistry from module vrsent. These
+tests do not require running Verse server.
+"""
+
+import sys
+if sys.version >= '2.7':
+    import unittest
+else:
+    import unittest2 as unittest
+from vrsent import verse_registry
+from test_batch import BatchSession
+
+
+class TestNodeRegistryCase(unittest.TestCase):
+    """
+    Test case of columnar registry of nodes
+    """
+
+    registry = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.registry = verse_registry.VerseNodeRegistry(session=None)
+        for node_id in range(100, 110):
+            cls.registry.add(node_id, 3, 1001, 40 + node_id % 2)
+        cls.registry.set_lock(105, 5000)
+        cls.registry.remove(100)
+        cls.tested = True
+
+    def test_registry_length(self):
+        """
+        Test of count of nodes in registry
+        """
+        self.assertEqual(len(self.registry), 9)
+        self.assertNotIn(100, self.registry)
+
+    def test_registry_row(self):
+        """
+        Test of values of node moved to removed row
+        """
+        row = self.registry.row(109)
+        self.assertEqual(row['custom_type'], 41)
+        self.assertEqual(row['parent_id'], 3)
+        self.assertEqual(row['locker_id'], None)
+
+    def test_registry_select(self):
+        """
+        Test of selecting of nodes
+        """
+        self.assertEqual(sorted(self.registry.select(custom_type=41)), [101, 103, 105, 107, 109])
+        self.assertEqual(list(self.registry.select(locked=True)), [105])
+        self.assertEqual(list(self.registry.select(custom_type=40, locked=True)), [])
+
+
+
+class TestNodeDictCase(unittest.TestCase):
+    """
+    Test case of dictionary of nodes creating nodes from registry
+    """
+
+    session = None
+    lazy = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.session = BatchSession()
+        registry = cls.session.node_registry = verse_registry.VerseNodeRegistry(cls.session, lazy=True, subscribe=True)
+        cls.session.nodes = verse_registry.VerseNodeDict(registry, cls.session.nodes)
+        registry.add(70000, 10, 1002, 80)
+        registry.add(70001, 10, 1002, 80)
+        cls.lazy = 70000 in cls.session.nodes and registry.is_materialized(70000) is False
+        cls.tested = True
+
+    def test_lazy_node(self):
+        """
+        Test of node in the registry visible by operator in and get()
+        """
+        self.assertTrue(self.lazy)
+        node = self.session.nodes.get(70000)
+        self.assertEqual(node.id, 70000)
+        self.assertIs(self.session.nodes[70000], node)
+        self.assertIsNone(self.session.nodes.get(70002))
+        self.assertNotIn(70002, self.session.nodes)
+
+    def test_subscribed_node(self):
+        """
+        Test of node subscribed by registry, when it was received. It is
+        not subscribed again, when it is created from registry.
+        """
+        node = self.session.nodes[70001]
+        self.assertTrue(node.subscribed)
+        self.assertNotIn(('node_subscribe', 70001), self.session.sent)
+        self.assertIsNone(self.session.node_registry.skip_subscribe)
+
+
+if __name__ == '__main__':
+    unittest.main()
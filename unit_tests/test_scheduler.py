@@ -0,0 +1,198 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Module for testing class VerseCreateScheduler from module vrsent. These
+tests do not require running Verse server.
+"""
+
+import sys
+if sys.version >= '2.7':
+    import unittest
+else:
+    import unittest2 as unittest
+from vrsent import verse_scheduler
+
+
+class ScheduledEntity(object):
+    """
+    Object with interface of entity needed by scheduler
+    """
+
+    def __init__(self, name, sent, prio=128, dependency=None):
+        """
+        Constructor of ScheduledEntity
+        """
+        self.id = None
+        self.name = name
+        self.prio = prio
+        self.dependency = dependency
+        self.sent = sent
+
+    def _create_dependency(self):
+        """
+        This method returns entity that has to be created first
+        """
+        return self.dependency
+
+    def _create_prio(self):
+        """
+        This method returns priority of create command
+        """
+        return self.prio
+
+    def _send_create(self):
+        """
+        This method records sending of create command
+        """
+        self.sent.append(self.name)
+
+
+def confirm(scheduler, entity, entity_id=0):
+    """
+    This function simulates receiving of create command from Verse server
+    """
+    entity.id = entity_id
+    scheduler.cb_receive_create(entity)
+
+
+class TestSchedulerOrderCase(unittest.TestCase):
+    """
+    Test case of order of create commands
+    """
+
+    scheduler = None
+    sent = []
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.scheduler = verse_scheduler.VerseCreateScheduler(session=None)
+        node = ScheduledEntity('node', cls.sent)
+        node.id = 65536
+        tg = ScheduledEntity('tg', cls.sent, dependency=node)
+        tag = ScheduledEntity('tag', cls.sent, dependency=tg)
+        cls.scheduler.schedule(tag)
+        cls.scheduler.schedule(tg)
+        cls.sent.append('-')
+        confirm(cls.scheduler, tg)
+        cls.tested = True
+
+    def test_dependency_order(self):
+        """
+        Test of sending create command after dependency is created
+        """
+        self.assertEqual(self.sent, ['tg', '-', 'tag'])
+
+    def test_priority_order(self):
+        """
+        Test of sending ready entities with higher priority first
+        """
+        sent = []
+        scheduler = verse_scheduler.VerseCreateScheduler(session=None, max_in_flight=1)
+        node = ScheduledEntity('node', sent)
+        node.id = 65536
+        blocking = ScheduledEntity('blocking', sent, dependency=node)
+        scheduler.schedule(blocking)
+        for name, prio in (('low', 10), ('high', 200), ('mid', 128)):
+            scheduler.schedule(ScheduledEntity(name, sent, prio=prio, dependency=node))
+        for entity_id in range(4):
+            confirm(scheduler, list(scheduler.in_flight)[0], entity_id)
+        self.assertEqual(sent, ['blocking', 'high', 'mid', 'low'])
+
+
+class TestSchedulerInFlightCase(unittest.TestCase):
+    """
+    Test case of limit of create commands waiting for confirmation
+    """
+
+    scheduler = None
+    entities = []
+    sent = []
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.scheduler = verse_scheduler.VerseCreateScheduler(session=None, max_in_flight=2)
+        cls.entities = [ScheduledEntity(index, cls.sent) for index in range(5)]
+        for entity in cls.entities:
+            cls.scheduler.schedule(entity)
+        cls.tested = True
+
+    def test_in_flight_limit(self):
+        """
+        Test of sending only max_in_flight create commands
+        """
+        self.assertEqual(self.sent, [0, 1])
+        confirm(self.scheduler, self.entities[0])
+        self.assertEqual(self.sent, [0, 1, 2])
+        self.assertEqual(self.scheduler.in_flight, {self.entities[1], self.entities[2]})
+
+
+class TestSchedulerForgetCase(unittest.TestCase):
+    """
+    Test case of forgetting of cleaned entities
+    """
+
+    scheduler = None
+    entities = []
+    dependent = None
+    sent = []
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.scheduler = verse_scheduler.VerseCreateScheduler(session=None, max_in_flight=1)
+        cls.entities = [ScheduledEntity(index, cls.sent) for index in range(3)]
+        for entity in cls.entities:
+            cls.scheduler.schedule(entity)
+        cls.dependent = ScheduledEntity('dependent', cls.sent, dependency=cls.entities[1])
+        cls.scheduler.schedule(cls.dependent)
+        # Forget ready entity with waiting dependent and entity in flight
+        cls.scheduler.forget(cls.entities[1])
+        cls.scheduler.forget(cls.entities[0])
+        cls.tested = True
+
+    def test_forgotten_not_sent(self):
+        """
+        Test of skipping of forgotten entity in the heap of ready entities
+        """
+        self.assertEqual(self.sent, [0, 2])
+        self.assertEqual(self.scheduler.in_flight, {self.entities[2]})
+        self.assertEqual(len(self.scheduler.forgotten), 0)
+
+    def test_forgotten_dependents(self):
+        """
+        Test of removing entities waiting for forgotten entity
+        """
+        self.assertNotIn(self.entities[1], self.scheduler.waiting)
+        self.assertNotIn(self.dependent, self.scheduler.creating_start)
+        self.assertEqual(list(self.scheduler.creating_start), [self.entities[2]])
+
+
+if __name__ == '__main__':
+    unittest.main()
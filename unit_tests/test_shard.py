@@ -0,0 +1,216 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Module for testing class VerseShard from module vrsent. These
+tests do not require running Verse server.
+"""
+
+import sys
+if sys.version >= '2.7':
+    import unittest
+else:
+    import unittest2 as unittest
+from vrsent import verse_shard, verse_shared
+from test_checkpoint import PublishingSession, node_snapshot
+
+
+class ShardedNode(object):
+    """
+    Object with interface of node needed by relinking of shard
+    """
+
+    def __init__(self, node_id, custom_type, child_nodes=()):
+        """
+        Constructor of ShardedNode
+        """
+        self.id = node_id
+        self.custom_type = custom_type
+        self.child_nodes = dict((node.id, node) for node in child_nodes)
+        self.subscribed = None
+
+    def subscribe(self):
+        """
+        This method records subscribing of node
+        """
+        self.subscribed = True
+
+    def unsubscribe(self):
+        """
+        This method records unsubscribing of node
+        """
+        self.subscribed = False
+
+
+class ShardedSession(PublishingSession):
+    """
+    Object with interface of session of shard
+    """
+
+    def __init__(self, shard, nodes):
+        """
+        Constructor of ShardedSession
+        """
+        super(ShardedSession, self).__init__()
+        self.shard = shard
+        self.nodes = nodes
+
+
+class TestShardCase(unittest.TestCase):
+    """
+    Test case of partitioning of nodes between shards
+    """
+
+    shards = []
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.shards = [verse_shard.VerseShard(index, 2) for index in range(2)]
+        for shard in cls.shards:
+            shard.assign(3, 0, 0)
+            shard.assign(65536, 3, 10)
+            shard.assign(65537, 3, 10)
+            shard.assign(65538, 65537, 11)
+        cls.tested = True
+
+    def test_system_node(self):
+        """
+        Test of system node subscribed by all shards
+        """
+        for shard in self.shards:
+            self.assertTrue(shard.is_local(3))
+
+    def test_subtree(self):
+        """
+        Test of nodes of one subtree owned by one shard
+        """
+        self.assertTrue(self.shards[0].is_local(65536))
+        self.assertFalse(self.shards[1].is_local(65536))
+        self.assertTrue(self.shards[1].is_local(65537))
+        self.assertTrue(self.shards[1].is_local(65538))
+        self.assertFalse(self.shards[0].is_local(65538))
+
+    def test_custom_type(self):
+        """
+        Test of partitioning by custom_type of root node of subtree
+        """
+        shard = verse_shard.VerseShard(0, 3, verse_shard.SHARD_BY_CUSTOM_TYPE)
+        self.assertEqual(shard.assign(65536, 3, 10), 1)
+        self.assertEqual(shard.assign(65540, 65536, 12), 1)
+        self.assertRaises(ValueError, verse_shard.VerseShard, 3, 3)
+
+    def test_published_nodes(self):
+        """
+        Test of system nodes published only by the first shard
+        """
+        self.assertTrue(self.shards[0].publishes(3))
+        self.assertFalse(self.shards[1].publishes(3))
+        self.assertFalse(self.shards[0].publishes(65537))
+        self.assertTrue(self.shards[1].publishes(65537))
+
+
+class TestShardedViewCase(unittest.TestCase):
+    """
+    Test case of merged view of nodes published by shards to shared memory
+    """
+
+    sessions = []
+    mirrors = []
+    view = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        child = ShardedNode(65539, 10)
+        nodes = {
+            3: ShardedNode(3, 0),
+            65536: ShardedNode(65536, 10),
+            65537: ShardedNode(65537, 10, [child]),
+            65539: child}
+        snapshots = {
+            3: node_snapshot(3, (0,), {}),
+            65536: node_snapshot(65536, (1,), {}),
+            65537: node_snapshot(65537, (2,), {}),
+            65539: node_snapshot(65539, (3,), {})}
+        cls.sessions = []
+        cls.mirrors = []
+        for index in range(2):
+            shard = verse_shard.VerseShard(index, 2)
+            shard.assign(3, 0, 0)
+            shard.assign(65536, 3, 10)
+            shard.assign(65537, 3, 10)
+            shard.assign(65539, 65537, 10)
+            session = ShardedSession(shard, nodes)
+            session.publish(snapshots)
+            cls.sessions.append(session)
+            cls.mirrors.append(verse_shared.VerseSharedMirror(session, size=1024 * 1024, node_filter=shard.publishes))
+        cls.client = verse_shard.VerseShardedClient(count=2)
+        cls.client.nodes = cls.view = verse_shard.VerseShardedView([mirror.name for mirror in cls.mirrors])
+        cls.changed = cls.client.update()
+        cls.keys = [reader.keys() for reader in cls.view.readers]
+        # Subtree of node 65537 is moved from shard 1 to shard 0
+        for session in cls.sessions:
+            session.shard.relink(session, 65536, 65537)
+            session.publish({65537: node_snapshot(65537, (2,), {})._replace(parent_id=65536)})
+        cls.relinked_changed = cls.client.update()
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        cls.view.close()
+        for mirror in cls.mirrors:
+            mirror.close()
+
+    def test_partitioned_nodes(self):
+        """
+        Test of nodes published by shards before relinking
+        """
+        self.assertEqual(self.changed, 2)
+        self.assertEqual(self.keys, [[3, 65536], [65537, 65539]])
+
+    def test_relinked_nodes(self):
+        """
+        Test of nodes removed from shared memory of shard, when they were
+        moved to other shard
+        """
+        self.assertEqual(self.relinked_changed, 2)
+        self.assertEqual(self.view.readers[0].keys(), [3, 65536, 65537, 65539])
+        self.assertEqual(self.view.readers[1].keys(), [])
+        self.assertEqual(self.client.ticks, [2, 2])
+
+    def test_merged_view(self):
+        """
+        Test of merged view of nodes
+        """
+        self.assertEqual(list(self.view), [3, 65536, 65537, 65539])
+        self.assertEqual(self.view[65537].parent_id, 65536)
+        self.assertNotIn(65540, self.view)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+"""
+Module for testing class VerseSharedMirrorReader from module vrsent. These
+tests do not require running Verse server.
+"""
+
+import sys
+if sys.version >= '2.7':
+    import unittest
+else:
+    import unittest2 as unittest
+from vrsent import verse_shared
+from test_checkpoint import PublishingSession, node_snapshot
+
+
+class TornReader(verse_shared.VerseSharedMirrorReader):
+    """
+    Reader, which simulates writer starting to switch slots between reading
+    of seq and header
+    """
+
+    torn = 0
+
+    def _read_index(self, buf, seq):
+        """
+        This method stamps odd seq before first reading of header
+        """
+        if self.torn == 0:
+            self.torn = seq + 1
+            verse_shared.SEQ.pack_into(buf, verse_shared.SEQ_OFFSET, seq + 1)
+            index = super(TornReader, self)._read_index(buf, seq)
+            verse_shared.SEQ.pack_into(buf, verse_shared.SEQ_OFFSET, seq)
+            return index
+        return super(TornReader, self)._read_index(buf, seq)
+
+
+class TestSharedMirrorReaderCase(unittest.TestCase):
+    """
+    Test case of reading of shared memory without copying of slots
+    """
+
+    session = None
+    mirror = None
+    reader = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.session = PublishingSession()
+        cls.session.publish({65536: node_snapshot(65536, (1,), {0: (1,)}), 65537: node_snapshot(65537, (2,), {})})
+        cls.mirror = verse_shared.VerseSharedMirror(cls.session, size=1024 * 1024)
+        cls.reader = verse_shared.VerseSharedMirrorReader(cls.mirror.name)
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        cls.reader.close()
+        cls.mirror.close()
+
+    def test_read_nodes(self):
+        """
+        Test of reading of index and node
+        """
+        self.assertEqual(self.reader.keys(), [65536, 65537])
+        self.assertEqual(dict(self.reader[65537].layers[0].items), {})
+        self.assertNotIn(65538, self.reader)
+        self.assertEqual(self.reader.seq % 2, 0)
+
+    def test_overwritten_slot(self):
+        """
+        Test of node read after writer overwrote slot of read index
+        """
+        self.reader.keys()
+        for value in range(2, 4):
+            self.session.publish({65536: node_snapshot(65536, (value,), {0: (value,)})})
+        self.assertEqual(self.reader[65536].layers[0].items[0], (3,))
+        self.assertEqual(self.reader.tick, self.session.current.tick)
+
+    def test_torn_header(self):
+        """
+        Test of rejecting header read during switching of slots
+        """
+        reader = TornReader(self.mirror.name)
+        try:
+            self.assertEqual(reader.keys(), [65536, 65537])
+            self.assertEqual(reader.torn % 2, 1)
+            self.assertEqual(reader.tick, self.session.current.tick)
+        finally:
+            reader.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
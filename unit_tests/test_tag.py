@@ -27,6 +27,190 @@ if sys.version >= '2.7':
 else:
     import unittest2 as unittest
 import vrsent
+import verse as vrs
+
+
+class TestTypedTagCase(unittest.TestCase):
+    """
+    Test case of VerseTag with typed storage of value
+    """
+
+    node = None
+    tg = None
+    tag = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.node = vrsent.session.test_node
+        cls.tg = vrsent.session.test_node.test_tg
+        cls.tag = vrsent.session.test_node.test_tg.test_typed_tag
+        cls.tested = True
+
+    def test_tag_class(self):
+        """
+        Test of class of typed tag. Typed storage is enabled only for
+        this tag and no subclass of VerseTag is registered.
+        """
+        self.assertEqual(self.tag.__class__, vrsent.VerseTag)
+        self.assertFalse(vrsent.VerseTag.typed_storage)
+
+    def test_tag_value(self):
+        """
+        Test of tuple value of typed tag. Tuple is not created again,
+        when array was not changed.
+        """
+        self.assertEqual(self.tag.value, (1.0, 2.0, 3.0, 4.0))
+        self.assertIs(self.tag.value, self.tag.value)
+
+    def test_tag_array(self):
+        """
+        Test of value stored in array
+        """
+        self.assertIs(self.tag.as_array(), self.tag.as_array())
+        self.assertEqual(self.tag.as_array().typecode, 'f')
+
+    def test_tag_items(self):
+        """
+        Test of accessors of items of value
+        """
+        self.assertEqual((self.tag.x, self.tag.y, self.tag.z, self.tag.w), (1.0, 2.0, 3.0, 4.0))
+
+    def test_tag_sent_value(self):
+        """
+        Test of sending value without caching tuple of array
+        """
+        self.tag._tuple = None
+        self.tag._send_value()
+        self.assertIsNone(self.tag._tuple)
+
+    def test_tag_invalid_value(self):
+        """
+        Test of array, which is not changed by value with item out of range
+        """
+        tag = vrsent.VerseTag(
+            tg=self.tg,
+            tag_id=None,
+            data_type=vrs.VALUE_TYPE_UINT8,
+            count=2,
+            custom_type=70)
+        tag.typed_storage = True
+        tag.value = (1, 2)
+        buf = tag.as_array()
+        with self.assertRaises(OverflowError):
+            tag.value = (3, 300)
+        self.assertIs(tag.as_array(), buf)
+        self.assertEqual(tag.value, (1, 2))
+        tag.destroy()
+
+    def test_tag_last_sent(self):
+        """
+        Test of last sent value, which is not stored, when suppressing of
+        unchanged values is disabled
+        """
+        self.assertIsNone(self.tag._last_sent)
+
+    def test_tag_without_value(self):
+        """
+        Test of setting item of tag without value and array of string value
+        """
+        tag = vrsent.VerseTag(
+            tg=self.tg,
+            tag_id=None,
+            data_type=vrs.VALUE_TYPE_REAL32,
+            count=3,
+            custom_type=67)
+        tag.y = 2.0
+        self.assertEqual(tag.value, (0.0, 2.0, 0.0))
+        string_tag = vrsent.VerseTag(
+            tg=self.tg,
+            tag_id=None,
+            data_type=vrs.VALUE_TYPE_STRING8,
+            custom_type=68,
+            value=('text',))
+        with self.assertRaises(TypeError):
+            string_tag.as_array()
+        tag.destroy()
+        string_tag.destroy()
+
+    def test_estimated_tag(self):
+        """
+        Test of new values checked against estimated data_type
+        """
+        vrsent.VerseTag.data_type_mode = vrsent.verse_entity.DATA_TYPE_NARROWEST
+        try:
+            tag = vrsent.VerseTag(tg=self.tg, tag_id=None, custom_type=69, value=(5,))
+        finally:
+            vrsent.VerseTag.data_type_mode = vrsent.verse_entity.DATA_TYPE_WIDEST
+        self.assertEqual(tag.data_type, vrs.VALUE_TYPE_UINT8)
+        with self.assertRaises(ValueError):
+            tag.value = (300,)
+        with self.assertRaises(ValueError):
+            tag.x = 256
+        self.assertEqual(tag.value, (5,))
+        tag.value = (255,)
+        self.assertEqual(tag.value, (255,))
+        tag.destroy()
+
+
+class TestSuppressedTagCase(unittest.TestCase):
+    """
+    Test case of suppressing of unchanged values of VerseTag with typed
+    storage of real numbers
+    """
+
+    tag = None
+    suppressed = None
+    tested = False
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.tag = vrsent.session.test_node.test_tg.test_typed_tag
+        vrsent.session.suppress_unchanged = True
+        suppressed = vrsent.session.suppressed_cmds.get('tag_set_values', 0)
+        # Value 0.1 can not be stored in float32 exactly, but it is
+        # compared with last sent value and not with stored value
+        cls.tag.value = (0.1, 0.2, 0.3, 0.4)
+        cls.tag.value = (0.1, 0.2, 0.3, 0.4)
+        cls.suppressed1 = vrsent.session.suppressed_cmds.get('tag_set_values', 0) - suppressed
+        # Value in epsilon from last sent value is not sent, but it is
+        # stored locally
+        vrsent.session.suppress_epsilon = 0.5
+        cls.tag.value = (0.5, 0.5, 0.5, 0.5)
+        cls.value = cls.tag.value
+        cls.tag.value = (0.75, 0.5, 0.5, 0.5)
+        cls.suppressed2 = vrsent.session.suppressed_cmds.get('tag_set_values', 0) - suppressed
+        cls.tested = True
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        This method is called after all tests are performed
+        """
+        vrsent.session.suppress_unchanged = False
+        vrsent.session.suppress_epsilon = None
+        cls.tag.value = (1.0, 2.0, 3.0, 4.0)
+
+    def test_suppressed_value(self):
+        """
+        Test of suppressed value equal to last sent value
+        """
+        self.assertEqual(self.suppressed1, 1)
+
+    def test_suppressed_epsilon(self):
+        """
+        Test of values in epsilon from last sent value
+        """
+        self.assertEqual(self.suppressed2, 2)
+        self.assertEqual(self.value, (0.5, 0.5, 0.5, 0.5))
+        self.assertEqual(self.tag.value, (0.75, 0.5, 0.5, 0.5))
+        self.assertEqual(self.tag._last_sent, (0.75, 0.5, 0.5, 0.5))
 
 
 class TestChangedTagCase(unittest.TestCase):
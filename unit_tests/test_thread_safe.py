@@ -0,0 +1,313 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Module for testing queue of calls of thread safe VerseSession from module
+vrsent. These tests do not require running Verse server.
+"""
+
+import sys
+if sys.version >= '2.7':
+    import unittest
+else:
+    import unittest2 as unittest
+import collections
+import threading
+import time
+from vrsent import verse_session, verse_node, verse_tag_group, verse_tag, verse_layer
+from test_bridge import BridgedSession
+
+
+class QueuedSession(object):
+    """
+    Object with queue of calls of thread safe session. Methods of queue
+    are methods of VerseSession.
+    """
+
+    in_callback_thread = verse_session.VerseSession.in_callback_thread
+    call_in_callback = verse_session.VerseSession.call_in_callback
+    send_queued = verse_session.VerseSession.send_queued
+
+    def __init__(self, tick_time):
+        """
+        Constructor of QueuedSession
+        """
+        self.thread_safe = True
+        self.lock = threading.RLock()
+        self.send_queue = collections.deque()
+        self._callback_thread = None
+        self.tick_time = tick_time
+        self.sent = []
+        self.sent_threads = set()
+        self.ticks = 0
+
+    def send_value(self, value):
+        """
+        This method simulates sending of command
+        """
+        self.sent.append(value)
+        self.sent_threads.add(threading.current_thread().ident)
+
+    def callback_update(self):
+        """
+        This method simulates callback_update() holding lock of session
+        during processing of received commands
+        """
+        with self.lock:
+            self._callback_thread = threading.current_thread().ident
+            self.send_queued()
+            time.sleep(self.tick_time)
+            self.ticks += 1
+
+
+class TestThreadSafeCase(unittest.TestCase):
+    """
+    Test case of producer thread changing values, when callback thread
+    is processing received commands
+    """
+
+    session = None
+    callback_thread = None
+    max_latency = 0.0
+    count = 200
+    tested = False
+
+    @classmethod
+    def run_callback(cls):
+        """
+        Loop of callback thread
+        """
+        while len(cls.session.sent) < cls.count:
+            cls.session.callback_update()
+        cls.session.callback_update()
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.session = QueuedSession(tick_time=0.05)
+        cls.callback_thread = threading.Thread(target=cls.run_callback)
+        cls.callback_thread.daemon = True
+        cls.callback_thread.start()
+        while cls.session._callback_thread is None:
+            time.sleep(0.001)
+        for value in range(cls.count):
+            start = time.time()
+            cls.session.call_in_callback(cls.session.send_value, value)
+            cls.max_latency = max(cls.max_latency, time.time() - start)
+            time.sleep(0.0005)
+        cls.callback_thread.join(10.0)
+        cls.tested = True
+
+    def test_order(self):
+        """
+        Test of sending all values in order
+        """
+        self.assertFalse(self.callback_thread.is_alive())
+        self.assertEqual(self.session.sent, list(range(self.count)))
+
+    def test_callback_thread(self):
+        """
+        Test of sending values only by callback thread
+        """
+        self.assertEqual(self.session.sent_threads, {self.callback_thread.ident})
+
+    def test_no_waiting(self):
+        """
+        Test of producer not waiting for the end of tick
+        """
+        self.assertGreater(self.session.ticks, 1)
+        self.assertLess(self.max_latency, self.session.tick_time / 2)
+
+
+class EntitySession(BridgedSession):
+    """
+    Object with interface of thread safe session needed by nodes, tags
+    and layers. Sent commands are stored with identifier of sending thread.
+    """
+
+    _queue_sends = verse_session.VerseSession._queue_sends
+
+    def __init__(self):
+        """
+        Constructor of EntitySession
+        """
+        # Avatar node is subscribed in constructor of parent class
+        self.sent_threads = set()
+        super(EntitySession, self).__init__()
+        self.thread_safe = True
+        self.lock = threading.RLock()
+        self.errors = []
+        self.ticks = 0
+        self._queue_sends()
+
+    def send_node_subscribe(self, prio, node_id, version, crc32):
+        """
+        This method simulates sending of node subscribe command
+        """
+        self.sent.append(('node_subscribe', node_id))
+        self.sent_threads.add(threading.current_thread().ident)
+
+    def send_taggroup_subscribe(self, prio, node_id, tg_id, version, crc32):
+        """
+        This method simulates sending of tag group subscribe command
+        """
+        self.sent.append(('taggroup_subscribe', node_id, tg_id))
+        self.sent_threads.add(threading.current_thread().ident)
+
+    def send_tag_set_values(self, prio, node_id, tg_id, tag_id, data_type, value):
+        """
+        This method simulates sending of tag set values command
+        """
+        self.sent.append(('tag_set_values', tag_id, value))
+        self.sent_threads.add(threading.current_thread().ident)
+
+    def send_layer_set_value(self, prio, node_id, layer_id, item_id, data_type, value):
+        """
+        This method simulates sending of layer set value command
+        """
+        self.sent.append(('layer_set_value', item_id, value))
+        self.sent_threads.add(threading.current_thread().ident)
+
+    def send_layer_unset_value(self, prio, node_id, layer_id, item_id):
+        """
+        This method simulates sending of layer unset value command
+        """
+        self.sent.append(('layer_unset_value', item_id))
+        self.sent_threads.add(threading.current_thread().ident)
+
+    def callback_update(self, layer, tag, first_id, count):
+        """
+        This method simulates receiving of values of items and tag, when
+        other thread is changing them. Items of layer are read too.
+        """
+        with self.lock:
+            self._callback_thread = threading.current_thread().ident
+            try:
+                self.send_queued()
+                for item_id in range(first_id, first_id + count):
+                    verse_layer.VerseLayer.cb_receive_layer_set_value(
+                        self, layer.node.id, layer.id, item_id, (float(item_id),))
+                    sum(value[0] for value in layer.items.values())
+                verse_tag.VerseTag.cb_receive_tag_set_values(
+                    self, tag.tg.node.id, tag.tg.id, tag.id, (float(first_id),))
+            except Exception as error:
+                self.errors.append(error)
+            self.ticks += 1
+
+
+class TestThreadSafeEntityCase(unittest.TestCase):
+    """
+    Test case of producer thread changing values of real tag and items of
+    layer, when callback thread is receiving values of other items and tag
+    """
+
+    session = None
+    layer = None
+    tag = None
+    received_tag = None
+    callback_thread = None
+    count = 2000
+    received_id = 100000
+    received_count = 50
+    tested = False
+
+    @classmethod
+    def run_callback(cls, done):
+        """
+        Loop of callback thread
+        """
+        first_id = cls.received_id
+        while done.is_set() is False or len(cls.session.send_queue) > 0:
+            cls.session.callback_update(cls.layer, cls.received_tag, first_id, cls.received_count)
+            first_id += cls.received_count
+        cls.session.callback_update(cls.layer, cls.received_tag, first_id, 0)
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        This method is called before any test is performed
+        """
+        cls.session = EntitySession()
+        node = verse_node.VerseNode(
+            session=cls.session,
+            node_id=65536,
+            parent=cls.session.nodes[cls.session.avatar_id],
+            user_id=cls.session.user_id,
+            custom_type=40)
+        tg = verse_tag_group.VerseTagGroup(node=node, tg_id=0, custom_type=41)
+        cls.tag = verse_tag.VerseTag(tg=tg, tag_id=0, data_type=4, count=1, custom_type=42)
+        cls.received_tag = verse_tag.VerseTag(tg=tg, tag_id=1, data_type=4, count=1, custom_type=43)
+        cls.layer = verse_layer.VerseLayer(node=node, layer_id=0, data_type=4, count=1, custom_type=44)
+        del cls.session.sent[:]
+        cls.session.sent_threads.clear()
+        done = threading.Event()
+        cls.callback_thread = threading.Thread(target=cls.run_callback, args=(done,))
+        cls.callback_thread.daemon = True
+        cls.callback_thread.start()
+        while cls.session._callback_thread is None:
+            time.sleep(0.001)
+        for item_id in range(cls.count):
+            cls.layer.items[item_id] = (float(item_id),)
+            cls.tag.value = (float(item_id),)
+            if item_id % 2 == 1:
+                cls.layer.items.pop(item_id)
+        done.set()
+        cls.callback_thread.join(10.0)
+        cls.tested = True
+
+    def test_sent_items(self):
+        """
+        Test of sending all items changed by producer thread and no
+        received item
+        """
+        self.assertFalse(self.callback_thread.is_alive())
+        self.assertEqual(self.session.errors, [])
+        set_ids = [cmd[1] for cmd in self.session.sent if cmd[0] == 'layer_set_value']
+        unset_ids = [cmd[1] for cmd in self.session.sent if cmd[0] == 'layer_unset_value']
+        self.assertEqual(set_ids, list(range(self.count)))
+        self.assertEqual(unset_ids, list(range(1, self.count, 2)))
+
+    def test_sent_tag(self):
+        """
+        Test of sending all values of tag changed by producer thread
+        """
+        values = [cmd[2] for cmd in self.session.sent if cmd[0] == 'tag_set_values']
+        self.assertEqual(values, [(float(item_id),) for item_id in range(self.count)])
+        self.assertEqual(self.tag.value, (float(self.count - 1),))
+
+    def test_callback_thread(self):
+        """
+        Test of sending commands only by callback thread
+        """
+        self.assertEqual(self.session.sent_threads, {self.callback_thread.ident})
+
+    def test_items(self):
+        """
+        Test of items changed by producer thread and received items
+        """
+        self.assertGreater(self.session.ticks, 1)
+        local_ids = set(item_id for item_id in self.layer.items if item_id < self.received_id)
+        self.assertEqual(local_ids, set(range(0, self.count, 2)))
+        received = [item_id for item_id in self.layer.items if item_id >= self.received_id]
+        self.assertEqual(len(received), (self.session.ticks - 1) * self.received_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -57,6 +57,8 @@ class TestSession(vrsent.VerseSession):
         self.test_destroy_node = None
         self.test_subclass_node = None
         self.test_subscribe_node = None
+        self.test_lock_node = None
+        self.test_lock_future = None
 
     def cb_receive_connect_accept(self, user_id, avatar_id):
         """
@@ -113,6 +115,15 @@ class TestSession(vrsent.VerseSession):
             self.test_node.lock()
             # TODO: Test of setting node permission
 
+            # Create node for testing of locking by lock manager
+            self.test_lock_node = vrsent.VerseNode(
+                session=self,
+                node_id=None,
+                parent=None,
+                user_id=None,
+                custom_type=37)
+            self.test_lock_future = self.lock_manager.lock(self.test_lock_node, timeout=5.0)
+
             # Create node for testing changing link between nodes
             self.test_link_node = vrsent.VerseNode(
                 session=self,
@@ -157,6 +168,16 @@ class TestSession(vrsent.VerseSession):
                 custom_type=64,
                 value=(123,))
 
+            # Create new tag with typed storage of value
+            self.test_node.test_tg.test_typed_tag = vrsent.VerseTag(
+                tg=self.test_node.test_tg,
+                tag_id=None,
+                data_type=vrs.VALUE_TYPE_REAL32,
+                count=4,
+                custom_type=66)
+            self.test_node.test_tg.test_typed_tag.typed_storage = True
+            self.test_node.test_tg.test_typed_tag.value = (1.0, 2.0, 3.0, 4.0)
+
             # Create new tag for testing of tag destroying
             self.test_node.test_tg.test_destroy_tag = vrsent.VerseTag(
                 tg=self.test_node.test_tg,
@@ -287,6 +308,10 @@ class TestSession(vrsent.VerseSession):
             unittest.TextTestRunner(verbosity=self.verbosity).run(suite)
             # Try to unlock the node
             locked_node.unlock()
+        elif locked_node == self.test_lock_node:
+            suite = unittest.TestLoader().loadTestsFromTestCase(test_node.TestLockManagerNodeCase)
+            unittest.TextTestRunner(verbosity=self.verbosity).run(suite)
+            self.lock_manager.unlock_nodes([locked_node])
 
     def cb_receive_node_unlock(self, node_id, avatar_id):
         """
@@ -364,6 +389,10 @@ class TestSession(vrsent.VerseSession):
             test_destroy_tag = self.test_node.test_tg.test_destroy_tag
         except AttributeError:
             test_destroy_tag = None
+        try:
+            test_typed_tag = self.test_node.test_tg.test_typed_tag
+        except AttributeError:
+            test_typed_tag = None
         try:
             test_subclass_tag = self.test_subclass_node.test_tg.test_tag
         except AttributeError:
@@ -376,6 +405,12 @@ class TestSession(vrsent.VerseSession):
         elif tag == test_destroy_tag:
             suite = unittest.TestLoader().loadTestsFromTestCase(test_tag.TestDestroyingTagCase)
             unittest.TextTestRunner(verbosity=self.verbosity).run(suite)
+        # Start unit testing of tag with typed storage
+        elif tag == test_typed_tag:
+            suite = unittest.TestLoader().loadTestsFromTestCase(test_tag.TestTypedTagCase)
+            unittest.TextTestRunner(verbosity=self.verbosity).run(suite)
+            suite = unittest.TestLoader().loadTestsFromTestCase(test_tag.TestSuppressedTagCase)
+            unittest.TextTestRunner(verbosity=self.verbosity).run(suite)
         # Start unit testing of VerseTag subclass
         elif tag == test_subclass_tag:
             suite = unittest.TestLoader().loadTestsFromTestCase(test_subclasses.TestSubclassTagCase)
@@ -424,6 +459,26 @@ class TestSession(vrsent.VerseSession):
         suite = None
         if layer == self.test_node.test_layer:
             suite = unittest.TestLoader().loadTestsFromTestCase(test_layer.TestCreatedLayerCase)
+            unittest.TextTestRunner(verbosity=self.verbosity).run(suite)
+            suite = unittest.TestLoader().loadTestsFromTestCase(test_layer.TestLayerAggregateCase)
+            unittest.TextTestRunner(verbosity=self.verbosity).run(suite)
+            suite = unittest.TestLoader().loadTestsFromTestCase(test_layer.TestLayerGridCase)
+            unittest.TextTestRunner(verbosity=self.verbosity).run(suite)
+            suite = unittest.TestLoader().loadTestsFromTestCase(test_layer.TestEstimatedLayerCase)
+            unittest.TextTestRunner(verbosity=self.verbosity).run(suite)
+            suite = unittest.TestLoader().loadTestsFromTestCase(test_layer.TestSuppressedLayerCase)
+            unittest.TextTestRunner(verbosity=self.verbosity).run(suite)
+            suite = unittest.TestLoader().loadTestsFromTestCase(test_layer.TestMappedLayerCase)
+            unittest.TextTestRunner(verbosity=self.verbosity).run(suite)
+            suite = unittest.TestLoader().loadTestsFromTestCase(test_layer.TestLayerChangesCase)
+            unittest.TextTestRunner(verbosity=self.verbosity).run(suite)
+            suite = unittest.TestLoader().loadTestsFromTestCase(test_layer.TestLayerUploadCase)
+            unittest.TextTestRunner(verbosity=self.verbosity).run(suite)
+            suite = unittest.TestLoader().loadTestsFromTestCase(test_layer.TestLayerSnapshotCase)
+            unittest.TextTestRunner(verbosity=self.verbosity).run(suite)
+            suite = unittest.TestLoader().loadTestsFromTestCase(test_layer.TestSharedMirrorCase)
+            unittest.TextTestRunner(verbosity=self.verbosity).run(suite)
+            suite = unittest.TestLoader().loadTestsFromTestCase(test_layer.TestHubCase)
         elif layer == self.test_node.test_destroy_layer:
             suite = unittest.TestLoader().loadTestsFromTestCase(test_layer.TestDestroyingLayerCase)
         elif layer == self.test_subclass_node.test_layer:
@@ -492,6 +547,8 @@ def main(hostname, service, debug, username, password):
                 # Test VerseAvatars
                 avatar_suite = unittest.TestLoader().loadTestsFromTestCase(test_avatar.TestAvatarCase)
                 unittest.TextTestRunner(verbosity=vrsent.session.verbosity).run(avatar_suite)
+                presence_suite = unittest.TestLoader().loadTestsFromTestCase(test_avatar.TestPresenceCase)
+                unittest.TextTestRunner(verbosity=vrsent.session.verbosity).run(presence_suite)
                 # Print summary of test cases
                 print('Test Cases Summary:')
                 # Check if all test cases were performed
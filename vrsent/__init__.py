@@ -21,7 +21,7 @@ This module implements object model of data shared at Verse server. It
 provides classes for Node, TagGroup, Tag, Layer, User and Avatar.
 """
 
-from . import verse_session, verse_node, verse_tag_group, verse_tag, verse_layer, verse_user, verse_avatar
+from . import verse_session, verse_node, verse_tag_group, verse_tag, verse_layer, verse_user, verse_avatar, verse_lock, verse_scheduler, verse_registry, verse_lazy, verse_aggregate, verse_spatial, verse_mmap, verse_upload, verse_presence, verse_snapshot, verse_executor, verse_multiplexer, verse_shard, verse_shared, verse_hub, verse_bridge, verse_outbox, verse_checkpoint
 
 # Copy classes to this namespace
 VerseSession = verse_session.VerseSession
@@ -0,0 +1,285 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+"""
+This module includes aggregates of items of VerseLayer (count, sum,
+bounding box and histogram). Aggregates are updated incrementally after
+each change of items received from Verse server or set by this client.
+Thus current value of aggregate could be read without iterating over
+all items of layer.
+"""
+
+
+import math
+from . import verse_layer
+
+
+def components(value):
+    """
+    This function returns value of item as tuple of components
+    """
+    if isinstance(value, (tuple, list)):
+        return value
+    else:
+        return (value,)
+
+
+class VerseLayerCount(verse_layer.VerseLayerObserver):
+    """
+    Aggregate with count of items in the layer
+    """
+
+    def __init__(self):
+        """
+        Constructor of VerseLayerCount
+        """
+        super(VerseLayerCount, self).__init__()
+        self.value = 0
+
+    def reset(self):
+        """
+        This method resets count of items
+        """
+        self.value = 0
+
+    def item_set(self, item_id, old_value, new_value):
+        """
+        This method counts new items
+        """
+        if old_value is None:
+            self.value += 1
+
+    def item_unset(self, item_id, old_value):
+        """
+        This method counts removed items
+        """
+        self.value -= 1
+
+
+class VerseLayerSum(verse_layer.VerseLayerObserver):
+    """
+    Aggregate with sum of each component of items in the layer. It also
+    provides mean value of components.
+    """
+
+    def __init__(self):
+        """
+        Constructor of VerseLayerSum
+        """
+        super(VerseLayerSum, self).__init__()
+        self._sums = []
+        self.count = 0
+
+    @property
+    def value(self):
+        """
+        Getter of sums of components
+        """
+        return tuple(self._sums)
+
+    @property
+    def mean(self):
+        """
+        Getter of mean values of components. It returns None for empty layer.
+        """
+        if self.count == 0:
+            return None
+        return tuple(item_sum / self.count for item_sum in self._sums)
+
+    def reset(self):
+        """
+        This method resets sums
+        """
+        self._sums = []
+        self.count = 0
+
+    def _add(self, value, sign):
+        """
+        This method adds (sign=1) or subtracts (sign=-1) components of value
+        """
+        value = components(value)
+        if len(self._sums) < len(value):
+            self._sums.extend([0] * (len(value) - len(self._sums)))
+        for index, item in enumerate(value):
+            self._sums[index] += sign * item
+
+    def item_set(self, item_id, old_value, new_value):
+        """
+        This method replaces old value with new value in sums
+        """
+        if old_value is None:
+            self.count += 1
+        else:
+            self._add(old_value, -1)
+        self._add(new_value, 1)
+
+    def item_unset(self, item_id, old_value):
+        """
+        This method subtracts removed value from sums
+        """
+        self.count -= 1
+        self._add(old_value, -1)
+
+
+class VerseLayerBoundingBox(verse_layer.VerseLayerObserver):
+    """
+    Aggregate with axis aligned bounding box of items in the layer (e.g.
+    positions of vertices). Growing of the bounding box is computed in
+    constant time. When item lying at the border of bounding box is moved
+    or removed, then bounding box is recomputed, when it is accessed.
+    """
+
+    def __init__(self):
+        """
+        Constructor of VerseLayerBoundingBox
+        """
+        super(VerseLayerBoundingBox, self).__init__()
+        self._min = None
+        self._max = None
+        self.dirty = False
+        self.rescans = 0
+
+    @property
+    def value(self):
+        """
+        Getter of bounding box (tuple of min and max corner). It returns
+        None for empty layer.
+        """
+        if self.dirty is True:
+            self.rebuild()
+        if self._min is None:
+            return None
+        return tuple(self._min), tuple(self._max)
+
+    def reset(self):
+        """
+        This method resets bounding box
+        """
+        self._min = None
+        self._max = None
+        self.dirty = False
+
+    def rebuild(self):
+        """
+        This method computes bounding box from all items of layer
+        """
+        super(VerseLayerBoundingBox, self).rebuild()
+        self.rescans += 1
+
+    def _on_border(self, value):
+        """
+        This method returns True, when any component of value lies at
+        the border of bounding box
+        """
+        for index, item in enumerate(components(value)):
+            if item == self._min[index] or item == self._max[index]:
+                return True
+        return False
+
+    def item_set(self, item_id, old_value, new_value):
+        """
+        This method grows bounding box
+        """
+        if self.dirty is True:
+            return
+        if old_value is not None and self._on_border(old_value) is True:
+            self.dirty = True
+            return
+        new_value = components(new_value)
+        if self._min is None:
+            self._min = list(new_value)
+            self._max = list(new_value)
+        else:
+            for index, item in enumerate(new_value):
+                if item < self._min[index]:
+                    self._min[index] = item
+                elif item > self._max[index]:
+                    self._max[index] = item
+
+    def item_unset(self, item_id, old_value):
+        """
+        This method marks bounding box as dirty, when border item was removed
+        """
+        if self.dirty is False and self._on_border(old_value) is True:
+            self.dirty = True
+
+
+class VerseLayerHistogram(verse_layer.VerseLayerObserver):
+    """
+    Aggregate with histogram of one component of items in the layer. When
+    bin_size is None, then each distinct value has its own bin. Otherwise
+    the bin of item is floor(value / bin_size).
+    """
+
+    def __init__(self, component=0, bin_size=None):
+        """
+        Constructor of VerseLayerHistogram
+        """
+        super(VerseLayerHistogram, self).__init__()
+        self.component = component
+        self.bin_size = bin_size
+        self.bins = {}
+
+    @property
+    def value(self):
+        """
+        Getter of histogram (dictionary with counts of items in bins)
+        """
+        return dict(self.bins)
+
+    def bin(self, value):
+        """
+        This method returns bin of value
+        """
+        item = components(value)[self.component]
+        if self.bin_size is None:
+            return item
+        else:
+            return int(math.floor(item / self.bin_size))
+
+    def reset(self):
+        """
+        This method resets histogram
+        """
+        self.bins = {}
+
+    def _add(self, value, count):
+        """
+        This method changes count of items in bin of value
+        """
+        key = self.bin(value)
+        count += self.bins.get(key, 0)
+        if count == 0:
+            self.bins.pop(key, None)
+        else:
+            self.bins[key] = count
+
+    def item_set(self, item_id, old_value, new_value):
+        """
+        This method moves item to new bin
+        """
+        if old_value is not None:
+            self._add(old_value, -1)
+        self._add(new_value, 1)
+
+    def item_unset(self, item_id, old_value):
+        """
+        This method removes item from its bin
+        """
+        self._add(old_value, -1)
@@ -21,7 +21,7 @@ This module include class VerseAvatar representing verse avatar/client
 """
 
 import verse as vrs
-from . import verse_node, verse_tag_group, verse_tag
+from . import verse_node, verse_tag_group, verse_tag, verse_presence, verse_user
 
 
 # TODO: this should be in verse module too
@@ -32,7 +32,59 @@ TAG_CLIENT_NAME_CT = 2
 TAG_CLIENT_VERSION_CT = 3
 
 
-class HostnameTag(verse_tag.VerseTag):
+class PresenceInfoTag(verse_user.SystemTag):
+    """
+    Mixin class of tags of avatar info node. Received value of tag is
+    stored in the presence directory of session (session.presence)
+    """
+
+    # Name of field of presence record
+    presence_field = None
+
+    @classmethod
+    def cb_receive_tag_set_values(cls, session, node_id, tg_id, tag_id, value):
+        """
+        This method stores received value in the record of avatar
+        """
+        tag = super(PresenceInfoTag, cls).cb_receive_tag_set_values(session, node_id, tg_id, tag_id, value)
+        if tag is not None and tag.tg.node.parent is not None:
+            session.presence.set_info(tag.tg.node.parent.id, cls.presence_field, value[0])
+        return tag
+
+    @classmethod
+    def cb_receive_tag_create(cls, session, node_id, tg_id, tag_id, data_type, count, custom_type):
+        """
+        This method adds reference at received tag to the info tag group
+        (e.g. tg_info.tag_hostname)
+        """
+        tag = super(PresenceInfoTag, cls).cb_receive_tag_create(
+            session, node_id, tg_id, tag_id, data_type, count, custom_type)
+        if tag is not None:
+            setattr(tag.tg, 'tag_' + cls.presence_field, tag)
+        return tag
+
+
+class AvatarInfoTagGroup(verse_user.SystemTagGroup, verse_tag_group.VerseTagGroup):
+    """
+    VerseTagGroup subclass of tag group with information about avatar
+    """
+
+    custom_type = TG_INFO_CT
+    node_custom_type = vrs.AVATAR_INFO_NODE_CT
+
+    @classmethod
+    def cb_receive_tg_create(cls, session, node_id, tg_id, custom_type):
+        """
+        This method adds reference at received tag group to the avatar
+        info node (info_node.tg_info)
+        """
+        tg = super(AvatarInfoTagGroup, cls).cb_receive_tg_create(session, node_id, tg_id, custom_type)
+        if tg is not None:
+            tg.node.tg_info = tg
+        return tg
+
+
+class HostnameTag(PresenceInfoTag, verse_tag.VerseTag):
     """
     VerseTag subclass for storing hostname
     """
@@ -40,6 +92,7 @@ class HostnameTag(verse_tag.VerseTag):
     custom_type = TAG_HOSTNAME_CT
     tg_custom_type = TG_INFO_CT
     node_custom_type = vrs.AVATAR_INFO_NODE_CT
+    presence_field = 'hostname'
 
     def __init__(self, tg, tag_id=None, data_type=vrs.VALUE_TYPE_STRING8,
                  count=1, custom_type=TAG_HOSTNAME_CT, value=None):
@@ -55,7 +108,7 @@ class HostnameTag(verse_tag.VerseTag):
             value=value)
 
 
-class LoginTimeTag(verse_tag.VerseTag):
+class LoginTimeTag(PresenceInfoTag, verse_tag.VerseTag):
     """
     VerseTag subclass for storing login time
     """
@@ -63,6 +116,7 @@ class LoginTimeTag(verse_tag.VerseTag):
     custom_type = TAG_LOGIN_TIME_CT
     tg_custom_type = TG_INFO_CT
     node_custom_type = vrs.AVATAR_INFO_NODE_CT
+    presence_field = 'login_time'
 
     def __init__(self, tg, tag_id=None, data_type=vrs.VALUE_TYPE_UINT64,
                  count=1, custom_type=TAG_LOGIN_TIME_CT, value=None):
@@ -78,7 +132,7 @@ class LoginTimeTag(verse_tag.VerseTag):
             value=value)
 
 
-class ClientNameTag(verse_tag.VerseTag):
+class ClientNameTag(PresenceInfoTag, verse_tag.VerseTag):
     """
     VerseTag subclass for storing client name
     """
@@ -86,6 +140,7 @@ class ClientNameTag(verse_tag.VerseTag):
     custom_type = TAG_CLIENT_NAME_CT
     tg_custom_type = TG_INFO_CT
     node_custom_type = vrs.AVATAR_INFO_NODE_CT
+    presence_field = 'client_name'
 
     def __init__(self, tg, tag_id=None, data_type=vrs.VALUE_TYPE_STRING8,
                  count=1, custom_type=TAG_CLIENT_NAME_CT, value=None):
@@ -101,7 +156,7 @@ class ClientNameTag(verse_tag.VerseTag):
             value=value)
 
 
-class ClientVersionTag(verse_tag.VerseTag):
+class ClientVersionTag(PresenceInfoTag, verse_tag.VerseTag):
     """
     VerseTag subclass for storing client version
     """
@@ -109,6 +164,7 @@ class ClientVersionTag(verse_tag.VerseTag):
     custom_type = TAG_CLIENT_VERSION_CT
     tg_custom_type = TG_INFO_CT
     node_custom_type = vrs.AVATAR_INFO_NODE_CT
+    presence_field = 'client_version'
 
     def __init__(self, tg, tag_id=None, data_type=vrs.VALUE_TYPE_STRING8,
                  count=1, custom_type=TAG_CLIENT_VERSION_CT, value=None):
@@ -124,9 +180,14 @@ class ClientVersionTag(verse_tag.VerseTag):
             value=value)
 
 
-class VerseAvatarInfo(verse_node.VerseNode):
+class VerseAvatarInfo(verse_user.SystemNode, verse_node.VerseNode):
     """
-    Class storing information about Verse avatar/client
+    Class storing information about Verse avatar/client. The tag group
+    tg_info and its tags (tag_hostname, tag_login_time, tag_client_name and
+    tag_client_version) are not created by client, but they are received
+    from Verse server. Thus tg_info is None and the tags are not available
+    until they are received. Values of these tags are also stored in the
+    presence directory of session (session.presence).
     """
 
     custom_type = vrs.AVATAR_INFO_NODE_CT
@@ -139,16 +200,12 @@ class VerseAvatarInfo(verse_node.VerseNode):
         super(VerseAvatarInfo, self).__init__(*args, **kwargs)
         # Add reference to parent (avatar) node
         self.parent.info_node = self
-        # Create tag group with info information due to specification
-        self.tg_info = verse_tag_group.VerseTagGroup(node=self, custom_type=TG_INFO_CT)
-        # Create tags due to specification
-        self.tg_info.tag_hostname = HostnameTag(tg=self.tg_info)
-        self.tg_info.tag_login_time = LoginTimeTag(tg=self.tg_info)
-        self.tg_info.tag_client_name = ClientNameTag(tg=self.tg_info)
-        self.tg_info.tag_client_version = ClientVersionTag(tg=self.tg_info)
+        # Tag group and tags are created by Verse server. They are
+        # bound to this node, when they are received
+        self.tg_info = None
 
 
-class VerseAvatar(verse_node.VerseNode):
+class VerseAvatar(verse_user.SystemNode, verse_node.VerseNode):
     """
     Class representing Verse avatar/client
     """
@@ -166,94 +223,58 @@ class VerseAvatar(verse_node.VerseNode):
         self._user_id = None
         # Add this avatar to the list of avatars
         self.session.avatars[self.id] = self
+        self.session.presence.avatar_join(self.id)
 
     def __str__(self):
         """
         Print method of this class
         """
-        return 'Avatar (' + \
-                str(self.id) + \
-                '): ' + \
-                self.username + \
-                '@[' + \
-                self.hostname + \
-                '] (' + \
-                self.client_name + \
-                ' ' + \
-                self.client_version + \
-                ')'
+        return str(self.presence)
+
+    @property
+    def presence(self):
+        """
+        Record of this avatar in the presence directory of session
+        """
+        record = self.session.presence.get(self.id)
+        if record is None:
+            record = verse_presence.VersePresenceRecord(self.id)
+        return record
 
     @property
     def hostname(self):
         """
         hostname property
         """
-        try:
-            hostname = self.info_node.tg_info.tag_hostname.value
-        except AttributeError:
-            return ""
-        else:
-            try:
-                return hostname[0]
-            except TypeError:
-                return ""
+        return self.presence.hostname
 
     @property
     def login_time(self):
         """
         login time property
         """
-        try:
-            login_time = self.info_node.tg_info.tag_login_time.value
-        except AttributeError:
-            return 0
-        else:
-            try:
-                return login_time[0]
-            except TypeError:
-                return 0
+        return self.presence.login_time
 
     @property
     def client_name(self):
         """
         client name property
         """
-        try:
-            client_name = self.info_node.tg_info.tag_client_name.value
-        except AttributeError:
-            return ""
-        else:
-            try:
-                return client_name[0]
-            except TypeError:
-                return ""
+        return self.presence.client_name
 
     @property
     def client_version(self):
         """
         client name property
         """
-        try:
-            client_version = self.info_node.tg_info.tag_client_version.value
-        except AttributeError:
-            return ""
-        else:
-            try:
-                return client_version[0]
-            except TypeError:
-                return ""
+        return self.presence.client_version
 
     @property
     def username(self):
         """
         user of this avatar
         """
-        try:
-            user = self.session.users[self._user_id]
-        except KeyError:
-            return ""
-        else:
-            return user.name
+        return self.presence.username
 
     @classmethod
     def cb_receive_node_destroy(cls, session, node_id):
@@ -265,6 +286,7 @@ class VerseAvatar(verse_node.VerseNode):
         avatar = super(VerseAvatar, cls).cb_receive_node_destroy(session, node_id)
         if node_id in session.avatars:
             session.avatars.pop(node_id)
+        session.presence.avatar_leave(node_id)
         return avatar
 
     @classmethod
@@ -278,4 +300,5 @@ class VerseAvatar(verse_node.VerseNode):
         if user_id != 100 and user_id != 65535:
             avatar = session.avatars[node_id]
             avatar._user_id = user_id
+            session.presence.set_user(node_id, user_id)
         return super(VerseAvatar, cls).cb_receive_node_perm(session, node_id, user_id, perm)
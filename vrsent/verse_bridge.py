@@ -0,0 +1,313 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+
+"""
+This module includes class VerseBridge that replicates selected subtrees
+of nodes from one VerseSession (source) to other VerseSession (target),
+e.g. connected to other Verse server. The bridge compares snapshots of
+source session published after each callback_update(). Thus all changes
+of one node received during one update are coalesced and only the final
+values are sent to target session.
+
+Changes are applied to target session in the thread calling its
+callback_update(). When target session is thread safe and it is updated by
+other thread, then changes are queued (see VerseSession.call_in_callback()).
+When target session is not thread safe, then both sessions have to be
+updated by the same thread.
+"""
+
+
+from . import verse_node, verse_tag_group, verse_tag, verse_layer
+
+
+class VerseBridge(object):
+    """
+    Class representing bridge between two sessions. Entities are created in
+    target session as new objects and IDs assigned by target Verse server
+    are mapped, when they are received (pending queues of target session
+    are used). Changes of entities, that are not created yet, are sent,
+    when they are created.
+    """
+
+    def __init__(self, source, target, roots, target_parent=None, budget=10000):
+        """
+        Constructor of VerseBridge. The roots are IDs of root nodes of
+        subtrees in source session. Copies of root nodes are linked to
+        target_parent (VerseNode in target session). Items of layers are
+        copied in chunks of budget items.
+        """
+        self.source = source
+        self.target = target
+        self.roots = set(roots)
+        self.target_parent = target_parent
+        self.budget = budget
+        # The dictionaries of target entities (IDs of source entities are
+        # used as keys)
+        self.nodes = {}
+        self.tag_groups = {}
+        self.tags = {}
+        self.layers = {}
+        # The set of keys of child layers waiting for their parent layers,
+        # which were not in source node yet
+        self.waiting_layers = set()
+        # The dictionary of last replicated snapshots of source nodes
+        self.replicated = {}
+        self.ticks = 0
+        self.changes = 0
+        snapshots = source.enable_snapshots()
+        target.call_in_callback(self.copy, snapshots.current)
+        snapshots.add_listener(self.update)
+
+    def __str__(self):
+        """
+        String representation of VerseBridge
+        """
+        return 'VerseBridge, nodes: ' + \
+            str(len(self.nodes)) + \
+            ', ticks: ' + \
+            str(self.ticks) + \
+            ', changes: ' + \
+            str(self.changes)
+
+    def target_id(self, node_id):
+        """
+        This method returns ID of node in target session. It returns None,
+        when node is not created at target Verse server yet.
+        """
+        try:
+            return self.nodes[node_id].id
+        except KeyError:
+            return None
+
+    def is_selected(self, node_snapshot):
+        """
+        This method returns True, when node is in replicated subtree
+        """
+        return node_snapshot.id in self.roots or node_snapshot.parent_id in self.nodes
+
+    def copy(self, snapshot):
+        """
+        This method replicates all nodes of selected subtrees. Parent nodes
+        are replicated before child nodes.
+        """
+        children = {}
+        for node_snapshot in snapshot.nodes.values():
+            try:
+                children[node_snapshot.parent_id].append(node_snapshot.id)
+            except KeyError:
+                children[node_snapshot.parent_id] = [node_snapshot.id]
+        node_ids = [node_id for node_id in self.roots if node_id in snapshot.nodes]
+        with self.target.lock:
+            while len(node_ids) > 0:
+                node_id = node_ids.pop()
+                self._replicate(snapshot.nodes[node_id])
+                node_ids.extend(children.get(node_id, ()))
+
+    def update(self, snapshot):
+        """
+        This method replicates nodes changed during last callback_update()
+        of source session. Changes are applied in the thread of target session.
+        """
+        changed_ids = tuple(self.source.snapshots.changed_ids)
+        if len(changed_ids) == 0:
+            return
+        self.target.call_in_callback(self.apply, snapshot, changed_ids)
+
+    def apply(self, snapshot, changed_ids):
+        """
+        This method sends changes of nodes to target session
+        """
+        self.ticks += 1
+        with self.target.lock:
+            for node_id in changed_ids:
+                node_snapshot = snapshot.get(node_id)
+                if node_snapshot is None:
+                    if node_id in self.nodes:
+                        self._destroy_node(node_id)
+                elif self.is_selected(node_snapshot) is True:
+                    self._replicate(node_snapshot)
+                elif node_id in self.nodes:
+                    # Node was moved out of replicated subtrees
+                    self._destroy_node(node_id)
+
+    def _destroy_node(self, node_id):
+        """
+        This method destroys copy of node and forgets its entities
+        """
+        self.nodes.pop(node_id).destroy()
+        self.replicated.pop(node_id, None)
+        for entities in (self.tag_groups, self.tags, self.layers):
+            for key in [key for key in entities if key[0] == node_id]:
+                entities.pop(key)
+        self.waiting_layers = set(key for key in self.waiting_layers if key[0] != node_id)
+        self.changes += 1
+
+    def _replicate(self, node_snapshot):
+        """
+        This method creates copy of node or it sends changes of node
+        """
+        node_id = node_snapshot.id
+        old_snapshot = self.replicated.get(node_id)
+        if node_snapshot is old_snapshot:
+            return
+        parent = self.nodes.get(node_snapshot.parent_id, self.target_parent)
+        try:
+            node = self.nodes[node_id]
+        except KeyError:
+            node = self.nodes[node_id] = verse_node.VerseNode(
+                session=self.target,
+                parent=parent,
+                custom_type=node_snapshot.custom_type)
+            self.changes += 1
+        else:
+            if parent is not None and node.parent is not parent:
+                node.parent = parent
+                self.changes += 1
+        self._replicate_tag_groups(node, node_snapshot, old_snapshot)
+        self._replicate_layers(node, node_snapshot, old_snapshot)
+        self.replicated[node_id] = node_snapshot
+
+    def _replicate_tag_groups(self, node, node_snapshot, old_snapshot):
+        """
+        This method sends changes of tag groups and tags of node
+        """
+        node_id = node_snapshot.id
+        old_tag_groups = old_snapshot.tag_groups if old_snapshot is not None else {}
+        if node_snapshot.tag_groups is old_tag_groups:
+            return
+        for tg_id in old_tag_groups:
+            if tg_id not in node_snapshot.tag_groups:
+                self.tag_groups.pop((node_id, tg_id)).destroy()
+                for key in [key for key in self.tags if key[:2] == (node_id, tg_id)]:
+                    self.tags.pop(key)
+                self.changes += 1
+        for tg_id, tg_snapshot in node_snapshot.tag_groups.items():
+            old_tg_snapshot = old_tag_groups.get(tg_id)
+            if tg_snapshot is old_tg_snapshot:
+                continue
+            try:
+                tg = self.tag_groups[(node_id, tg_id)]
+            except KeyError:
+                tg = self.tag_groups[(node_id, tg_id)] = verse_tag_group.VerseTagGroup(
+                    node=node,
+                    custom_type=tg_snapshot.custom_type)
+                self.changes += 1
+            old_tags = old_tg_snapshot.tags if old_tg_snapshot is not None else {}
+            for tag_id in old_tags:
+                if tag_id not in tg_snapshot.tags:
+                    self.tags.pop((node_id, tg_id, tag_id)).destroy()
+                    self.changes += 1
+            for tag_id, tag_snapshot in tg_snapshot.tags.items():
+                old_tag_snapshot = old_tags.get(tag_id)
+                if tag_snapshot == old_tag_snapshot:
+                    continue
+                key = (node_id, tg_id, tag_id)
+                try:
+                    tag = self.tags[key]
+                except KeyError:
+                    self.tags[key] = verse_tag.VerseTag(
+                        tg=tg,
+                        data_type=tag_snapshot.data_type,
+                        count=tag_snapshot.count,
+                        custom_type=tag_snapshot.custom_type,
+                        value=tag_snapshot.value)
+                else:
+                    tag.value = tag_snapshot.value
+                self.changes += 1
+
+    def _replicate_layers(self, node, node_snapshot, old_snapshot):
+        """
+        This method sends changes of layers of node. Parent layers are
+        created before child layers. Child layers, whose parent layers are
+        not in source node, wait for next change of layers of node.
+        """
+        node_id = node_snapshot.id
+        old_layers = old_snapshot.layers if old_snapshot is not None else {}
+        if node_snapshot.layers is old_layers:
+            return
+        for layer_id in old_layers:
+            if layer_id not in node_snapshot.layers:
+                self.waiting_layers.discard((node_id, layer_id))
+                if (node_id, layer_id) in self.layers:
+                    self.layers.pop((node_id, layer_id)).destroy()
+                    self.changes += 1
+        pending = [layer_id for layer_id, layer_snapshot in node_snapshot.layers.items()
+                   if layer_snapshot is not old_layers.get(layer_id) or (node_id, layer_id) in self.waiting_layers]
+        while len(pending) > 0:
+            layer_id = pending.pop(0)
+            layer_snapshot = node_snapshot.layers[layer_id]
+            key = (node_id, layer_id)
+            try:
+                layer = self.layers[key]
+            except KeyError:
+                parent_layer_id = layer_snapshot.parent_layer_id
+                if parent_layer_id is not None and (node_id, parent_layer_id) not in self.layers:
+                    # Wait for parent layer. Parent layer, which is not
+                    # changed, but it is not replicated, is replicated first
+                    if parent_layer_id not in pending and parent_layer_id in node_snapshot.layers and \
+                            (node_id, parent_layer_id) not in self.waiting_layers:
+                        pending.append(parent_layer_id)
+                    if parent_layer_id in pending:
+                        pending.append(layer_id)
+                    else:
+                        self.waiting_layers.add(key)
+                    continue
+                self.waiting_layers.discard(key)
+                layer = self.layers[key] = verse_layer.VerseLayer(
+                    node=node,
+                    parent_layer=self.layers.get((node_id, parent_layer_id)),
+                    data_type=layer_snapshot.data_type,
+                    count=layer_snapshot.count,
+                    custom_type=layer_snapshot.custom_type)
+                # Initial items are sent in chunks
+                layer.upload(self._initial_items(node_id, layer_id, list(layer_snapshot.items)), budget=self.budget)
+                self.changes += 1
+                continue
+            old_items = old_layers[layer_id].items
+            for item_id, value in layer_snapshot.items.items():
+                if old_items.get(item_id) != value:
+                    layer.items[item_id] = value
+                    self.changes += 1
+            for item_id in old_items:
+                if item_id not in layer_snapshot.items and item_id in layer.items:
+                    layer.items.pop(item_id)
+                    self.changes += 1
+
+    def _initial_items(self, node_id, layer_id, item_ids):
+        """
+        This generator yields items of new layer for upload. The latest
+        replicated values are used, because items could be changed or
+        removed during upload.
+        """
+        for item_id in item_ids:
+            try:
+                value = self.replicated[node_id].layers[layer_id].items[item_id]
+            except KeyError:
+                continue
+            yield item_id, value
+
+    def close(self):
+        """
+        This method stops replication. Copies of nodes are kept in target
+        session.
+        """
+        snapshots = self.source.snapshots
+        if self.update in snapshots.listeners:
+            snapshots.remove_listener(self.update)
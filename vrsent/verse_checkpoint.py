@@ -0,0 +1,355 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+
+"""
+This module includes class VerseCheckpointer that periodically writes
+checkpoints of nodes mirrored by VerseSession to the directory. Only nodes
+changed since last checkpoint are written to new segment and only changed
+tag groups and items of layers of these nodes are stored in the segment.
+Segments are merged to the base file after several checkpoints. Function
+restore() reads the base and segments and it returns VerseSnapshot.
+
+Files in the directory:
+
+    base             ('BASE', seq, tick, {node_id: plain node})
+    segment-<seq>    ('SEGMENT', seq, tick, {node_id: change})
+
+Change of node is None (removed node), ('FULL', plain node) or
+('DIFF', header, perms, tag groups, layers). Changed tag groups are stored
+whole and None means removed tag group. Change of layer is tuple with
+header, dictionary of set items and the list of IDs of removed items.
+"""
+
+
+import marshal
+import os
+import threading
+import time
+from . import verse_snapshot
+
+
+BASE_NAME = 'base'
+SEGMENT_PREFIX = 'segment-'
+
+
+def _write_file(path, data):
+    """
+    This function writes data to the file at path atomically
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as checkpoint_file:
+        marshal.dump(data, checkpoint_file)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_file(path):
+    """
+    This function reads data from the file at path
+    """
+    with open(path, 'rb') as checkpoint_file:
+        return marshal.load(checkpoint_file)
+
+
+def segment_seqs(path):
+    """
+    This function returns sorted sequence numbers of segments in directory
+    """
+    seqs = []
+    for name in os.listdir(path):
+        if name.startswith(SEGMENT_PREFIX) and name.endswith('.tmp') is False:
+            try:
+                seqs.append(int(name[len(SEGMENT_PREFIX):]))
+            except ValueError:
+                pass
+    return sorted(seqs)
+
+
+def segment_path(path, seq):
+    """
+    This function returns path of segment with sequence number
+    """
+    return os.path.join(path, SEGMENT_PREFIX + '%08d' % seq)
+
+
+def node_diff(old_snapshot, new_snapshot):
+    """
+    This function returns change of node between two snapshots. Snapshots
+    of unchanged tag groups and layers are shared by snapshots of node and
+    they are skipped without comparing.
+    """
+    if old_snapshot is None:
+        return ('FULL', verse_snapshot.plain_node(new_snapshot))
+    tag_groups = {}
+    for tg_id, tg in new_snapshot.tag_groups.items():
+        if old_snapshot.tag_groups.get(tg_id) is not tg:
+            tag_groups[tg_id] = (tg.id, tg.custom_type, {tag_id: tuple(tag) for tag_id, tag in tg.tags.items()})
+    for tg_id in old_snapshot.tag_groups:
+        if tg_id not in new_snapshot.tag_groups:
+            tag_groups[tg_id] = None
+    layers = {}
+    for layer_id, layer in new_snapshot.layers.items():
+        old_layer = old_snapshot.layers.get(layer_id)
+        if old_layer is layer:
+            continue
+        elif old_layer is None:
+            layers[layer_id] = (tuple(layer[:-1]), dict(layer.items), [])
+        else:
+            old_items = old_layer.items
+            items = {item_id: value for item_id, value in layer.items.items()
+                     if old_items.get(item_id) != value}
+            removed = [item_id for item_id in old_items if item_id not in layer.items]
+            layers[layer_id] = (tuple(layer[:-1]), items, removed)
+    for layer_id in old_snapshot.layers:
+        if layer_id not in new_snapshot.layers:
+            layers[layer_id] = None
+    return ('DIFF', tuple(new_snapshot[:-3]), dict(new_snapshot.perms), tag_groups, layers)
+
+
+def apply_change(data, change):
+    """
+    This function returns plain node (see plain_node()) with applied change
+    """
+    if change[0] == 'FULL':
+        return change[1]
+    header, perms, tg_changes, layer_changes = change[1:]
+    tag_groups = dict(data[-2])
+    for tg_id, tg in tg_changes.items():
+        if tg is None:
+            tag_groups.pop(tg_id, None)
+        else:
+            tag_groups[tg_id] = tg
+    layers = dict(data[-1])
+    for layer_id, layer in layer_changes.items():
+        if layer is None:
+            layers.pop(layer_id, None)
+            continue
+        layer_header, set_items, removed = layer
+        try:
+            items = dict(layers[layer_id][-1])
+        except KeyError:
+            items = {}
+        items.update(set_items)
+        for item_id in removed:
+            items.pop(item_id, None)
+        layers[layer_id] = tuple(layer_header) + (items,)
+    return tuple(header) + (perms, tag_groups, layers)
+
+
+def _restore(path):
+    """
+    This function reads the base and segments from the directory and it
+    returns sequence number of last segment, tick and plain nodes
+    """
+    try:
+        seq, tick, nodes = _read_file(os.path.join(path, BASE_NAME))[1:]
+    except (IOError, OSError, EOFError, ValueError):
+        seq, tick, nodes = 0, None, {}
+    for segment_seq in segment_seqs(path):
+        if segment_seq <= seq:
+            continue
+        try:
+            segment = _read_file(segment_path(path, segment_seq))
+        except (IOError, OSError, EOFError, ValueError):
+            break
+        seq, tick = segment[1:3]
+        for node_id, change in segment[3].items():
+            if change is None:
+                nodes.pop(node_id, None)
+            else:
+                nodes[node_id] = apply_change(nodes.get(node_id), change)
+    return seq, tick, nodes
+
+
+def _snapshot(tick, nodes):
+    """
+    This function returns VerseSnapshot of plain nodes
+    """
+    return verse_snapshot.VerseSnapshot(
+        tick,
+        {node_id: verse_snapshot.node_from_plain(data) for node_id, data in nodes.items()})
+
+
+def restore(path):
+    """
+    This function reads the base and segments from the directory and it
+    returns VerseSnapshot of restored nodes. When there is not any
+    checkpoint in the directory, then it returns None.
+    """
+    tick, nodes = _restore(path)[1:]
+    if tick is None:
+        return None
+    return _snapshot(tick, nodes)
+
+
+class VerseCheckpointer(threading.Thread):
+    """
+    Class representing thread writing checkpoints of session. It is created
+    by VerseSession.enable_checkpoints() and it is available as
+    session.checkpointer. Snapshots are immutable and they are written
+    without holding lock of session.
+    """
+
+    def __init__(self, session, path, interval=10.0, compact_segments=16):
+        """
+        Constructor of VerseCheckpointer. New segment is written each
+        interval seconds and segments are merged to the base, when count
+        of segments reaches compact_segments.
+        """
+        super(VerseCheckpointer, self).__init__(name='VerseCheckpointer')
+        self.daemon = True
+        self.session = session
+        self.path = path
+        self.interval = interval
+        self.compact_segments = compact_segments
+        if os.path.isdir(path) is False:
+            os.makedirs(path)
+        # Nodes restored from existing checkpoint are kept until they are
+        # changed or until next compaction. Thus checkpoint is not lost,
+        # when client is restarted and nodes were not received again yet.
+        seq, tick, nodes = _restore(path)
+        seqs = segment_seqs(path)
+        self.seq = max([seq] + seqs)
+        self.segments = len(seqs)
+        self.checkpoints = 0
+        self.last_time = 0.0
+        # The snapshot written by last checkpoint
+        self.written = _snapshot(tick, nodes) if tick is not None else None
+        # The latest published snapshot and IDs of nodes changed since
+        # last checkpoint (guarded by _changed_lock)
+        self._changed_lock = threading.Lock()
+        self.latest = None
+        self.changed_ids = set()
+        self._stop_event = threading.Event()
+        snapshots = session.enable_snapshots()
+        snapshots.add_listener(self.update)
+        # All existing nodes are written by first checkpoint
+        with self._changed_lock:
+            self.latest = snapshots.current
+            self.changed_ids.update(snapshots.current.nodes)
+
+    def __str__(self):
+        """
+        String representation of VerseCheckpointer
+        """
+        return 'VerseCheckpointer, path: ' + \
+            self.path + \
+            ', seq: ' + \
+            str(self.seq) + \
+            ', segments: ' + \
+            str(self.segments) + \
+            ', pending: ' + \
+            str(len(self.changed_ids))
+
+    def update(self, snapshot):
+        """
+        This method is called with each published snapshot. It only
+        remembers the snapshot and IDs of changed nodes.
+        """
+        with self._changed_lock:
+            self.latest = snapshot
+            self.changed_ids.update(self.session.snapshots.changed_ids)
+
+    def _take_changes(self):
+        """
+        This method returns the latest snapshot and IDs of nodes changed
+        since last checkpoint
+        """
+        with self._changed_lock:
+            changed_ids, self.changed_ids = self.changed_ids, set()
+            return self.latest, changed_ids
+
+    def compact(self):
+        """
+        This method writes all checkpointed nodes merged with nodes changed
+        in the latest snapshot to the base and it removes merged segments.
+        Restored nodes, that were not received again, are kept.
+        """
+        snapshot, changed_ids = self._take_changes()
+        nodes = dict(self.written.nodes) if self.written is not None else {}
+        for node_id in changed_ids:
+            node_snapshot = snapshot.nodes.get(node_id)
+            if node_snapshot is None:
+                nodes.pop(node_id, None)
+            else:
+                nodes[node_id] = node_snapshot
+        self.seq += 1
+        plain_nodes = {node_id: verse_snapshot.plain_node(node_snapshot)
+                       for node_id, node_snapshot in nodes.items()}
+        _write_file(os.path.join(self.path, BASE_NAME), ('BASE', self.seq, snapshot.tick, plain_nodes))
+        for seq in segment_seqs(self.path):
+            if seq <= self.seq:
+                os.remove(segment_path(self.path, seq))
+        self.segments = 0
+        self.written = verse_snapshot.VerseSnapshot(snapshot.tick, nodes)
+
+    def checkpoint(self):
+        """
+        This method writes segment with nodes changed since last checkpoint.
+        The first checkpoint without existing base and each
+        compact_segments checkpoint rewrites the base.
+        """
+        self.last_time = time.time()
+        self.checkpoints += 1
+        if self.written is None or self.segments + 1 >= self.compact_segments:
+            return self.compact()
+        snapshot, changed_ids = self._take_changes()
+        changes = {}
+        for node_id in changed_ids:
+            node_snapshot = snapshot.nodes.get(node_id)
+            old_snapshot = self.written.nodes.get(node_id)
+            if node_snapshot is None:
+                if old_snapshot is not None:
+                    changes[node_id] = None
+            elif node_snapshot is not old_snapshot:
+                changes[node_id] = node_diff(old_snapshot, node_snapshot)
+        if len(changes) == 0:
+            return
+        # Restored nodes, that were not received again, are kept
+        nodes = dict(self.written.nodes)
+        for node_id, change in changes.items():
+            if change is None:
+                nodes.pop(node_id)
+            else:
+                nodes[node_id] = snapshot.nodes[node_id]
+        self.written = verse_snapshot.VerseSnapshot(snapshot.tick, nodes)
+        self.seq += 1
+        _write_file(segment_path(self.path, self.seq), ('SEGMENT', self.seq, snapshot.tick, changes))
+        self.segments += 1
+
+    def run(self):
+        """
+        This method is executed, when thread is started. It writes
+        checkpoints until stop() is called.
+        """
+        while self._stop_event.wait(self.interval) is False:
+            self.checkpoint()
+        # Write the last changes before exit
+        self.checkpoint()
+
+    def stop(self):
+        """
+        This method stops thread and it removes listener of snapshots
+        """
+        snapshots = self.session.snapshots
+        if self.update in snapshots.listeners:
+            snapshots.remove_listener(self.update)
+        self._stop_event.set()
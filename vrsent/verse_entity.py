@@ -24,6 +24,7 @@ wants to do unauthorized state switch.
 """
 
 
+import struct
 import verse as vrs
 
 
@@ -74,6 +75,115 @@ DATA_TYPE_DICT = {
 }
 
 
+# Modes of estimation of data_type. The widest mode uses data_type with
+# max possible precision. The narrowest mode uses the narrowest integer
+# type that fits all values.
+DATA_TYPE_WIDEST = 'WIDEST'
+DATA_TYPE_NARROWEST = 'NARROWEST'
+
+
+# Unsigned integer types with max values ordered from the narrowest type
+UINT_TYPES = (
+    (vrs.VALUE_TYPE_UINT8, (1 << 8) - 1),
+    (vrs.VALUE_TYPE_UINT16, (1 << 16) - 1),
+    (vrs.VALUE_TYPE_UINT32, (1 << 32) - 1),
+    (vrs.VALUE_TYPE_UINT64, (1 << 64) - 1)
+)
+
+
+# Real types with struct format codes ordered from the narrowest type
+REAL_TYPES = (
+    (vrs.VALUE_TYPE_REAL16, 'e'),
+    (vrs.VALUE_TYPE_REAL32, 'f'),
+    (vrs.VALUE_TYPE_REAL64, 'd')
+)
+
+
+# Dictionary of array type codes used for compact storage of values. Python
+# array does not support half floats, then REAL16 values are stored as floats
+ARRAY_TYPE_CODES = {
+    vrs.VALUE_TYPE_UINT8: 'B',
+    vrs.VALUE_TYPE_UINT16: 'H',
+    vrs.VALUE_TYPE_UINT32: 'I',
+    vrs.VALUE_TYPE_UINT64: 'Q',
+    vrs.VALUE_TYPE_REAL16: 'f',
+    vrs.VALUE_TYPE_REAL32: 'f',
+    vrs.VALUE_TYPE_REAL64: 'd'
+}
+
+
+def quantization_error(item, fmt):
+    """
+    This method returns error of real number stored with struct format
+    """
+    try:
+        return abs(struct.unpack(fmt, struct.pack(fmt, item))[0] - item)
+    except (OverflowError, struct.error):
+        return float('inf')
+
+
+def estimate_data_type(items, mode=DATA_TYPE_WIDEST, real_data_type=None, max_error=0.0):
+    """
+    This method estimates data_type of VerseTag or VerseLayer from items
+    of values. Types of all items are used for estimation and integers
+    mixed with real numbers are estimated as real numbers. Real numbers
+    are quantized to real_data_type, when error of all items is not bigger
+    than max_error. Otherwise wider real type is used. KeyError is raised
+    for unsupported type of item.
+    """
+    if mode not in (DATA_TYPE_WIDEST, DATA_TYPE_NARROWEST):
+        raise ValueError('Unsupported mode of estimation of data_type: ' + str(mode))
+    types = [real_type for real_type, fmt in REAL_TYPES]
+    if real_data_type is not None and real_data_type not in types:
+        raise ValueError('Unsupported real_data_type: ' + str(real_data_type))
+    items = list(items)
+    if len(items) == 0:
+        raise ValueError('No items for estimation of data_type')
+    item_types = set(type(item) for item in items)
+    for item_type in item_types:
+        if item_type not in DATA_TYPE_DICT:
+            raise KeyError(item_type)
+    if item_types == {int, float}:
+        item_type = float
+    elif len(item_types) == 1:
+        item_type = item_types.pop()
+    else:
+        raise TypeError('Items of value have different types: ' + str(sorted(t.__name__ for t in item_types)))
+    data_type = DATA_TYPE_DICT[item_type]
+    if item_type == int and mode == DATA_TYPE_NARROWEST:
+        # Verse supports only unsigned integers
+        if min(items) >= 0:
+            max_item = max(items)
+            for uint_type, max_val in UINT_TYPES:
+                if max_item <= max_val:
+                    return uint_type
+    elif item_type == float and real_data_type is not None:
+        types = [real_type for real_type, fmt in REAL_TYPES]
+        for real_type, fmt in REAL_TYPES[types.index(real_data_type):]:
+            if all(quantization_error(item, fmt) <= max_error for item in items):
+                return real_type
+    return data_type
+
+
+def check_data_type(value, data_type, max_error=0.0):
+    """
+    This method raises ValueError, when some item of value can not be
+    stored as data_type without overflow or with error bigger than
+    max_error. It is used for values of entities with estimated data_type.
+    """
+    uint_types = dict(UINT_TYPES)
+    real_types = dict(REAL_TYPES)
+    for item in value:
+        if data_type in uint_types:
+            valid = type(item) == int and 0 <= item <= uint_types[data_type]
+        elif data_type in real_types:
+            valid = type(item) in (int, float) and quantization_error(item, real_types[data_type]) <= max_error
+        else:
+            valid = type(item) == str
+        if valid is not True:
+            raise ValueError('Item: ' + repr(item) + ' does not fit into estimated data_type: ' + str(data_type))
+
+
 def last_subclass(cls):
     """
     This method is used to return last subclass of VerseNode,
@@ -99,6 +209,109 @@ def name_to_custom_type(cls_name):
     return str_hash % 65535
 
 
+def values_equal(value1, value2, epsilon=None):
+    """
+    This method compares two values of tag or layer item. Real numbers
+    are compared with tolerance epsilon, when epsilon is specified.
+    """
+    if value1 is None or value2 is None:
+        return False
+    if len(value1) != len(value2):
+        return False
+    for item1, item2 in zip(value1, value2):
+        if epsilon is not None and isinstance(item1, float):
+            if abs(item1 - item2) > epsilon:
+                return False
+        elif item1 != item2:
+            return False
+    return True
+
+
+# Kinds of entities stored in lazy store of session
+LAZY_TAG_GROUP = 'TAG_GROUP'
+LAZY_TAG = 'TAG'
+LAZY_LAYER = 'LAYER'
+
+
+class VerseLazyDict(dict):
+    """
+    Class representing dictionary of child entities (tag groups, tags or
+    layers). Entities that are only stored as records in the lazy store
+    of session are created, when they are accessed for the first time.
+    """
+
+    def __init__(self, store, kind, owner):
+        """
+        Constructor of VerseLazyDict
+        """
+        super(VerseLazyDict, self).__init__()
+        self.store = store
+        self.kind = kind
+        self.owner = owner
+
+    def __missing__(self, key):
+        """
+        This method is called, when entity is not in the dictionary
+        """
+        return self.store.load(self.kind, self.owner, key)
+
+    def __contains__(self, key):
+        """
+        This method returns True for created entities and for records
+        """
+        return dict.__contains__(self, key) or self.store.has(self.kind, self.owner, key)
+
+    def __len__(self):
+        """
+        This method returns count of created entities and records
+        """
+        return dict.__len__(self) + len(self.store.keys(self.kind, self.owner))
+
+    def get(self, key, default=None):
+        """
+        This method returns entity or default value
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def materialize(self):
+        """
+        This method creates all entities stored as records
+        """
+        for key in self.store.keys(self.kind, self.owner):
+            self.store.load(self.kind, self.owner, key)
+
+    def __iter__(self):
+        """
+        This method iterates over keys of all entities
+        """
+        self.materialize()
+        return dict.__iter__(self)
+
+    def keys(self):
+        """
+        This method returns keys of all entities
+        """
+        self.materialize()
+        return dict.keys(self)
+
+    def values(self):
+        """
+        This method returns all entities
+        """
+        self.materialize()
+        return dict.values(self)
+
+    def items(self):
+        """
+        This method returns keys and entities
+        """
+        self.materialize()
+        return dict.items(self)
+
+
 class VerseStateError(Exception):
     """
     Exception for invalid state changes
@@ -123,6 +336,13 @@ class VerseEntity(object):
     Parent class for VerseNode, Verse, VerseTagGroup and VerseLayer
     """
 
+    # When suppress_unchanged is True, then value equal to last sent or
+    # received value is not sent to Verse server. When it is None, then
+    # setting of session is used. Real numbers are compared with tolerance
+    # suppress_epsilon (or session.suppress_epsilon, when it is None)
+    suppress_unchanged = None
+    suppress_epsilon = None
+
     def __init__(self, *args, **kwargs):
         """
         Constructor of VerseEntity
@@ -148,6 +368,50 @@ class VerseEntity(object):
             else:
                 raise TypeError('Specified custom_type is not int')
 
+    def _suppressing(self, session):
+        """
+        This method returns True, when sending of unchanged values is
+        suppressed for this entity
+        """
+        suppress = self.suppress_unchanged
+        if suppress is None:
+            suppress = session.suppress_unchanged
+        return suppress is True
+
+    def _is_unchanged(self, session, last_value, new_value):
+        """
+        This method returns True, when sending of new value could be
+        suppressed, because new value is equal to last sent or received
+        value. The last value is not current local value, because local
+        value could be changed without sending (within epsilon) or it
+        could be stored with lower precision.
+        """
+        if self._suppressing(session) is not True:
+            return False
+        epsilon = self.suppress_epsilon
+        if epsilon is None:
+            epsilon = session.suppress_epsilon
+        return values_equal(last_value, new_value, epsilon)
+
+    def _create_dependency(self):
+        """
+        This method returns entity that has to be created at Verse server
+        before this entity. Default entity does not depend on any entity.
+        """
+        return None
+
+    def _create_prio(self):
+        """
+        This method returns priority of create command
+        """
+        return vrs.DEFAULT_PRIORITY
+
+    def _schedule_create(self):
+        """
+        Default behavior is to send create command immediately
+        """
+        self._send_create()
+
     def _send_create(self):
         """
         Dummy method
@@ -185,7 +449,7 @@ class VerseEntity(object):
         """
         if self.state == ENTITY_RESERVED:
             if self.id is None:
-                self._send_create()
+                self._schedule_create()
                 self.state = ENTITY_CREATING
             else:
                 # Skip _send_create(), when ID is known and jump to assumed state
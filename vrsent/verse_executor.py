@@ -0,0 +1,297 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+
+"""
+This module includes class VerseHandlerExecutor that runs handlers of
+received commands in pool of threads or processes. Object model is still
+updated by the thread calling callback_update() of session and handlers
+are called after the update. Handlers of commands with the same key (node
+or entity) are called in the order of received commands.
+"""
+
+
+import collections
+import concurrent.futures
+import threading
+import time
+
+
+# Order handlers of the same node
+KEY_NODE = 'NODE'
+# Order handlers of the same node, tag group, tag or layer
+KEY_ENTITY = 'ENTITY'
+
+
+# Indexes of arguments of commands identifying entity
+COMMAND_KEYS = {
+    'node_create': (0,),
+    'node_destroy': (0,),
+    'node_link': (1,),
+    'node_lock': (0,),
+    'node_unlock': (0,),
+    'node_perm': (0,),
+    'node_owner': (0,),
+    'taggroup_create': (0, 1),
+    'taggroup_destroy': (0, 1),
+    'tag_create': (0, 1, 2),
+    'tag_destroy': (0, 1, 2),
+    'tag_set_values': (0, 1, 2),
+    'layer_create': (0, 2),
+    'layer_destroy': (0, 1),
+    'layer_set_value': (0, 1),
+    'layer_unset_value': (0, 1)
+}
+
+
+class VerseHandlerExecutor(object):
+    """
+    Class representing executor of handlers. Instance of this class is
+    created by VerseSession.enable_executor() and it is available as
+    session.executor. Handlers are called with arguments of received
+    command. Thus they could be called in other processes too. Handlers
+    running in threads should read immutable session.snapshot instead of
+    entities, because entities are changed by the thread calling
+    callback_update().
+    """
+
+    def __init__(self, session, pool=None, max_workers=4, max_queue=1000, key=KEY_NODE):
+        """
+        Constructor of VerseHandlerExecutor. The pool could be any instance
+        of concurrent.futures.Executor. When pool is None, then thread pool
+        with max_workers is created. When count of not finished handlers
+        is max_queue, then next handlers are kept in overflow queue and
+        callback_update() waits for handlers after session.lock is released.
+        """
+        self.session = session
+        if pool is None:
+            pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.pool = pool
+        self.max_queue = max_queue
+        self.key = key
+        # The dictionary of lists of handlers (name of command is used as key)
+        self.handlers = {}
+        # The dictionary of queues of handlers waiting for previous handler
+        # with the same key
+        self._chains = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_queue)
+        # Handlers submitted, when the queue was full
+        self._overflow = collections.deque()
+        # Metrics
+        self.depth = 0
+        self.max_depth = 0
+        self.submitted = 0
+        self.finished = 0
+        self.errors = 0
+        self.last_error = None
+        self.total_wait = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def __str__(self):
+        """
+        String representation of VerseHandlerExecutor
+        """
+        return 'VerseHandlerExecutor, depth: ' + \
+            str(self.depth) + \
+            ', overflow: ' + \
+            str(len(self._overflow)) + \
+            ', finished: ' + \
+            str(self.finished) + \
+            ', errors: ' + \
+            str(self.errors)
+
+    @property
+    def mean_latency(self):
+        """
+        Getter of mean time of running of handlers
+        """
+        if self.finished == 0:
+            return 0.0
+        return self.total_latency / self.finished
+
+    @property
+    def mean_wait(self):
+        """
+        Getter of mean time that handlers waited for previous handlers
+        with the same key
+        """
+        if self.finished == 0:
+            return 0.0
+        return self.total_wait / self.finished
+
+    def add_handler(self, command, handler):
+        """
+        This method adds handler of command (e.g. 'tag_set_values'). The
+        handler is called with arguments of command (e.g. node_id,
+        taggroup_id, tag_id and value)
+        """
+        if command not in COMMAND_KEYS:
+            raise ValueError('Unsupported command: ' + str(command))
+        try:
+            self.handlers[command].append(handler)
+        except KeyError:
+            self.handlers[command] = [handler]
+
+    def remove_handler(self, command, handler):
+        """
+        This method removes handler of command
+        """
+        self.handlers[command].remove(handler)
+        if len(self.handlers[command]) == 0:
+            self.handlers.pop(command)
+
+    def command_key(self, command, args):
+        """
+        This method returns key of command. Handlers with the same key
+        are called in order.
+        """
+        indexes = COMMAND_KEYS[command]
+        if self.key == KEY_NODE:
+            return args[indexes[0]]
+        return (command.split('_')[0],) + tuple(args[index] for index in indexes)
+
+    def dispatch(self, command, args):
+        """
+        This method submits all handlers of received command. It is called
+        by session after object model was updated.
+        """
+        try:
+            handlers = self.handlers[command]
+        except KeyError:
+            return
+        key = self.command_key(command, args)
+        for handler in handlers:
+            self.submit(key, handler, *args)
+
+    def submit(self, key, handler, *args):
+        """
+        This method submits handler. The handler is called after all
+        handlers submitted earlier with the same key are finished. It
+        returns future of result of handler. It never waits, because it is
+        called, when session.lock is held. When the queue is full, then
+        handler is kept in overflow queue until drain() is called.
+        """
+        future = concurrent.futures.Future()
+        task = (future, handler, args, time.time())
+        with self._lock:
+            self.submitted += 1
+        # Handlers submitted later can not overtake handlers in overflow
+        if len(self._overflow) > 0 or self._slots.acquire(False) is False:
+            self._overflow.append((key, task))
+            return future
+        self._enqueue(key, task)
+        return future
+
+    def drain(self):
+        """
+        This method waits for free slots in the queue and it moves handlers
+        from overflow queue to the queue. It is called at the end of
+        callback_update(), when session.lock is not held. Thus handlers
+        could finish, when they wait for session.lock.
+        """
+        while len(self._overflow) > 0:
+            self._slots.acquire()
+            key, task = self._overflow.popleft()
+            self._enqueue(key, task)
+
+    def _enqueue(self, key, task):
+        """
+        This method adds task to the chain of its key. The task is sent to
+        the pool, when there is not any other task with the same key.
+        """
+        with self._lock:
+            self.depth += 1
+            self.max_depth = max(self.max_depth, self.depth)
+            try:
+                self._chains[key].append(task)
+                return
+            except KeyError:
+                self._chains[key] = collections.deque()
+        self._run(key, task)
+
+    def _run(self, key, task):
+        """
+        This method sends handler to the pool
+        """
+        future, handler, args, submit_time = task
+        start_time = time.time()
+        if future.set_running_or_notify_cancel() is False:
+            self._done(key, future, submit_time, start_time, None)
+            return
+        pool_future = self.pool.submit(handler, *args)
+        pool_future.add_done_callback(
+            lambda pool_future: self._done(key, future, submit_time, start_time, pool_future))
+
+    def _done(self, key, future, submit_time, start_time, pool_future):
+        """
+        This method updates metrics and it sends next handler with the same
+        key to the pool
+        """
+        end_time = time.time()
+        if pool_future is not None:
+            error = pool_future.exception()
+            if error is None:
+                future.set_result(pool_future.result())
+            else:
+                future.set_exception(error)
+        else:
+            error = None
+        with self._lock:
+            self.depth -= 1
+            self.finished += 1
+            self.total_wait += start_time - submit_time
+            latency = end_time - start_time
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            if error is not None:
+                self.errors += 1
+                self.last_error = error
+            chain = self._chains[key]
+            if len(chain) > 0:
+                task = chain.popleft()
+            else:
+                task = None
+                self._chains.pop(key)
+        self._slots.release()
+        if task is not None:
+            self._run(key, task)
+
+    def wait(self, timeout=None):
+        """
+        This method waits until all submitted handlers are finished. It
+        returns True, when all handlers are finished. It must not be called,
+        when session.lock is held.
+        """
+        end_time = None if timeout is None else time.time() + timeout
+        self.drain()
+        while self.depth > 0:
+            if end_time is not None and time.time() >= end_time:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def shutdown(self, wait=True):
+        """
+        This method stops the pool
+        """
+        if wait is True:
+            self.wait()
+        self.pool.shutdown(wait=wait)
@@ -0,0 +1,485 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+
+"""
+This module includes class VerseHub that shares one VerseSession with many
+local clients over Unix domain socket, and class VerseHubClient used by
+these clients. Clients subscribe filtered nodes, they receive initial
+snapshot and then deltas after each callback_update() of session. Clients
+could also ask for any node.
+
+Each frame of protocol is length (4 bytes, little endian) followed by
+serialized message. Messages from client are lists serialized by JSON,
+because hub does not trust data received from clients:
+
+    ['SUBSCRIBE', custom_types, node_ids]
+    ['GET', request_id, node_id]
+
+Messages from hub are tuples serialized by marshal:
+
+    ('SNAPSHOT', tick, {node_id: node})
+    ('DELTA', tick, {node_id: change or None})
+    ('NODE', request_id, node or None)
+
+Nodes are sent as data created by verse_snapshot.plain_node() and changes
+of nodes as data created by verse_checkpoint.node_diff(). The socket is
+accessible only by the owner of the process running hub.
+"""
+
+
+import json
+import marshal
+import os
+import selectors
+import socket
+import struct
+import time
+from . import verse_snapshot, verse_checkpoint
+
+
+LENGTH = struct.Struct('<I')
+
+
+# Maximal size of one frame
+MAX_FRAME = 256 * 1024 * 1024
+
+
+# Maximal size of one frame with request of client
+MAX_REQUEST = 1024 * 1024
+
+
+def frame(message):
+    """
+    This function returns frame with serialized message
+    """
+    data = marshal.dumps(message)
+    return LENGTH.pack(len(data)) + data
+
+
+def load_frame(buf, offset, loads=marshal.loads, max_frame=MAX_FRAME):
+    """
+    This function returns message deserialized by loads from the frame at
+    offset and the offset of next frame. It returns None, when the frame
+    is not complete. It raises ValueError, when the frame is too long.
+    """
+    if len(buf) - offset < LENGTH.size:
+        return None
+    length = LENGTH.unpack_from(buf, offset)[0]
+    if length > max_frame:
+        raise ValueError('Frame is too long: ' + str(length))
+    end = offset + LENGTH.size + length
+    if len(buf) < end:
+        return None
+    return loads(bytes(buf[offset + LENGTH.size:end])), end
+
+
+def split_frames(buf, loads=marshal.loads, max_frame=MAX_FRAME):
+    """
+    This function removes complete frames from bytearray buffer and it
+    returns the list of messages deserialized by loads
+    """
+    messages = []
+    offset = 0
+    while True:
+        result = load_frame(buf, offset, loads, max_frame)
+        if result is None:
+            break
+        message, offset = result
+        messages.append(message)
+    del buf[:offset]
+    return messages
+
+
+def request_frame(message):
+    """
+    This function returns frame with request of client serialized by JSON
+    """
+    data = json.dumps(message).encode('utf-8')
+    return LENGTH.pack(len(data)) + data
+
+
+def _is_ids(value):
+    """
+    This function returns True, when value is None or list of integers
+    """
+    return value is None or (isinstance(value, list) and all(type(item) is int for item in value))
+
+
+def load_request(data):
+    """
+    This function returns request of client deserialized from JSON. It
+    raises ValueError, when request is not valid.
+    """
+    message = json.loads(data.decode('utf-8'))
+    if not isinstance(message, list) or len(message) != 3:
+        raise ValueError('Request is not list of three items')
+    if message[0] == 'SUBSCRIBE':
+        if _is_ids(message[1]) is False or _is_ids(message[2]) is False:
+            raise ValueError('Invalid custom types or node IDs: ' + str(message[1:]))
+    elif message[0] == 'GET':
+        if type(message[1]) is not int or type(message[2]) is not int:
+            raise ValueError('Invalid request ID or node ID: ' + str(message[1:]))
+    else:
+        raise ValueError('Unsupported request: ' + str(message[0]))
+    return tuple(message)
+
+
+class VerseHubConnection(object):
+    """
+    Class representing one client connected to the hub
+    """
+
+    def __init__(self, sock):
+        """
+        Constructor of VerseHubConnection
+        """
+        self.sock = sock
+        self.in_buf = bytearray()
+        self.out_buf = bytearray()
+        self.subscribed = False
+        self.custom_types = None
+        self.node_ids = None
+        # Tick of snapshot sent to client after subscription
+        self.tick = None
+        # IDs of nodes sent to client
+        self.known = set()
+
+    def matches(self, node_snapshot):
+        """
+        This method returns True, when node passes filter of client
+        """
+        return (self.custom_types is None or node_snapshot.custom_type in self.custom_types) and \
+            (self.node_ids is None or node_snapshot.id in self.node_ids)
+
+
+class VerseHub(object):
+    """
+    Class representing hub listening at Unix domain socket. It is created
+    by VerseSession.enable_hub(). Sockets are served by the thread calling
+    callback_update(), when snapshot of session is published. Each changed
+    node is serialized only once per published snapshot for all clients.
+    """
+
+    def __init__(self, session, path, max_buffer=64 * 1024 * 1024):
+        """
+        Constructor of VerseHub. Client with more than max_buffer bytes
+        waiting for sending is disconnected.
+        """
+        self.session = session
+        self.path = path
+        self.max_buffer = max_buffer
+        if os.path.exists(path):
+            os.unlink(path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(path)
+        # Clients are trusted, thus only owner can connect to the socket
+        os.chmod(path, 0o600)
+        self.listener.listen(64)
+        self.listener.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.connections = []
+        self.dropped = 0
+        snapshots = session.enable_snapshots()
+        # Snapshot sent to clients in previous update
+        self.previous = snapshots.current
+        snapshots.add_listener(self.update)
+
+    def __str__(self):
+        """
+        String representation of VerseHub
+        """
+        return 'VerseHub, path: ' + \
+            self.path + \
+            ', clients: ' + \
+            str(len(self.connections))
+
+    def _accept(self):
+        """
+        This method accepts new client
+        """
+        try:
+            sock = self.listener.accept()[0]
+        except (BlockingIOError, InterruptedError):
+            return
+        sock.setblocking(False)
+        connection = VerseHubConnection(sock)
+        self.connections.append(connection)
+        self.selector.register(sock, selectors.EVENT_READ, connection)
+        # Subscription could be already received
+        self._receive(connection)
+
+    def _close(self, connection):
+        """
+        This method disconnects client
+        """
+        self.selector.unregister(connection.sock)
+        connection.sock.close()
+        self.connections.remove(connection)
+
+    def _send(self, connection, message):
+        """
+        This method adds message to the buffer of client
+        """
+        connection.out_buf += frame(message)
+        if len(connection.out_buf) > self.max_buffer:
+            self.dropped += 1
+            self._close(connection)
+
+    def _plain_node(self, node_snapshot, cache):
+        """
+        This method returns plain node (see verse_snapshot.plain_node())
+        cached for current update
+        """
+        try:
+            return cache[node_snapshot.id]
+        except KeyError:
+            data = cache[node_snapshot.id] = verse_snapshot.plain_node(node_snapshot)
+            return data
+
+    def _change(self, node_snapshot, known, full, diffs):
+        """
+        This method returns change of node since previous update cached for
+        current update. Client, which does not know node, receives whole node.
+        """
+        node_id = node_snapshot.id
+        old_snapshot = self.previous.get(node_id)
+        if known is False or old_snapshot is None:
+            return ('FULL', self._plain_node(node_snapshot, full))
+        try:
+            return diffs[node_id]
+        except KeyError:
+            change = diffs[node_id] = verse_checkpoint.node_diff(old_snapshot, node_snapshot)
+            return change
+
+    def _filtered(self, connection, snapshot, node_ids, full, diffs=None):
+        """
+        This method returns the dictionary of nodes for client. When diffs
+        is not None, then changes of nodes are returned instead of nodes.
+        Nodes that were sent to client and that do not exist any more are None.
+        """
+        nodes = {}
+        for node_id in node_ids:
+            node_snapshot = snapshot.get(node_id)
+            if node_snapshot is not None and connection.matches(node_snapshot) is True:
+                if diffs is None:
+                    nodes[node_id] = self._plain_node(node_snapshot, full)
+                else:
+                    nodes[node_id] = self._change(node_snapshot, node_id in connection.known, full, diffs)
+                connection.known.add(node_id)
+            elif node_id in connection.known:
+                nodes[node_id] = None
+                connection.known.discard(node_id)
+        return nodes
+
+    def _receive(self, connection):
+        """
+        This method receives requests of client
+        """
+        try:
+            data = connection.sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if len(data) == 0:
+            self._close(connection)
+            return
+        connection.in_buf += data
+        try:
+            messages = split_frames(connection.in_buf, load_request, MAX_REQUEST)
+        except ValueError:
+            self._close(connection)
+            return
+        snapshot = self.session.snapshots.current
+        for message in messages:
+            if message[0] == 'SUBSCRIBE':
+                custom_types, node_ids = message[1:3]
+                connection.custom_types = set(custom_types) if custom_types is not None else None
+                connection.node_ids = set(node_ids) if node_ids is not None else None
+                connection.subscribed = True
+                connection.tick = snapshot.tick
+                connection.known = set()
+                nodes = self._filtered(connection, snapshot, snapshot.nodes, {})
+                self._send(connection, ('SNAPSHOT', snapshot.tick, nodes))
+            elif message[0] == 'GET':
+                request_id, node_id = message[1:3]
+                node_snapshot = snapshot.get(node_id)
+                if node_snapshot is not None:
+                    node_snapshot = verse_snapshot.plain_node(node_snapshot)
+                self._send(connection, ('NODE', request_id, node_snapshot))
+            if connection not in self.connections:
+                return
+
+    def _flush(self, connection):
+        """
+        This method sends as much data from the buffer of client as possible
+        """
+        try:
+            sent = connection.sock.send(connection.out_buf)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self._close(connection)
+            return
+        del connection.out_buf[:sent]
+
+    def update(self, snapshot):
+        """
+        This method accepts clients, receives their requests, sends deltas
+        of changed nodes and flushes buffers of clients. It is called after
+        each published snapshot.
+        """
+        for key, events in self.selector.select(0):
+            if key.data is None:
+                self._accept()
+            elif key.data in self.connections:
+                self._receive(key.data)
+        changed_ids = self.session.snapshots.changed_ids
+        full = {}
+        diffs = {}
+        for connection in list(self.connections):
+            # Client subscribed during this update received current snapshot
+            if connection.subscribed is True and connection.tick != snapshot.tick and len(changed_ids) > 0:
+                nodes = self._filtered(connection, snapshot, changed_ids, full, diffs)
+                if len(nodes) > 0:
+                    self._send(connection, ('DELTA', snapshot.tick, nodes))
+            if connection in self.connections and len(connection.out_buf) > 0:
+                self._flush(connection)
+        self.previous = snapshot
+
+    def close(self):
+        """
+        This method disconnects all clients and it removes socket
+        """
+        snapshots = self.session.snapshots
+        if self.update in snapshots.listeners:
+            snapshots.remove_listener(self.update)
+        for connection in list(self.connections):
+            self._close(connection)
+        self.selector.close()
+        self.listener.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class VerseHubClient(object):
+    """
+    Class representing local client of VerseHub. The dictionary nodes
+    contains snapshots of subscribed nodes.
+    """
+
+    def __init__(self, path, custom_types=None, node_ids=None):
+        """
+        Constructor of VerseHubClient. Only nodes with custom_types and
+        node_ids are subscribed. None means all nodes.
+        """
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.in_buf = bytearray()
+        self.nodes = {}
+        # Plain nodes, which changes received from hub are applied to
+        self._plain = {}
+        self.tick = None
+        self._request_id = 0
+        self._replies = {}
+        if custom_types is not None:
+            custom_types = list(custom_types)
+        if node_ids is not None:
+            node_ids = list(node_ids)
+        self.sock.sendall(request_frame(['SUBSCRIBE', custom_types, node_ids]))
+
+    def __str__(self):
+        """
+        String representation of VerseHubClient
+        """
+        return 'VerseHubClient, tick: ' + \
+            str(self.tick) + \
+            ', nodes: ' + \
+            str(len(self.nodes))
+
+    def _apply(self, message):
+        """
+        This method applies message received from hub
+        """
+        if message[0] == 'NODE':
+            data = message[2]
+            self._replies[message[1]] = verse_snapshot.node_from_plain(data) if data is not None else None
+            return
+        if message[0] == 'SNAPSHOT':
+            self.nodes = {}
+            self._plain = dict(message[2])
+            for node_id, data in message[2].items():
+                self.nodes[node_id] = verse_snapshot.node_from_plain(data)
+        else:
+            for node_id, change in message[2].items():
+                if change is None:
+                    self.nodes.pop(node_id, None)
+                    self._plain.pop(node_id, None)
+                else:
+                    data = self._plain[node_id] = verse_checkpoint.apply_change(self._plain.get(node_id), change)
+                    self.nodes[node_id] = verse_snapshot.node_from_plain(data)
+        self.tick = message[1]
+
+    def update(self, timeout=0.0):
+        """
+        This method receives messages from hub. It waits at most timeout
+        seconds for data. It returns count of received messages or None,
+        when hub closed connection.
+        """
+        if timeout > 0.0:
+            self.sock.settimeout(timeout)
+        else:
+            self.sock.setblocking(False)
+        try:
+            data = self.sock.recv(1024 * 1024)
+        except (BlockingIOError, socket.timeout):
+            return 0
+        if len(data) == 0:
+            return None
+        self.in_buf += data
+        messages = split_frames(self.in_buf)
+        for message in messages:
+            self._apply(message)
+        return len(messages)
+
+    def get(self, node_id, timeout=1.0):
+        """
+        This method asks hub for snapshot of any node. It returns None,
+        when node does not exist.
+        """
+        self._request_id += 1
+        request_id = self._request_id
+        self.sock.setblocking(True)
+        self.sock.sendall(request_frame(['GET', request_id, node_id]))
+        end_time = time.time() + timeout
+        while request_id not in self._replies:
+            remaining = end_time - time.time()
+            if remaining <= 0.0:
+                raise TimeoutError('Hub did not reply in time')
+            if self.update(remaining) is None:
+                raise ConnectionError('Hub closed connection')
+        return self._replies.pop(request_id)
+
+    def close(self):
+        """
+        This method disconnects from hub
+        """
+        self.sock.close()
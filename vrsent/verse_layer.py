@@ -23,7 +23,173 @@ client. This class could be used for sharing list or dictionaries.
 """
 
 
-from . import verse_entity
+import collections
+import itertools
+from . import verse_entity, verse_upload
+
+
+class VerseLayerObserver(object):
+    """
+    Parent class of objects (aggregates, indexes, etc.) that are notified
+    about each change of items of layer. Observer is attached to the layer
+    by VerseLayer.add_observer()
+    """
+
+    def __init__(self):
+        """
+        Constructor of VerseLayerObserver
+        """
+        self.layer = None
+
+    def attach(self, layer):
+        """
+        This method is called, when observer is added to the layer
+        """
+        self.layer = layer
+        self.rebuild()
+
+    def detach(self):
+        """
+        This method is called, when observer is removed from the layer
+        """
+        self.layer = None
+
+    def reset(self):
+        """
+        This method resets state of observer
+        """
+        pass
+
+    def rebuild(self):
+        """
+        This method computes state of observer from all items of layer
+        """
+        self.reset()
+        if self.layer is not None:
+            for item_id, value in self.layer.items.items():
+                self.item_set(item_id, None, value)
+
+    def item_set(self, item_id, old_value, new_value):
+        """
+        This method is called, when value of item was set. The old_value
+        is None, when item was added.
+        """
+        pass
+
+    def item_unset(self, item_id, old_value):
+        """
+        This method is called, when item was removed from layer
+        """
+        pass
+
+
+class VerseLayerChanges(VerseLayerObserver):
+    """
+    Class representing log of changed items of layer. Each change gets
+    sequence number and only the last change of each item is kept. Consumers
+    hold cursors (sequence number of last consumed change). Changes already
+    consumed by all cursors are removed from the log.
+    """
+
+    def __init__(self):
+        """
+        Constructor of VerseLayerChanges
+        """
+        super(VerseLayerChanges, self).__init__()
+        # Ordered dictionary of sequence numbers (item ID is used as key).
+        # The most recently changed item is at the end.
+        self.log = collections.OrderedDict()
+        self.seq = 0
+        # The dictionary of positions of cursors (cursor ID is used as key)
+        self.cursors = {}
+        self._cursor_ids = itertools.count()
+
+    def rebuild(self):
+        """
+        Log is not computed from existing items
+        """
+        pass
+
+    def _change(self, item_id):
+        """
+        This method adds change of item to the log
+        """
+        if len(self.cursors) == 0:
+            return
+        self.seq += 1
+        self.log[item_id] = self.seq
+        self.log.move_to_end(item_id)
+
+    def item_set(self, item_id, old_value, new_value):
+        """
+        This method adds changed item to the log
+        """
+        self._change(item_id)
+
+    def item_unset(self, item_id, old_value):
+        """
+        This method adds removed item to the log
+        """
+        self._change(item_id)
+
+    def open_cursor(self):
+        """
+        This method returns ID of new cursor. Only changes made after
+        opening of cursor are consumed by this cursor.
+        """
+        cursor = next(self._cursor_ids)
+        self.cursors[cursor] = self.seq
+        return cursor
+
+    def close_cursor(self, cursor):
+        """
+        This method removes cursor
+        """
+        self.cursors.pop(cursor, None)
+        self._prune()
+
+    def _prune(self):
+        """
+        This method removes changes consumed by all cursors
+        """
+        if len(self.cursors) == 0:
+            self.log.clear()
+            return
+        min_seq = min(self.cursors.values())
+        while len(self.log) > 0:
+            item_id, seq = next(iter(self.log.items()))
+            if seq > min_seq:
+                break
+            self.log.popitem(last=False)
+
+    def consume(self, cursor):
+        """
+        This method returns sorted list of ranges (first and last item ID)
+        of items changed since last consumption by cursor
+        """
+        last_seq = self.cursors[cursor]
+        item_ids = []
+        for item_id in reversed(self.log):
+            if self.log[item_id] <= last_seq:
+                break
+            item_ids.append(item_id)
+        self.cursors[cursor] = self.seq
+        self._prune()
+        return id_ranges(item_ids)
+
+
+def id_ranges(item_ids):
+    """
+    This function returns sorted list of ranges (first and last ID)
+    covering all item IDs
+    """
+    ranges = []
+    for item_id in sorted(item_ids):
+        if len(ranges) > 0 and isinstance(item_id, int) and ranges[-1][1] == item_id - 1:
+            ranges[-1][1] = item_id
+        else:
+            ranges.append([item_id, item_id])
+    return [tuple(id_range) for id_range in ranges]
 
 
 # TODO: implement all required methods
@@ -43,45 +209,131 @@ class VerseLayerItems(dict):
 
     def __setitem__(self, key, value):
         """
-        Setter of item that tries to send new value to Verse server
+        Setter of item that tries to send new value to Verse server. New
+        value is checked at once, but in thread safe session item is changed
+        by the thread calling callback_update().
         """
-        if self.layer.id is not None and self.layer.send_cmds is True:
-            self.layer.node.session.send_layer_set_value(
-                self.layer.node.prio,
-                self.layer.node.id,
-                self.layer.id,
-                key,
-                self.layer.data_type,
-                value
-            )
-        return super(VerseLayerItems, self).__setitem__(key, value)
+        send = self.layer.send_cmds
+        if send is True:
+            self._check(key, value)
+        self.layer.node.session.call_in_callback(self._set_value, key, value, send)
+
+    def _check(self, key, value):
+        """
+        This method raises exception, when value of item can not be stored
+        """
+        if self.layer.estimated is True:
+            verse_entity.check_data_type(value, self.layer.data_type, self.layer.max_quantization_error)
+
+    def _set_value(self, key, value, send):
+        """
+        This method stores value of item. When send is True, then new value
+        is sent to Verse server. Otherwise value was received from Verse
+        server or it is sent by caller and it is not checked.
+        """
+        session = self.layer.node.session
+        last_sent = self.layer._last_sent
+        if send is not True:
+            if key in last_sent:
+                # Value received from Verse server
+                last_sent[key] = value
+        elif self.layer.id is not None:
+            # Do not send value equal to last sent or received value, but
+            # new value is always stored locally
+            if self.layer._is_unchanged(session, last_sent.get(key), value) is True:
+                session.suppress_cmd('layer_set_value')
+            else:
+                if self.layer._suppressing(session) is True:
+                    last_sent[key] = value
+                session.send_layer_set_value(
+                    self.layer.node.prio,
+                    self.layer.node.id,
+                    self.layer.id,
+                    key,
+                    self.layer.data_type,
+                    value
+                )
+        old_value = self.get(key)
+        self._store(key, value)
+        self._local_changed(key, old_value, value, send)
+
+    def _store(self, key, value):
+        """
+        This method stores value of item without sending it
+        """
+        super(VerseLayerItems, self).__setitem__(key, value)
+
+    def _remove(self, key):
+        """
+        This method removes item without sending unset command
+        """
+        return super(VerseLayerItems, self).pop(key)
+
+    def close(self):
+        """
+        This method releases resources used for storing items. It is
+        called, when layer is cleaned.
+        """
+        pass
 
     def pop(self, key, default=None):
         """
-        Pop item from dict that tries to unset value at Verse server
+        Pop item from dict that tries to unset value at Verse server. In
+        thread safe session item is removed by the thread calling
+        callback_update() and value changed by other thread could be
+        still queued. Thus current value or default value is returned.
         """
-        if self.layer.id is not None:
-            self.layer.node.session.send_layer_unset_value(
+        value = self.get(key, default)
+        self.layer.node.session.call_in_callback(self._unset_value, key, self.layer.send_cmds)
+        return value
+
+    def _unset_value(self, key, send):
+        """
+        This method removes item. When send is True, then unset command is
+        sent to Verse server. Removed value or None is returned.
+        """
+        session = self.layer.node.session
+        self.layer._last_sent.pop(key, None)
+        if self.layer.id is not None and send is True:
+            session.send_layer_unset_value(
                 self.layer.node.prio,
                 self.layer.node.id,
                 self.layer.id,
                 key
             )
-        return super(VerseLayerItems, self).pop(key)
+        try:
+            value = self._remove(key)
+        except KeyError:
+            return None
+        self._local_changed(key, value, None, send)
+        return value
+
+    def _local_changed(self, key, old_value, value, journal):
+        """
+        This method notifies observers of layer about changed item (value
+        None is removed item) and it marks layer as changed in snapshots.
+        When journal is True and session is not connected, then changed
+        item is journaled.
+        """
+        if value is None:
+            for observer in self.layer.observers:
+                observer.item_unset(key, old_value)
+        else:
+            for observer in self.layer.observers:
+                observer.item_set(key, old_value, value)
+        session = self.layer.node.session
+        if session.snapshots is not None and self.layer.id is not None:
+            session.snapshots.layer_changed(self.layer.node.id, self.layer.id)
+        if session.outbox is not None and session.state != 'CONNECTED' and journal is True:
+            session.outbox.item_set(self.layer, key, value)
 
     def popitem(self):
         """
         Pop some item from dictionary and tries to unset this value at Verse server
         """
-        key, value = super(VerseLayerItems, self).popitem()
-        if self.layer.id is not None:
-            self.layer.node.session.send_layer_unset_value(
-                self.layer.node.prio,
-                self.layer.node.id,
-                self.layer.id,
-                key
-            )
-        return key, value
+        for key in self:
+            return key, self.pop(key)
+        raise KeyError('popitem(): layer items are empty')
 
 
 def find_layer_subclass(cls, node_custom_type, custom_type):
@@ -135,6 +387,13 @@ class VerseLayer(verse_entity.VerseEntity):
     
     subclasses = {}
 
+    # Mode of estimation of data_type, when data_type is not specified.
+    # Real values could be quantized to real_data_type, when error of
+    # all items of values is not bigger than max_quantization_error
+    data_type_mode = verse_entity.DATA_TYPE_WIDEST
+    real_data_type = None
+    max_quantization_error = 0.0
+
     def __new__(cls, *args, **kwargs):
         """
         Pre-constructor of VerseLayer. It can return class defined
@@ -160,20 +419,46 @@ class VerseLayer(verse_entity.VerseEntity):
         else:
             return super(VerseLayer, cls).__new__(cls)
 
-    def __init__(self, node, parent_layer=None, layer_id=None, data_type=None, count=1, custom_type=None):
+    def __init__(self, node, parent_layer=None, layer_id=None, data_type=None, count=1, custom_type=None,
+                 items=None):
         """
-        Constructor of VerseLayer
+        Constructor of VerseLayer. When data_type is not specified, then
+        it is estimated from initial items and values of items set later
+        have to fit into this data_type.
         """
         super(VerseLayer, self).__init__(custom_type=custom_type)
         self.node = node
         self.parent_layer = parent_layer
         self.id = layer_id
+        self.estimated = False
+        # The dictionary of last sent or received values of items (item ID
+        # is used as key). It is used only for suppressing of unchanged values.
+        self._last_sent = {}
+        if data_type is None and items:
+            try:
+                data_type = verse_entity.estimate_data_type(
+                    (item for value in items.values() for item in value),
+                    self.data_type_mode,
+                    self.real_data_type,
+                    self.max_quantization_error)
+            except KeyError:
+                raise TypeError("Unsupported data_type of VerseLayer items")
+            self.estimated = True
         self.data_type = data_type
         self.count = count
         self.child_layers = {}
+        # Observers notified about changes of items
+        self.observers = []
+        # Log of changes created, when the first cursor is opened
+        self.changes = None
         self.items = VerseLayerItems(self)
         self.send_cmds = True
 
+        # Add initial items, these items are sent, when layer is created
+        if items:
+            for item_id, value in items.items():
+                self.items[item_id] = value
+
         # Change state and send commands
         self._create()
 
@@ -201,12 +486,88 @@ class VerseLayer(verse_entity.VerseEntity):
             '. custom_type: ' + \
             str(self.custom_type)
 
+    def add_observer(self, observer):
+        """
+        This method adds observer (e.g. aggregate) to the layer. State of
+        observer is computed from current items of layer. Then it is updated
+        after each change of items. It returns observer.
+        """
+        self.observers.append(observer)
+        observer.attach(self)
+        return observer
+
+    def remove_observer(self, observer):
+        """
+        This method removes observer from the layer
+        """
+        self.observers.remove(observer)
+        observer.detach()
+
+    def open_cursor(self):
+        """
+        This method starts tracking of changed items for new consumer.
+        It returns cursor used in consume_changes()
+        """
+        if self.changes is None:
+            self.changes = self.add_observer(VerseLayerChanges())
+        return self.changes.open_cursor()
+
+    def close_cursor(self, cursor):
+        """
+        This method stops tracking of changes for consumer
+        """
+        if self.changes is not None:
+            self.changes.close_cursor(cursor)
+
+    def consume_changes(self, cursor):
+        """
+        This method returns sorted list of ranges (first and last item ID)
+        of items set or unset since the last call with the same cursor.
+        Current values could be read from the dictionary items (removed
+        items are not in this dictionary).
+        """
+        return self.changes.consume(cursor)
+
+    def upload(self, items, budget=10000, prio=None, on_progress=None):
+        """
+        This method sends items (dictionary or iterable of pairs item ID
+        and value) in chunks. At most budget items is sent in each
+        callback_update() of session. It returns VerseLayerUpload with
+        future resolved with count of sent items.
+        """
+        upload = verse_upload.VerseLayerUpload(self, items, budget, prio, on_progress)
+        self.node.session.uploads.append(upload)
+        return upload
+
+    def _create_dependency(self):
+        """
+        Layer could be created, when parent layer or node is created
+        """
+        if self.parent_layer is not None:
+            return self.parent_layer
+        else:
+            return self.node
+
+    def _create_prio(self):
+        """
+        Priority of create command is priority of node
+        """
+        return self.node.prio
+
+    def _schedule_create(self):
+        """
+        Create command is sent by scheduler of session
+        """
+        self.node.session.create_scheduler.schedule(self)
+
     def _send_create(self):
         """
         Send layer create to Verse server
         """
-        if self.id is not None:
+        if self.node.id is not None:
             if self.parent_layer is not None:
+                if self.parent_layer.id is None:
+                    return
                 self.node.session.send_layer_create(
                     self.node.prio,
                     self.node.id,
@@ -234,6 +595,18 @@ class VerseLayer(verse_entity.VerseEntity):
                 self.id
             )
 
+    def _auto_subscribe(self):
+        """
+        Layer created from record of lazy store, which was already
+        subscribed, is not subscribed again
+        """
+        lazy_store = self.node.session.lazy_store
+        if lazy_store is not None and self.id is not None and \
+                lazy_store.is_subscribed(verse_entity.LAZY_LAYER, self.node.id, self.id) is True:
+            self.subscribed = True
+            return False
+        return True
+
     def subscribe(self):
         """
         Tries to send layer subscribe command to Verse server
@@ -266,13 +639,16 @@ class VerseLayer(verse_entity.VerseEntity):
         """
         This method clean all data from this object
         """
+        self.node.session.create_scheduler.forget(self)
         # Clean all child nodes, but do not send destroy commands
         # for them, because Verse server do this automatically too
         for layer in self.child_layers.values():
             layer.parent_layer = None
             layer.clean()
         self.child_layers.clear()
-        self.node.layers.pop(self.id)
+        self.items.close()
+        if self.id is not None:
+            self.node.layers.pop(self.id)
 
     def destroy(self):
         """
@@ -319,10 +695,15 @@ class VerseLayer(verse_entity.VerseEntity):
         else:
             layer.id = layer_id
             node.layers[layer_id] = layer
+            if layer.parent_layer is not None:
+                layer.parent_layer.child_layers[layer_id] = layer
 
         # Change state of layer
         layer.cb_receive_create()
 
+        # Send layer_create commands for pending child layers
+        session.create_scheduler.cb_receive_create(layer)
+
         # When this layer has some pending values, then send them to Verse server
         for item_id, value in layer.items.items():
             session.send_layer_set_value(node.prio, node.id, layer.id, item_id, layer.data_type, value)
@@ -368,9 +749,7 @@ class VerseLayer(verse_entity.VerseEntity):
         except KeyError:
             return None
         # Set item value, but do not send command to verse server
-        layer.send_cmds = False
-        layer.items[item_id] = value
-        layer.send_cmds = True
+        layer.items._set_value(item_id, value, False)
 
         return layer
 
@@ -390,12 +769,9 @@ class VerseLayer(verse_entity.VerseEntity):
             layer = node.layers[layer_id]
         except KeyError:
             return None
-        # UnSet item value
-        try:
-            layer.items.pop(item_id)
-        except KeyError:
-            # When item was not found, then return layer
-            pass
+        # UnSet item value, but do not send command to verse server. When
+        # item was not found, then layer is returned too
+        layer.items._unset_value(item_id, False)
 
         return layer
 
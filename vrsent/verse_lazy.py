@@ -0,0 +1,356 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+"""
+This module includes class VerseLazyStore that stores raw records of tag
+groups, tags and layers received from Verse server. Objects of these
+entities (including subclasses) are created, when they are accessed for
+the first time in dictionaries node.tag_groups, tg.tags or node.layers.
+"""
+
+
+import verse as vrs
+from . import verse_entity, verse_tag_group, verse_tag, verse_layer
+
+
+class VerseLazyStore(object):
+    """
+    Class representing store of records of entities that were not
+    accessed yet. Instance of this class is created by
+    VerseSession.enable_lazy_entities()
+    """
+
+    def __init__(self, session, subscribe=False):
+        """
+        Constructor of VerseLazyStore. When subscribe is True, then tag
+        groups and layers are subscribed, when their records are added.
+        """
+        self.session = session
+        self.subscribe = subscribe
+        # Records of tag groups: {node_id: {tg_id: custom_type}}
+        self.tag_groups = {}
+        # Records of tags: {node_id: {tg_id: {tag_id: [data_type, count, custom_type, value]}}}
+        self.tags = {}
+        # Records of layers: {node_id: {layer_id: [parent_layer_id, data_type, count, custom_type, items]}}
+        self.layers = {}
+        # Key (kind, node_id, entity_id) of tag group or layer created from
+        # record, which was already subscribed, when record was added.
+        # Automatic subscribing of this entity is skipped.
+        self.skip_subscribe = None
+
+    def __len__(self):
+        """
+        This method returns count of records in the store
+        """
+        count = sum(len(records) for records in self.tag_groups.values())
+        count += sum(len(records) for tg_records in self.tags.values() for records in tg_records.values())
+        count += sum(len(records) for records in self.layers.values())
+        return count
+
+    def _records(self, kind, owner):
+        """
+        This method returns records of child entities of owner (node or tag group)
+        """
+        if owner.id is None:
+            return {}
+        if kind == verse_entity.LAZY_TAG_GROUP:
+            return self.tag_groups.get(owner.id, {})
+        elif kind == verse_entity.LAZY_LAYER:
+            return self.layers.get(owner.id, {})
+        else:
+            return self.tags.get(owner.node.id, {}).get(owner.id, {})
+
+    def has(self, kind, owner, key):
+        """
+        This method returns True, when record of child entity is in the store
+        """
+        return key in self._records(kind, owner)
+
+    def keys(self, kind, owner):
+        """
+        This method returns the list of keys of records of child entities
+        """
+        return list(self._records(kind, owner).keys())
+
+    def is_subscribed(self, kind, node_id, entity_id):
+        """
+        This method returns True, when tag group or layer created from record
+        was already subscribed
+        """
+        return self.skip_subscribe == (kind, node_id, entity_id)
+
+    def _create(self, kind, node_id, entity_id, create_method, *args):
+        """
+        This method creates object of tag group or layer using class method
+        create_method. Entity subscribed by the store is not subscribed again.
+        """
+        self.skip_subscribe = (kind, node_id, entity_id) if self.subscribe is True else None
+        try:
+            return create_method(self.session, *args)
+        finally:
+            self.skip_subscribe = None
+
+    def load(self, kind, owner, key):
+        """
+        This method creates object of entity from record
+        """
+        if kind == verse_entity.LAZY_TAG_GROUP:
+            return self.load_tag_group(owner.id, key)
+        elif kind == verse_entity.LAZY_LAYER:
+            return self.load_layer(owner.id, key)
+        else:
+            return self.load_tag(owner.node.id, owner.id, key)
+
+    def _pop(self, records, node_id, key):
+        """
+        This method removes record from dictionary of records of one node
+        """
+        node_records = records[node_id]
+        record = node_records.pop(key)
+        if len(node_records) == 0:
+            records.pop(node_id)
+        return record
+
+    # Tag groups
+    def is_lazy_tag_group(self, node_id, tg_id, custom_type):
+        """
+        This method returns True, when new tag group could be stored as record
+        """
+        if self.session._is_lazy_node(node_id) is True:
+            return True
+        node = self.session.nodes.get(node_id)
+        if node is None or dict.__contains__(node.tag_groups, tg_id):
+            return False
+        # Tag groups of system nodes are always objects
+        if node.custom_type in self.session.node_registry.eager_custom_types:
+            return False
+        # Tag groups created by this client are always objects
+        tg = node.tg_queue.get(custom_type)
+        return tg is None or tg.id is not None
+
+    def add_tag_group(self, node_id, tg_id, custom_type):
+        """
+        This method adds record of tag group
+        """
+        try:
+            self.tag_groups[node_id][tg_id] = custom_type
+        except KeyError:
+            self.tag_groups[node_id] = {tg_id: custom_type}
+        if self.subscribe is True:
+            self.session.send_taggroup_subscribe(vrs.DEFAULT_PRIORITY, node_id, tg_id, 0, 0)
+
+    def has_tag_group(self, node_id, tg_id):
+        """
+        This method returns True, when record of tag group is in the store
+        """
+        return tg_id in self.tag_groups.get(node_id, {})
+
+    def remove_tag_group(self, node_id, tg_id):
+        """
+        This method removes record of tag group and records of its tags
+        """
+        try:
+            self._pop(self.tag_groups, node_id, tg_id)
+        except KeyError:
+            pass
+        try:
+            self._pop(self.tags, node_id, tg_id)
+        except KeyError:
+            pass
+
+    def load_tag_group(self, node_id, tg_id):
+        """
+        This method creates object of tag group from record
+        """
+        try:
+            custom_type = self._pop(self.tag_groups, node_id, tg_id)
+        except KeyError:
+            raise KeyError(tg_id)
+        node = self.session.nodes[node_id]
+        cls = verse_tag_group.custom_type_subclass(node.custom_type, custom_type)
+        return self._create(
+            verse_entity.LAZY_TAG_GROUP,
+            node_id,
+            tg_id,
+            cls.cb_receive_tg_create,
+            node_id,
+            tg_id,
+            custom_type)
+
+    # Tags
+    def is_lazy_tag(self, node_id, tg_id, tag_id, custom_type):
+        """
+        This method returns True, when new tag could be stored as record
+        """
+        if self.has_tag_group(node_id, tg_id) is True:
+            return True
+        node = self.session.nodes.get(node_id)
+        if node is None:
+            return False
+        tg = dict.get(node.tag_groups, tg_id)
+        if tg is None or dict.__contains__(tg.tags, tag_id):
+            return False
+        if node.custom_type in self.session.node_registry.eager_custom_types:
+            return False
+        # Tags created by this client are always objects
+        tag = tg.tag_queue.get(custom_type)
+        return tag is None or tag.id is not None
+
+    def add_tag(self, node_id, tg_id, tag_id, data_type, count, custom_type):
+        """
+        This method adds record of tag
+        """
+        tg_records = self.tags.setdefault(node_id, {}).setdefault(tg_id, {})
+        tg_records[tag_id] = [data_type, count, custom_type, None]
+
+    def has_tag(self, node_id, tg_id, tag_id):
+        """
+        This method returns True, when record of tag is in the store
+        """
+        return tag_id in self.tags.get(node_id, {}).get(tg_id, {})
+
+    def set_tag_value(self, node_id, tg_id, tag_id, value):
+        """
+        This method changes value in record of tag
+        """
+        self.tags[node_id][tg_id][tag_id][3] = value
+
+    def remove_tag(self, node_id, tg_id, tag_id):
+        """
+        This method removes record of tag
+        """
+        try:
+            self.tags[node_id][tg_id].pop(tag_id)
+        except KeyError:
+            pass
+
+    def load_tag(self, node_id, tg_id, tag_id):
+        """
+        This method creates object of tag from record
+        """
+        try:
+            data_type, count, custom_type, value = self.tags[node_id][tg_id].pop(tag_id)
+        except KeyError:
+            raise KeyError(tag_id)
+        node = self.session.nodes[node_id]
+        tg = node.tag_groups[tg_id]
+        cls = verse_tag.custom_type_subclass(node.custom_type, tg.custom_type, custom_type)
+        tag = cls.cb_receive_tag_create(self.session, node_id, tg_id, tag_id, data_type, count, custom_type)
+        if value is not None:
+            cls.cb_receive_tag_set_values(self.session, node_id, tg_id, tag_id, value)
+        return tag
+
+    # Layers
+    def is_lazy_layer(self, node_id, layer_id, custom_type):
+        """
+        This method returns True, when new layer could be stored as record
+        """
+        if self.session._is_lazy_node(node_id) is True:
+            return True
+        node = self.session.nodes.get(node_id)
+        if node is None or dict.__contains__(node.layers, layer_id):
+            return False
+        if node.custom_type in self.session.node_registry.eager_custom_types:
+            return False
+        # Layers created by this client are always objects
+        layer = node.layer_queue.get(custom_type)
+        return layer is None or layer.id is not None
+
+    def add_layer(self, node_id, parent_layer_id, layer_id, data_type, count, custom_type):
+        """
+        This method adds record of layer
+        """
+        record = [parent_layer_id, data_type, count, custom_type, {}]
+        try:
+            self.layers[node_id][layer_id] = record
+        except KeyError:
+            self.layers[node_id] = {layer_id: record}
+        if self.subscribe is True:
+            self.session.send_layer_subscribe(vrs.DEFAULT_PRIORITY, node_id, layer_id, 0, 0)
+
+    def has_layer(self, node_id, layer_id):
+        """
+        This method returns True, when record of layer is in the store
+        """
+        return layer_id in self.layers.get(node_id, {})
+
+    def set_layer_value(self, node_id, layer_id, item_id, value):
+        """
+        This method changes value of item in record of layer
+        """
+        self.layers[node_id][layer_id][4][item_id] = value
+
+    def unset_layer_value(self, node_id, layer_id, item_id):
+        """
+        This method removes item from record of layer
+        """
+        self.layers[node_id][layer_id][4].pop(item_id, None)
+
+    def remove_layer(self, node_id, layer_id):
+        """
+        This method removes record of layer and records of its child layers
+        """
+        try:
+            self._pop(self.layers, node_id, layer_id)
+        except KeyError:
+            return
+        for child_layer_id, record in list(self.layers.get(node_id, {}).items()):
+            if record[0] == layer_id:
+                self.remove_layer(node_id, child_layer_id)
+
+    def load_layer(self, node_id, layer_id):
+        """
+        This method creates object of layer from record
+        """
+        try:
+            parent_layer_id, data_type, count, custom_type, items = self._pop(self.layers, node_id, layer_id)
+        except KeyError:
+            raise KeyError(layer_id)
+        node = self.session.nodes[node_id]
+        # Parent layer has to be created first
+        if parent_layer_id is not None:
+            try:
+                node.layers[parent_layer_id]
+            except KeyError:
+                pass
+        cls = verse_layer.custom_type_subclass(node.custom_type, custom_type)
+        layer = self._create(
+            verse_entity.LAZY_LAYER,
+            node_id,
+            layer_id,
+            cls.cb_receive_layer_create,
+            node_id,
+            parent_layer_id,
+            layer_id,
+            data_type,
+            count,
+            custom_type)
+        # Set items, but do not send them to Verse server
+        for item_id, value in items.items():
+            layer.items._set_value(item_id, value, False)
+        return layer
+
+    # Nodes
+    def remove_node(self, node_id):
+        """
+        This method removes all records of entities of node
+        """
+        self.tag_groups.pop(node_id, None)
+        self.tags.pop(node_id, None)
+        self.layers.pop(node_id, None)
@@ -0,0 +1,333 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+"""
+This module includes class VerseLockManager that is used for locking
+of nodes without polling of lock state. Each lock request returns
+future that is resolved, when Verse server confirms locking of all
+requested nodes. This module also includes class VerseLockTimeout that
+is set as exception of future, when nodes were not locked in time.
+"""
+
+
+import asyncio
+import concurrent.futures
+import time
+
+
+class VerseLockTimeout(Exception):
+    """
+    Exception for lock requests that were not finished in time
+    """
+
+    def __init__(self, node_ids, timeout):
+        """
+        Constructor of exception
+        """
+        self.node_ids = node_ids
+        self.timeout = timeout
+
+    def __str__(self):
+        """
+        Method for printing content of exception
+        """
+        return 'Nodes: ' + str(self.node_ids) + ' were not locked in: ' + str(self.timeout) + ' s'
+
+
+class VerseLockStats(object):
+    """
+    Class with statistics of locking of one node
+    """
+
+    def __init__(self):
+        """
+        Constructor of VerseLockStats
+        """
+        self.requests = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.contention = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def __str__(self):
+        """
+        String representation of VerseLockStats
+        """
+        return 'VerseLockStats, requests: ' + \
+            str(self.requests) + \
+            ', acquired: ' + \
+            str(self.acquired) + \
+            ', timeouts: ' + \
+            str(self.timeouts) + \
+            ', contention: ' + \
+            str(self.contention) + \
+            ', avg_wait: ' + \
+            str(self.avg_wait) + \
+            ', max_wait: ' + \
+            str(self.max_wait)
+
+    @property
+    def avg_wait(self):
+        """
+        Getter of average time of waiting for lock
+        """
+        if self.acquired == 0:
+            return 0.0
+        else:
+            return self.total_wait / self.acquired
+
+
+class VerseLockRequest(object):
+    """
+    Class representing one request for locking of batch of nodes.
+    Nodes are locked one by one in deterministic order (sorted by
+    node ID). Next node is locked, when lock of previous node is
+    confirmed. Thus two clients locking overlapping batches of nodes
+    can not wait for each other forever.
+    """
+
+    def __init__(self, nodes, timeout):
+        """
+        Constructor of VerseLockRequest
+        """
+        self.nodes = sorted(nodes, key=lock_order)
+        self.timeout = timeout
+        self.start_time = time.time()
+        if timeout is not None:
+            self.deadline = self.start_time + timeout
+        else:
+            self.deadline = None
+        self.future = concurrent.futures.Future()
+        # Index of node that is currently locked
+        self.index = 0
+        # Time, when lock command of current node was sent
+        self.node_start_time = None
+        # Nodes locked by this request
+        self.acquired = []
+
+    @property
+    def node(self):
+        """
+        Getter of node that is currently locked by this request
+        """
+        try:
+            return self.nodes[self.index]
+        except IndexError:
+            return None
+
+
+def lock_order(node):
+    """
+    This function returns key used for sorting of nodes in the batch.
+    Nodes without ID are locked as last nodes.
+    """
+    if node.id is None:
+        return 1, 0
+    else:
+        return 0, node.id
+
+
+class VerseLockManager(object):
+    """
+    Class for locking of nodes. Instance of this class is created
+    for each VerseSession and it is available as session.lock_manager
+    """
+
+    def __init__(self, session):
+        """
+        Constructor of VerseLockManager
+        """
+        self.session = session
+        # The list of unfinished lock requests
+        self.requests = []
+        # The dictionary of requests waiting for confirmation of lock
+        # (node object is used as key, because ID of node could be unknown)
+        self.waiting = {}
+        # The set of nodes with lock command sent by requests that
+        # were cancelled or timed out. These nodes are unlocked, when
+        # confirmation of lock is received
+        self.abandoned = set()
+        # The dictionary of lock statistics (node ID is used as key)
+        self.stats = {}
+
+    def node_stats(self, node_id):
+        """
+        This method returns statistics of locking of node with node_id
+        """
+        try:
+            stats = self.stats[node_id]
+        except KeyError:
+            stats = self.stats[node_id] = VerseLockStats()
+        return stats
+
+    def lock(self, node, timeout=None):
+        """
+        This method tries to lock one node. It returns future that is
+        resolved, when lock is confirmed by Verse server.
+        """
+        return self.lock_nodes((node,), timeout)
+
+    def lock_nodes(self, nodes, timeout=None):
+        """
+        This method tries to lock batch of nodes. It returns future that
+        is resolved with the list of locked nodes, when all nodes are locked.
+        When nodes are not locked in timeout, then already locked nodes are
+        unlocked and future is finished with VerseLockTimeout exception.
+        """
+        request = VerseLockRequest(nodes, timeout)
+        self.requests.append(request)
+        self._lock_next(request)
+        return request.future
+
+    def lock_async(self, node, timeout=None, loop=None):
+        """
+        This method tries to lock one node. It returns asyncio future.
+        """
+        return self.lock_nodes_async((node,), timeout, loop)
+
+    def lock_nodes_async(self, nodes, timeout=None, loop=None):
+        """
+        This method tries to lock batch of nodes. It returns asyncio future.
+        Note: callback_update() has to be called in other thread or
+        asyncio task to receive confirmation of locks.
+        """
+        return asyncio.wrap_future(self.lock_nodes(nodes, timeout), loop=loop)
+
+    def unlock_nodes(self, nodes):
+        """
+        This method unlocks batch of nodes in reverse order of locking
+        """
+        for node in sorted(nodes, key=lock_order, reverse=True):
+            if node.locked_by_me is True and node.locked is True:
+                node.unlock()
+
+    def _lock_next(self, request):
+        """
+        This method sends lock command for next node of the request
+        """
+        while request.node is not None:
+            node = request.node
+            # Node could be locked by this client already
+            if node.locked is True and node.locked_by_me is True:
+                request.index += 1
+                continue
+            if node.id is not None:
+                self.node_stats(node.id).requests += 1
+            request.node_start_time = time.time()
+            self.abandoned.discard(node)
+            try:
+                self.waiting[node].append(request)
+            except KeyError:
+                self.waiting[node] = [request]
+            if node._lock_state != 'LOCKING':
+                node.lock()
+            return
+        # All nodes were locked
+        self._finish(request)
+        if request.future.cancelled() is True:
+            self.unlock_nodes(request.acquired)
+        else:
+            request.future.set_result(list(request.nodes))
+
+    def _finish(self, request):
+        """
+        This method removes request from all lists of unfinished requests
+        """
+        try:
+            self.requests.remove(request)
+        except ValueError:
+            pass
+        node = request.node
+        if node is not None:
+            try:
+                self.waiting[node].remove(request)
+            except (KeyError, ValueError):
+                pass
+            else:
+                if len(self.waiting[node]) == 0:
+                    self.waiting.pop(node)
+                    # Lock of this node could be confirmed later
+                    self.abandoned.add(node)
+
+    def cb_receive_node_lock(self, node_id, avatar_id):
+        """
+        This method is called, when client received information about
+        locking of the node. It continues with locking of next nodes.
+        """
+        try:
+            node = self.session.nodes[node_id]
+        except KeyError:
+            return
+        if node not in self.waiting:
+            if node in self.abandoned:
+                self.abandoned.discard(node)
+                if avatar_id == self.session.avatar_id:
+                    node.unlock()
+            return
+        if avatar_id != self.session.avatar_id:
+            # Node is locked by other client. Requests will be
+            # repeated, when the node will be unlocked
+            self.node_stats(node_id).contention += 1
+            return
+        stats = self.node_stats(node_id)
+        now = time.time()
+        for request in self.waiting.pop(node):
+            wait_time = now - request.node_start_time
+            stats.acquired += 1
+            stats.total_wait += wait_time
+            stats.max_wait = max(stats.max_wait, wait_time)
+            request.acquired.append(node)
+            request.index += 1
+            self._lock_next(request)
+
+    def cb_receive_node_unlock(self, node_id, avatar_id):
+        """
+        This method is called, when client received information about
+        unlocking of the node. Lock is requested again, when some
+        request is waiting for this node.
+        """
+        try:
+            node = self.session.nodes[node_id]
+        except KeyError:
+            return
+        if node in self.waiting and avatar_id != self.session.avatar_id:
+            node.lock()
+
+    def update(self):
+        """
+        This method checks timeouts of unfinished requests and it
+        is called in each callback_update() of session
+        """
+        if len(self.requests) == 0:
+            return
+        now = time.time()
+        for request in list(self.requests):
+            if request.future.cancelled() is True:
+                # Nodes locked by cancelled request are unlocked
+                self._finish(request)
+                self.unlock_nodes(request.acquired)
+            elif request.deadline is not None and now > request.deadline:
+                self._finish(request)
+                self.unlock_nodes(request.acquired)
+                node = request.node
+                if node is not None and node.id is not None:
+                    self.node_stats(node.id).timeouts += 1
+                request.future.set_exception(
+                    VerseLockTimeout([node.id for node in request.nodes], request.timeout))
@@ -0,0 +1,297 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+"""
+This module includes class VerseMappedLayerItems that stores items of
+VerseLayer in memory mapped file instead of Python dictionary. Each item
+has record with fixed size at offset computed from item ID. Residency of
+items in memory is handled by page cache of operating system. The file
+could be reused as persistent cache of layer, when client is restarted.
+"""
+
+
+import mmap
+import os
+import struct
+import verse as vrs
+from . import verse_layer
+
+
+# Struct format codes of supported data types
+STRUCT_FORMATS = {
+    vrs.VALUE_TYPE_UINT8: 'B',
+    vrs.VALUE_TYPE_UINT16: 'H',
+    vrs.VALUE_TYPE_UINT32: 'I',
+    vrs.VALUE_TYPE_UINT64: 'Q',
+    vrs.VALUE_TYPE_REAL16: 'e',
+    vrs.VALUE_TYPE_REAL32: 'f',
+    vrs.VALUE_TYPE_REAL64: 'd'
+}
+
+
+# Header of file: magic, version, data_type, count, record size,
+# capacity (count of records) and count of items
+MAGIC = b'VRSL'
+VERSION = 1
+HEADER = struct.Struct('<4sIIIIQQ')
+HEADER_SIZE = 64
+
+
+# Minimal count of records in new file
+MIN_CAPACITY = 1024
+
+
+class VerseMappedLayerItems(verse_layer.VerseLayerItems):
+    """
+    Class representing items of layer stored in memory mapped file.
+    Record of item contains one byte with presence flag and count of
+    values of data_type of layer. Items are not stored in the dictionary,
+    but interface of VerseLayerItems is kept.
+    """
+
+    def __init__(self, layer, path):
+        """
+        Constructor of VerseMappedLayerItems. When file at path exists and
+        it was created for layer with the same data_type and count, then
+        items stored in the file are used.
+        """
+        super(VerseMappedLayerItems, self).__init__(layer)
+        try:
+            fmt = STRUCT_FORMATS[layer.data_type]
+        except KeyError:
+            raise TypeError('Unsupported data_type of memory mapped layer: ' + str(layer.data_type))
+        self.path = path
+        self.record = struct.Struct('<B' + fmt * layer.count)
+        self.capacity = 0
+        self.count = 0
+        self.file = None
+        self.mmap = None
+        self._open()
+
+    def _open(self):
+        """
+        This method opens existing file or it creates new file. Empty file
+        is initialized, but ValueError is raised, when existing file has
+        different layout.
+        """
+        if os.path.exists(self.path):
+            self.file = open(self.path, 'r+b')
+            header = self.file.read(HEADER.size)
+            if len(header) > 0:
+                if len(header) < HEADER.size:
+                    self.file.close()
+                    raise ValueError('Truncated header of memory mapped layer: ' + self.path)
+                magic, version, data_type, count, record_size, capacity, item_count = HEADER.unpack(header)
+                if magic != MAGIC or \
+                        version != VERSION or \
+                        data_type != self.layer.data_type or \
+                        count != self.layer.count or \
+                        record_size != self.record.size:
+                    self.file.close()
+                    raise ValueError('Different layout of memory mapped layer: ' + self.path)
+                self.capacity = capacity
+                self.count = item_count
+                self.mmap = mmap.mmap(self.file.fileno(), 0)
+                return
+        else:
+            self.file = open(self.path, 'w+b')
+        self._resize(MIN_CAPACITY)
+
+    def _resize(self, capacity):
+        """
+        This method changes count of records in the file
+        """
+        if self.mmap is not None:
+            self.mmap.close()
+        self.file.truncate(HEADER_SIZE + capacity * self.record.size)
+        self.capacity = capacity
+        self.mmap = mmap.mmap(self.file.fileno(), 0)
+        self._write_header()
+
+    def _write_header(self):
+        """
+        This method writes header of file
+        """
+        HEADER.pack_into(
+            self.mmap, 0,
+            MAGIC,
+            VERSION,
+            self.layer.data_type,
+            self.layer.count,
+            self.record.size,
+            self.capacity,
+            self.count)
+
+    def _offset(self, key):
+        """
+        This method returns offset of record of item
+        """
+        return HEADER_SIZE + key * self.record.size
+
+    def _present(self, key):
+        """
+        This method returns True, when item is stored in the file
+        """
+        if isinstance(key, int) is not True or key < 0 or key >= self.capacity:
+            return False
+        return self.mmap[self._offset(key)] != 0
+
+    def _pack(self, key, value):
+        """
+        This method returns record of item. Scalar value is stored as tuple
+        with one value.
+        """
+        if isinstance(key, int) is not True:
+            raise TypeError('ID of item of memory mapped layer must be integer: ' + str(key))
+        if key < 0:
+            raise ValueError('ID of item of memory mapped layer must not be negative: ' + str(key))
+        if isinstance(value, (tuple, list)) is not True:
+            value = (value,)
+        return self.record.pack(1, *value)
+
+    def _check(self, key, value):
+        """
+        This method raises exception, when item can not be stored in the file
+        """
+        super(VerseMappedLayerItems, self)._check(key, value)
+        self._pack(key, value)
+
+    def _store(self, key, value):
+        """
+        This method writes value of item to the file. Value is packed
+        before the file is changed, thus invalid value does not change
+        the file.
+        """
+        data = self._pack(key, value)
+        if key >= self.capacity:
+            self._resize(max(key + 1, 2 * self.capacity))
+        offset = self._offset(key)
+        present = self.mmap[offset] != 0
+        self.mmap[offset:offset + len(data)] = data
+        if present is not True:
+            self.count += 1
+            self._write_header()
+
+    def _remove(self, key):
+        """
+        This method removes item from the file
+        """
+        value = self[key]
+        self.mmap[self._offset(key)] = 0
+        self.count -= 1
+        self._write_header()
+        return value
+
+    def __getitem__(self, key):
+        """
+        This method reads value of item from the file
+        """
+        if self._present(key) is not True:
+            raise KeyError(key)
+        return self.record.unpack_from(self.mmap, self._offset(key))[1:]
+
+    def get(self, key, default=None):
+        """
+        This method returns value of item or default value
+        """
+        if self._present(key) is not True:
+            return default
+        return self.record.unpack_from(self.mmap, self._offset(key))[1:]
+
+    def __contains__(self, key):
+        """
+        This method returns True, when item is stored in the file
+        """
+        return self._present(key)
+
+    def __len__(self):
+        """
+        This method returns count of items
+        """
+        return self.count
+
+    def __iter__(self):
+        """
+        This method iterates over IDs of items. Only presence flags
+        of records are read from the file.
+        """
+        flags = self.mmap[HEADER_SIZE::self.record.size]
+        for key, flag in enumerate(flags):
+            if flag != 0:
+                yield key
+
+    def keys(self):
+        """
+        This method returns the list of IDs of items
+        """
+        return list(iter(self))
+
+    def values(self):
+        """
+        This method returns values of items
+        """
+        return [self[key] for key in self]
+
+    def items(self):
+        """
+        This method returns the list of IDs and values of items
+        """
+        return [(key, self[key]) for key in self]
+
+    def clear(self):
+        """
+        This method removes all items from the file without sending
+        any command to Verse server
+        """
+        self.mmap[HEADER_SIZE:] = bytes(len(self.mmap) - HEADER_SIZE)
+        self.count = 0
+        self._write_header()
+
+    def flush(self):
+        """
+        This method writes changes to the disk
+        """
+        self.mmap.flush()
+
+    def close(self):
+        """
+        This method flushes changes and closes the file
+        """
+        if self.mmap is not None:
+            self.mmap.flush()
+            self.mmap.close()
+            self.mmap = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def map_layer_items(layer, path):
+    """
+    This function replaces items of layer with items stored in memory
+    mapped file at path. Current items of layer are written to the file
+    and observers of layer are rebuilt. It returns new items.
+    """
+    items = VerseMappedLayerItems(layer, path)
+    for item_id, value in layer.items.items():
+        items._store(item_id, value)
+    layer.items = items
+    for observer in layer.observers:
+        observer.rebuild()
+    return items
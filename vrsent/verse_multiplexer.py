@@ -0,0 +1,236 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+
+"""
+This module includes class VerseMultiplexer that calls callback_update()
+of many instances of VerseSession from one thread. Sessions are scheduled
+with deficit round robin. Each session gets time budget in each round and
+session that spent more time than its budget skips following rounds until
+its deficit is paid back. Session, whose callback_update() raised
+exception, is removed and other sessions are updated further.
+"""
+
+
+import threading
+import time
+
+
+class VerseSessionStats(object):
+    """
+    Class representing statistics of one session driven by multiplexer
+    """
+
+    def __init__(self, session):
+        """
+        Constructor of VerseSessionStats
+        """
+        self.session = session
+        self.deficit = 0.0
+        self.updates = 0
+        self.skipped = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_update = time.time()
+        # Exception raised by callback_update() of session
+        self.error = None
+
+    def __str__(self):
+        """
+        String representation of VerseSessionStats
+        """
+        return 'VerseSessionStats, session: ' + \
+            self.session.hostname + ':' + self.session.service + \
+            ', updates: ' + \
+            str(self.updates) + \
+            ', skipped: ' + \
+            str(self.skipped) + \
+            ', avg_time: ' + \
+            str(self.avg_time)
+
+    @property
+    def avg_time(self):
+        """
+        Getter of average time of callback_update()
+        """
+        if self.updates == 0:
+            return 0.0
+        return self.total_time / self.updates
+
+    def backlog(self):
+        """
+        This method returns dictionary with backlog of session: time since
+        last callback_update() and counts of commands waiting for sending
+        """
+        session = self.session
+        scheduler = session.create_scheduler
+        uploads = 0
+        for upload in session.uploads:
+            if upload.total is not None:
+                uploads += upload.total - upload.sent
+        return {
+            'lag': time.time() - self.last_update,
+            'skipped': self.skipped,
+            'send_queue': len(session.send_queue),
+            'create_ready': len(scheduler.ready),
+            'create_waiting': sum(len(entities) for entities in scheduler.waiting.values()),
+            'create_in_flight': len(scheduler.in_flight),
+            'lock_requests': len(session.lock_manager.requests),
+            'upload_items': uploads
+        }
+
+
+class VerseMultiplexer(threading.Thread):
+    """
+    Class representing one thread that calls callback_update() of many
+    sessions. Sessions added to multiplexer should be created with
+    callback_thread=False.
+    """
+
+    def __init__(self, fps=60, budget=None, *args, **kwargs):
+        """
+        Constructor of VerseMultiplexer. One round of updates of all sessions
+        is performed fps times per second. The budget is time in seconds
+        that one session could spend in callback_update() in one round. When
+        budget is None, then time of one frame is divided between sessions.
+        """
+        super(VerseMultiplexer, self).__init__(*args, **kwargs)
+        self.daemon = True
+        self.fps = fps
+        self.budget = budget
+        # The list of statistics of sessions in order of scheduling
+        self.stats = []
+        self._lock = threading.Lock()
+        self._start_index = 0
+        self._running = False
+        self.rounds = 0
+        # The list of statistics of sessions removed after exception
+        self.failed = []
+
+    def __len__(self):
+        """
+        This method returns count of sessions
+        """
+        return len(self.stats)
+
+    def add_session(self, session):
+        """
+        This method adds session to multiplexer
+        """
+        with self._lock:
+            stats = VerseSessionStats(session)
+            self.stats.append(stats)
+        return stats
+
+    def remove_session(self, session):
+        """
+        This method removes session from multiplexer
+        """
+        with self._lock:
+            self.stats = [stats for stats in self.stats if stats.session is not session]
+
+    def session_stats(self, session):
+        """
+        This method returns statistics of session
+        """
+        for stats in self.stats:
+            if stats.session is session:
+                return stats
+        raise KeyError(session)
+
+    def backlog(self):
+        """
+        This method returns the list of pairs of session and its backlog.
+        Sessions with the longest lag are first.
+        """
+        report = [(stats.session, stats.backlog()) for stats in self.stats]
+        report.sort(key=lambda item: item[1]['lag'], reverse=True)
+        return report
+
+    @property
+    def quantum(self):
+        """
+        Getter of time budget of one session in one round
+        """
+        if self.budget is not None:
+            return self.budget
+        return 1.0 / self.fps / max(len(self.stats), 1)
+
+    def update(self):
+        """
+        This method performs one round of callback_update() of sessions.
+        The first session of round is rotated. Disconnected sessions and
+        sessions that raised exception are removed. It returns time spent
+        in this round.
+        """
+        round_start = time.time()
+        quantum = self.quantum
+        with self._lock:
+            stats_list = list(self.stats)
+        count = len(stats_list)
+        if count == 0:
+            return 0.0
+        self._start_index %= count
+        order = stats_list[self._start_index:] + stats_list[:self._start_index]
+        self._start_index += 1
+        for stats in order:
+            if stats.session.state == 'DISCONNECTED':
+                self.remove_session(stats.session)
+                continue
+            # Session that exceeded its budget waits until deficit is paid
+            stats.deficit = min(stats.deficit + quantum, quantum)
+            if stats.deficit <= 0.0:
+                stats.skipped += 1
+                continue
+            start_time = time.time()
+            try:
+                stats.session.callback_update()
+            except Exception as error:
+                # Failure of one session does not stop other sessions
+                stats.error = error
+                self.failed.append(stats)
+                self.remove_session(stats.session)
+                continue
+            end_time = time.time()
+            elapsed = end_time - start_time
+            stats.deficit -= elapsed
+            stats.updates += 1
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+            stats.last_update = end_time
+        self.rounds += 1
+        return time.time() - round_start
+
+    def run(self):
+        """
+        This method is executed, when thread is started. It performs rounds
+        of updates until stop() is called.
+        """
+        self._running = True
+        while self._running is True:
+            elapsed = self.update()
+            delay = 1.0 / self.fps - elapsed
+            if delay > 0.0:
+                time.sleep(delay)
+
+    def stop(self):
+        """
+        This method stops loop of thread
+        """
+        self._running = False
@@ -22,6 +22,9 @@ This module includes class VerseNode representing verse node
 """
 
 
+import collections
+import concurrent.futures
+import time
 import verse as vrs
 from . import verse_entity
 
@@ -65,6 +68,121 @@ def custom_type_subclass(custom_type):
     return sub_cls
 
 
+class VerseNodeBatch(object):
+    """
+    Class representing batch of nodes created by VerseSession.create_nodes().
+    Nodes are created gradually, when max_in_flight is specified. Future of
+    the batch is resolved with the list of nodes, when IDs of all nodes
+    are known. Nodes destroyed before confirmation of creating are removed
+    from the batch.
+    """
+
+    def __init__(self, session, cls, count, max_in_flight=None, **kwargs):
+        """
+        Constructor of VerseNodeBatch
+        """
+        self.session = session
+        self.cls = cls
+        self.count = count
+        self.max_in_flight = max_in_flight
+        self.kwargs = kwargs
+        self.nodes = []
+        self.created = 0
+        self.future = concurrent.futures.Future()
+        self.start_time = time.time()
+        self.end_time = None
+        self._create_nodes()
+        if count == 0:
+            self._finish()
+
+    def __str__(self):
+        """
+        String representation of VerseNodeBatch
+        """
+        return 'VerseNodeBatch, count: ' + \
+            str(self.count) + \
+            ', created: ' + \
+            str(self.created) + \
+            ', in_flight: ' + \
+            str(self.in_flight) + \
+            ', throughput: ' + \
+            str(self.throughput)
+
+    @property
+    def in_flight(self):
+        """
+        Getter of count of nodes waiting for confirmation of creating
+        """
+        return len(self.nodes) - self.created
+
+    @property
+    def done(self):
+        """
+        Getter of state of batch. It is True, when IDs of all nodes are known.
+        """
+        return self.future.done()
+
+    @property
+    def throughput(self):
+        """
+        Getter of count of created nodes per second
+        """
+        end_time = self.end_time if self.end_time is not None else time.time()
+        if end_time <= self.start_time:
+            return 0.0
+        return self.created / (end_time - self.start_time)
+
+    def wait(self, timeout=None):
+        """
+        This method waits until all nodes are created and it returns them.
+        It could be used only, when callback_update() is called in other thread.
+        """
+        return self.future.result(timeout)
+
+    def _create_nodes(self):
+        """
+        This method creates new nodes, when limit of nodes waiting for
+        confirmation is not reached
+        """
+        while len(self.nodes) < self.count and \
+                (self.max_in_flight is None or self.in_flight < self.max_in_flight):
+            node = self.cls(session=self.session, **self.kwargs)
+            node.batch = self
+            self.nodes.append(node)
+
+    def _finish(self):
+        """
+        This method resolves future of the batch
+        """
+        self.end_time = time.time()
+        self.future.set_result(self.nodes)
+
+    def cb_receive_create(self, node):
+        """
+        This method is called, when node of this batch was created
+        at Verse server
+        """
+        self.created += 1
+        self._create_nodes()
+        if self.created == self.count:
+            self._finish()
+
+    def forget(self, node):
+        """
+        This method removes node destroyed before confirmation of creating
+        from the batch. Batch does not wait for this node and future is
+        resolved with remaining nodes.
+        """
+        if node.batch is not self:
+            return
+        node.batch = None
+        self.nodes.remove(node)
+        self.count -= 1
+        self._create_nodes()
+        if self.created == self.count and self.done is False:
+            self._finish()
+
+
 class VerseNode(verse_entity.VerseEntity):
     """
     Class representing Verse node
@@ -77,6 +195,9 @@ class VerseNode(verse_entity.VerseEntity):
     # This is used in subclasses of VerseNode
     custom_type = None
 
+    # Batch of nodes that created this node (see VerseSession.create_nodes())
+    batch = None
+
     def __new__(cls, *args, **kwargs):
         """
         Pre-constructor of VerseNode. It can return class defined
@@ -130,9 +251,15 @@ class VerseNode(verse_entity.VerseEntity):
 
         self.user_id = user_id
         self.child_nodes = {}
-        self.tag_groups = {}
+        # Tag groups and layers received from Verse server could be
+        # created, when they are accessed
+        if self.session.lazy_store is not None:
+            self.tag_groups = verse_entity.VerseLazyDict(self.session.lazy_store, verse_entity.LAZY_TAG_GROUP, self)
+            self.layers = verse_entity.VerseLazyDict(self.session.lazy_store, verse_entity.LAZY_LAYER, self)
+        else:
+            self.tag_groups = {}
+            self.layers = {}
         self.tg_queue = {}
-        self.layers = {}
         self.layer_queue = {}
         self._prio = vrs.DEFAULT_PRIORITY
         self.perms = {}
@@ -146,12 +273,17 @@ class VerseNode(verse_entity.VerseEntity):
         if node_id is None:
             # Try to find queue of custom_type of node or create new one
             try:
-                node_queue = self.session.my_node_queues[custom_type]
+                node_queue = self.session.my_node_queues[self.custom_type]
             except KeyError:
-                node_queue = []
+                node_queue = collections.deque()
                 self.session.my_node_queues[self.custom_type] = node_queue
-            # Add this object to the queue
-            node_queue.insert(0, self)
+            # Add this object to the queue. Verse server confirms creating
+            # of nodes in the same order, then the oldest node is popped
+            # from the other end of the queue
+            node_queue.appendleft(self)
+            # Journal new node, when session is not connected
+            if self.session.outbox is not None and self.session.state != 'CONNECTED':
+                self.session.outbox.node_create(self)
         else:
             self.session.nodes[node_id] = self
             if self._parent_node is not None:
@@ -181,6 +313,9 @@ class VerseNode(verse_entity.VerseEntity):
         """
         # Change state and send commands
         self._destroy()
+        # Batch does not wait for confirmation of destroyed node
+        if self.batch is not None and self.id is None:
+            self.batch.forget(self)
 
     def clean(self):
         """
@@ -193,6 +328,9 @@ class VerseNode(verse_entity.VerseEntity):
             child_node.clean()
         self.child_nodes.clear()
         # Remove reference on this node
+        self.session.create_scheduler.forget(self)
+        if self.batch is not None and self.id is None:
+            self.batch.forget(self)
         if self.id is not None:
             # Remove this node from dictionary of nodes
             self.session.nodes.pop(self.id)
@@ -206,6 +344,10 @@ class VerseNode(verse_entity.VerseEntity):
         # Clear tag groups
         self.tag_groups.clear()
         self.tg_queue.clear()
+        # Release items of layers (e.g. memory mapped files). Lazy layers
+        # are not materialized, because they do not have any items yet.
+        for layer in dict.values(self.layers):
+            layer.items.close()
         # Clear layers
         self.layers.clear()
         self.layer_queue.clear()
@@ -224,6 +366,17 @@ class VerseNode(verse_entity.VerseEntity):
         if self.session.state == 'CONNECTED' and self.id is not None:
             self.session.send_node_destroy(self._prio, self.id)
 
+    def _auto_subscribe(self):
+        """
+        Nodes of partitions of other shards and nodes already subscribed
+        by the registry of nodes are not subscribed
+        """
+        registry = self.session.node_registry
+        if registry is not None and self.id is not None and registry.skip_subscribe == self.id:
+            return False
+        shard = self.session.shard
+        return shard is None or self.id is None or shard.is_local(self.id)
+
     def subscribe(self):
         """
         This method tries to send node_subscribe command to Verse server
@@ -275,6 +428,8 @@ class VerseNode(verse_entity.VerseEntity):
         This is setter of node priority
         """
         self._prio = new_prio
+        if self.session.node_registry is not None:
+            self.session.node_registry.set_prio(self.id, new_prio)
         if self.id is not None:
             self.session.send_node_link(self._prio, self.id, self._prio)
 
@@ -477,23 +632,15 @@ class VerseNode(verse_entity.VerseEntity):
             if node._lock_state == 'LOCKING':
                 session.send_node_lock(node.prio, node.id)
 
-            # Send tag_group_create command for pending tag groups
-            for custom_type in node.tg_queue.keys():
-                session.send_taggroup_create(node.prio, node.id, custom_type)
-
-            # Send layer_create command for pending layers without parent layer
-            # This module will send automatically layer_create command for layers
-            # with parent layers, when layer_create command of their parent layers
-            # will be received
-            for layer in node.layer_queue.values():
-                if layer.parent_layer is None:
-                    session.send_layer_create(
-                        node.prio,
-                        node.id,
-                        -1,
-                        layer.data_type,
-                        layer.count,
-                        layer.custom_type)
+            # Send tag_group_create and layer_create commands for pending tag
+            # groups and layers without parent layer. Scheduler will send
+            # layer_create command for layers with parent layers, when
+            # layer_create command of their parent layers will be received
+            session.create_scheduler.cb_receive_create(node)
+
+            # Notify batch about creating of this node
+            if node.batch is not None:
+                node.batch.cb_receive_create(node)
 
         # Return reference at node
         return node
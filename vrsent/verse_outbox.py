@@ -0,0 +1,400 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+
+"""
+This module includes class VerseOutbox that journals changes made, when
+session is not connected to Verse server. Journal is append-only file with
+records serialized by marshal. Records are replayed, when session is
+connected, and also after restart of client, when the journal is opened
+again. Entities are identified by ID of node and custom types of tag
+groups, tags and layers. New nodes have local key instead of ID.
+
+Records:
+
+    ('NODE', key, custom_type, parent)
+    ('TAG', node, tg_custom_type, tag_custom_type, data_type, count, value)
+    ('ITEM', node, layer_custom_type, data_type, count, item_id, value)
+    ('DONE', record_key)
+
+Node is ID of node or ('LOCAL', key). Value of removed item is None.
+Only the last record of each tag or item is kept (coalescing). Record
+DONE marks record replayed or expired, thus the journal does not have to
+be rewritten after each replay. The file is synchronized to the disk at
+most once per fsync_interval and it is rewritten, when it contains too
+many overwritten records.
+"""
+
+
+import collections
+import os
+import time
+from . import verse_node, verse_tag_group, verse_tag, verse_layer, verse_hub, verse_snapshot
+
+
+class VerseOutbox(object):
+    """
+    Class representing journal of changes. It is created by method
+    VerseSession.enable_outbox() and it is available as session.outbox.
+    """
+
+    def __init__(self, session, path, compact_ratio=2.0, fsync_interval=1.0, max_age=600.0):
+        """
+        Constructor of VerseOutbox. When count of records in the file is
+        bigger than compact_ratio multiplied by count of coalesced records,
+        then the file is rewritten. Appended records are synchronized to the
+        disk at most fsync_interval seconds later. Records, that could not be
+        replayed for max_age seconds since the first attempt (e.g. node was
+        destroyed at Verse server), expire. None means no expiration.
+        """
+        self.session = session
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.fsync_interval = fsync_interval
+        self.max_age = max_age
+        # Coalesced records in order of the first change
+        self.records = collections.OrderedDict()
+        # The dictionary of times of the first unsuccessful replay of records
+        self._pending_since = {}
+        # The last expired records
+        self.expired = collections.deque(maxlen=1000)
+        # The dictionaries of new nodes and their local keys
+        self.local_nodes = {}
+        self.local_keys = {}
+        self._next_key = 0
+        self.appended = 0
+        self.replayed = 0
+        self._dirty = False
+        self._synced = time.time()
+        self._load()
+        self.file = open(path, 'ab')
+
+    def __str__(self):
+        """
+        String representation of VerseOutbox
+        """
+        return 'VerseOutbox, path: ' + \
+            self.path + \
+            ', pending: ' + \
+            str(len(self.records)) + \
+            ', replayed: ' + \
+            str(self.replayed) + \
+            ', expired: ' + \
+            str(len(self.expired))
+
+    def __len__(self):
+        """
+        This method returns count of pending records
+        """
+        return len(self.records)
+
+    @staticmethod
+    def record_key(record):
+        """
+        This method returns key used for coalescing of records
+        """
+        if record[0] == 'NODE':
+            return ('NODE', record[1])
+        elif record[0] == 'TAG':
+            return record[:4]
+        else:
+            return record[:3] + (record[5],)
+
+    def _load(self):
+        """
+        This method reads records from existing journal
+        """
+        if os.path.exists(self.path) is not True:
+            return
+        with open(self.path, 'rb') as journal:
+            buf = journal.read()
+        records = []
+        offset = 0
+        # Records are read until the first incomplete or damaged frame
+        while True:
+            try:
+                result = verse_hub.load_frame(buf, offset)
+            except (ValueError, EOFError, TypeError):
+                break
+            if result is None or isinstance(result[0], tuple) is not True or len(result[0]) == 0 or \
+                    result[0][0] not in ('NODE', 'TAG', 'ITEM', 'DONE'):
+                break
+            records.append(result[0])
+            offset = result[1]
+        for record in records:
+            if record[0] == 'DONE':
+                self.records.pop(record[1], None)
+                continue
+            self.records[self.record_key(record)] = record
+            if record[0] == 'NODE':
+                self._next_key = max(self._next_key, record[1] + 1)
+        self.appended = len(records)
+        # Incomplete or damaged records written at the end of file before
+        # crash are removed
+        if offset < len(buf):
+            self._rewrite()
+
+    def _write(self, record):
+        """
+        This method writes record to the end of the journal
+        """
+        self.file.write(verse_hub.frame(record))
+        self.file.flush()
+        self.appended += 1
+        self._dirty = True
+
+    def _append(self, record):
+        """
+        This method adds record to the journal
+        """
+        key = self.record_key(record)
+        self.records[key] = record
+        # Age of new value is measured from its first replay
+        self._pending_since.pop(key, None)
+        self._write(record)
+        if self._needs_compaction() is True:
+            self.compact()
+        else:
+            self.sync()
+
+    def _needs_compaction(self):
+        """
+        This method returns True, when the journal contains too many
+        overwritten and finished records
+        """
+        return self.appended > self.compact_ratio * max(len(self.records), 16)
+
+    def sync(self, force=False):
+        """
+        This method synchronizes appended records to the disk, when the
+        last synchronization is older than fsync_interval
+        """
+        if self._dirty is not True:
+            return
+        now = time.time()
+        if force is True or now - self._synced >= self.fsync_interval:
+            os.fsync(self.file.fileno())
+            self._synced = now
+            self._dirty = False
+
+    def _rewrite(self):
+        """
+        This method writes coalesced records to new file and replaces
+        the journal with it
+        """
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as journal:
+            for record in self.records.values():
+                journal.write(verse_hub.frame(record))
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(tmp_path, self.path)
+        self.appended = len(self.records)
+        self._dirty = False
+        self._synced = time.time()
+
+    def compact(self):
+        """
+        This method removes overwritten records from the journal
+        """
+        self.file.close()
+        self._rewrite()
+        self.file = open(self.path, 'ab')
+
+    def _node_ref(self, node):
+        """
+        This method returns reference of node used in records
+        """
+        if node.id is not None:
+            return node.id
+        try:
+            return ('LOCAL', self.local_keys[node])
+        except KeyError:
+            return ('LOCAL', self.node_create(node))
+
+    def node_create(self, node):
+        """
+        This method journals new node. It returns local key of node.
+        """
+        key = self._next_key
+        self._next_key += 1
+        self.local_nodes[key] = node
+        self.local_keys[node] = key
+        parent = node.parent
+        self._append(('NODE', key, node.custom_type, self._node_ref(parent) if parent is not None else None))
+        return key
+
+    def tag_set(self, tag):
+        """
+        This method journals value of tag
+        """
+        tg = tag.tg
+        self._append((
+            'TAG',
+            self._node_ref(tg.node),
+            tg.custom_type,
+            tag.custom_type,
+            tag.data_type,
+            tag.count,
+            verse_snapshot.frozen_value(tag._value)))
+
+    def item_set(self, layer, item_id, value):
+        """
+        This method journals value of item of layer. The value None means
+        removed item.
+        """
+        self._append((
+            'ITEM',
+            self._node_ref(layer.node),
+            layer.custom_type,
+            layer.data_type,
+            layer.count,
+            item_id,
+            verse_snapshot.frozen_value(value)))
+
+    def _resolve_node(self, ref):
+        """
+        This method returns node of reference or None, when node is not
+        known yet
+        """
+        if isinstance(ref, tuple):
+            return self.local_nodes.get(ref[1])
+        return self.session.nodes.get(ref)
+
+    def _replay_node(self, record):
+        """
+        This method creates node journaled before restart. It returns True,
+        when record is finished (node was created at Verse server).
+        """
+        key, custom_type, parent_ref = record[1:]
+        try:
+            node = self.local_nodes[key]
+        except KeyError:
+            parent = self._resolve_node(parent_ref) if parent_ref is not None else None
+            if parent_ref is not None and parent is None:
+                return False
+            node = verse_node.VerseNode(session=self.session, parent=parent, custom_type=custom_type)
+            self.local_nodes[key] = node
+            self.local_keys[node] = key
+        return node.id is not None
+
+    def _replay_tag(self, record):
+        """
+        This method sets journaled value of tag. Tag groups and tags of new
+        nodes are created, when they do not exist.
+        """
+        node_ref, tg_custom_type, tag_custom_type, data_type, count, value = record[1:]
+        node = self._resolve_node(node_ref)
+        if node is None:
+            return False
+        local = isinstance(node_ref, tuple)
+        tg = node.tg_queue.get(tg_custom_type)
+        if tg is None:
+            if local is not True:
+                return False
+            tg = verse_tag_group.VerseTagGroup(node=node, custom_type=tg_custom_type)
+        tag = tg.tag_queue.get(tag_custom_type)
+        if tag is None:
+            if local is not True:
+                return False
+            verse_tag.VerseTag(tg=tg, data_type=data_type, count=count, custom_type=tag_custom_type, value=value)
+        else:
+            tag.value = value
+        # Record of new node is kept until node is created at Verse server
+        return node.id is not None
+
+    def _find_layer(self, node, custom_type):
+        """
+        This method returns layer of node with custom_type or None
+        """
+        layer = node.layer_queue.get(custom_type)
+        if layer is not None:
+            return layer
+        for layer in node.layers.values():
+            if layer.custom_type == custom_type:
+                return layer
+        return None
+
+    def _replay_item(self, record):
+        """
+        This method sets or removes journaled item of layer. Layers of new
+        nodes are created, when they do not exist.
+        """
+        node_ref, custom_type, data_type, count, item_id, value = record[1:]
+        node = self._resolve_node(node_ref)
+        if node is None:
+            return False
+        layer = self._find_layer(node, custom_type)
+        if layer is None:
+            if isinstance(node_ref, tuple) is not True:
+                return False
+            layer = verse_layer.VerseLayer(node=node, data_type=data_type, count=count, custom_type=custom_type)
+        if value is None:
+            if item_id in layer.items:
+                layer.items.pop(item_id)
+        else:
+            layer.items[item_id] = value
+        return node.id is not None
+
+    def update(self):
+        """
+        This method replays records in order. Records of entities, that
+        are not received from Verse server yet, stay in the journal until
+        they expire. It is called in callback_update(), when session is
+        connected.
+        """
+        if len(self.records) == 0:
+            self.sync()
+            return
+        replay_methods = {'NODE': self._replay_node, 'TAG': self._replay_tag, 'ITEM': self._replay_item}
+        now = time.time()
+        finished = []
+        for key, record in list(self.records.items()):
+            if replay_methods[record[0]](record) is True:
+                finished.append(key)
+                self.replayed += 1
+                self._pending_since.pop(key, None)
+            elif self.max_age is not None and \
+                    now - self._pending_since.setdefault(key, now) >= self.max_age:
+                finished.append(key)
+                self.expired.append(record)
+                self._pending_since.pop(key)
+        for key in finished:
+            self.records.pop(key)
+        if len(finished) > 0:
+            if len(self.records) == 0:
+                # All records were replayed
+                self.file.truncate(0)
+                self.appended = 0
+                self._dirty = True
+                self.local_nodes = {}
+                self.local_keys = {}
+            else:
+                for key in finished:
+                    self._write(('DONE', key))
+                if self._needs_compaction() is True:
+                    self.compact()
+        self.sync()
+
+    def close(self):
+        """
+        This method closes the journal. Pending records stay in the file.
+        """
+        self.sync(force=True)
+        self.file.close()
@@ -0,0 +1,266 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+"""
+This module includes class VersePresence representing directory of
+avatars (clients) connected to Verse server. Directory contains flat
+records with information about avatars and their users. Records are
+updated, when tags of avatar info nodes and user nodes are changed.
+Session notifies listeners in batches at the end of callback_update(). Thus
+listeners get one event for each avatar joined, left or updated during the
+update instead of one event for each received tag.
+"""
+
+
+import collections
+
+
+# Events sent to listeners of presence directory
+PRESENCE_JOIN = 'JOIN'
+PRESENCE_LEAVE = 'LEAVE'
+PRESENCE_UPDATE = 'UPDATE'
+
+
+# Fields of presence record with default values
+PRESENCE_FIELDS = (
+    ('user_id', None),
+    ('username', ""),
+    ('hostname', ""),
+    ('login_time', 0),
+    ('client_name', ""),
+    ('client_version', "")
+)
+
+
+class VersePresenceRecord(object):
+    """
+    Class representing information about one avatar
+    """
+
+    __slots__ = ('avatar_id',) + tuple(name for name, default in PRESENCE_FIELDS)
+
+    def __init__(self, avatar_id):
+        """
+        Constructor of VersePresenceRecord
+        """
+        self.avatar_id = avatar_id
+        for name, default in PRESENCE_FIELDS:
+            setattr(self, name, default)
+
+    def __str__(self):
+        """
+        String representation of VersePresenceRecord
+        """
+        return 'Avatar (' + \
+            str(self.avatar_id) + \
+            '): ' + \
+            self.username + \
+            '@[' + \
+            self.hostname + \
+            '] (' + \
+            self.client_name + \
+            ' ' + \
+            self.client_version + \
+            ')'
+
+
+class VersePresence(object):
+    """
+    Class representing directory of avatars. Instance of this class
+    is created for each VerseSession and it is available as
+    session.presence
+    """
+
+    def __init__(self, session):
+        """
+        Constructor of VersePresence
+        """
+        self.session = session
+        # The dictionary of records (avatar ID is used as key)
+        self.records = {}
+        # The dictionary of names of users (user ID is used as key)
+        self.usernames = {}
+        # The dictionary of sets of avatar IDs (user ID is used as key)
+        self.user_avatars = {}
+        # The list of callbacks called with event and record
+        self.listeners = []
+        # When batch is True, then events are collected in the dictionary
+        # of pending events (avatar ID is used as key) until flush()
+        self.batch = False
+        self.pending = collections.OrderedDict()
+
+    def __len__(self):
+        """
+        This method returns count of avatars
+        """
+        return len(self.records)
+
+    def __contains__(self, avatar_id):
+        """
+        This method returns True, when avatar is in directory
+        """
+        return avatar_id in self.records
+
+    def __getitem__(self, avatar_id):
+        """
+        This method returns record of avatar
+        """
+        return self.records[avatar_id]
+
+    def __iter__(self):
+        """
+        This method iterates over records of avatars
+        """
+        return iter(list(self.records.values()))
+
+    def get(self, avatar_id, default=None):
+        """
+        This method returns record of avatar or default value
+        """
+        return self.records.get(avatar_id, default)
+
+    def user_records(self, user_id):
+        """
+        This method returns the list of records of avatars of user
+        """
+        return [self.records[avatar_id] for avatar_id in self.user_avatars.get(user_id, ())]
+
+    def add_listener(self, callback):
+        """
+        This method adds callback that is called with event (PRESENCE_JOIN,
+        PRESENCE_LEAVE or PRESENCE_UPDATE) and record of avatar
+        """
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """
+        This method removes callback
+        """
+        self.listeners.remove(callback)
+
+    def _notify(self, event, record):
+        """
+        This method calls all listeners or it adds event to pending events
+        """
+        if len(self.listeners) == 0:
+            return
+        elif self.batch is False:
+            for callback in self.listeners:
+                callback(event, record)
+            return
+        pending = self.pending.get(record.avatar_id)
+        if pending is None:
+            self.pending[record.avatar_id] = (event, record)
+        elif event == PRESENCE_LEAVE:
+            if pending[0] == PRESENCE_JOIN:
+                # Listeners have not seen this avatar at all
+                self.pending.pop(record.avatar_id)
+            else:
+                self.pending[record.avatar_id] = (event, record)
+        elif event == PRESENCE_JOIN:
+            # Avatar left and joined again during one batch
+            self.pending[record.avatar_id] = (PRESENCE_UPDATE, record)
+        # Update of joined or updated avatar is included in pending event
+
+    def flush(self):
+        """
+        This method calls listeners with pending events. It is called by
+        session at the end of callback_update()
+        """
+        pending, self.pending = self.pending, collections.OrderedDict()
+        if len(self.listeners) == 0:
+            return
+        for event, record in pending.values():
+            for callback in self.listeners:
+                callback(event, record)
+
+    def avatar_join(self, avatar_id):
+        """
+        This method adds record of new avatar
+        """
+        if avatar_id in self.records:
+            return self.records[avatar_id]
+        record = self.records[avatar_id] = VersePresenceRecord(avatar_id)
+        self._notify(PRESENCE_JOIN, record)
+        return record
+
+    def avatar_leave(self, avatar_id):
+        """
+        This method removes record of avatar
+        """
+        try:
+            record = self.records.pop(avatar_id)
+        except KeyError:
+            return None
+        try:
+            self.user_avatars[record.user_id].discard(avatar_id)
+        except KeyError:
+            pass
+        self._notify(PRESENCE_LEAVE, record)
+        return record
+
+    def set_info(self, avatar_id, name, value):
+        """
+        This method changes field of record of avatar
+        """
+        try:
+            record = self.records[avatar_id]
+        except KeyError:
+            return
+        if getattr(record, name) != value:
+            setattr(record, name, value)
+            self._notify(PRESENCE_UPDATE, record)
+
+    def set_user(self, avatar_id, user_id):
+        """
+        This method sets user of avatar
+        """
+        try:
+            record = self.records[avatar_id]
+        except KeyError:
+            return
+        if record.user_id == user_id:
+            return
+        try:
+            self.user_avatars[record.user_id].discard(avatar_id)
+        except KeyError:
+            pass
+        try:
+            self.user_avatars[user_id].add(avatar_id)
+        except KeyError:
+            self.user_avatars[user_id] = {avatar_id}
+        record.user_id = user_id
+        record.username = self.usernames.get(user_id, "")
+        self._notify(PRESENCE_UPDATE, record)
+
+    def set_username(self, user_id, username):
+        """
+        This method changes name of user in all records of its avatars
+        """
+        self.usernames[user_id] = username
+        for record in self.user_records(user_id):
+            if record.username != username:
+                record.username = username
+                self._notify(PRESENCE_UPDATE, record)
+
+    def remove_user(self, user_id):
+        """
+        This method removes name of destroyed user
+        """
+        self.usernames.pop(user_id, None)
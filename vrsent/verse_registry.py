@@ -0,0 +1,381 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+"""
+This module includes class VerseNodeRegistry that stores basic information
+about all nodes of session in typed arrays (one array for each column).
+Registry could be used for fast queries over whole scene. When NumPy is
+available, then queries are vectorized. This module also includes class
+VerseNodeDict that creates VerseNode objects only, when they are accessed.
+"""
+
+
+import array
+import verse as vrs
+from . import verse_node
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Value used in columns of IDs, when ID is not known
+NO_ID = (1 << 32) - 1
+
+
+# Lock states of nodes stored in the column of lock states
+LOCK_STATES = ('UNLOCKED', 'LOCKING', 'LOCKED', 'UNLOCKING')
+LOCK_STATE_CODES = {name: code for code, name in enumerate(LOCK_STATES)}
+
+
+# Columns of registry: name, array type code and NumPy data type
+COLUMNS = (
+    ('ids', 'I', 'uint32'),
+    ('parent_ids', 'I', 'uint32'),
+    ('user_ids', 'I', 'uint32'),
+    ('custom_types', 'H', 'uint16'),
+    ('prios', 'B', 'uint8'),
+    ('lock_states', 'B', 'uint8'),
+    ('locker_ids', 'I', 'uint32')
+)
+
+
+class VerseNodeDict(dict):
+    """
+    Class representing dictionary of nodes of session. When node is not
+    in the dictionary, but it is in the node registry, then VerseNode
+    object is created and added to this dictionary. Nodes in the registry
+    are visible by operator in and method get() too.
+    """
+
+    def __init__(self, registry, *args, **kwargs):
+        """
+        Constructor of VerseNodeDict
+        """
+        super(VerseNodeDict, self).__init__(*args, **kwargs)
+        self.registry = registry
+
+    def __missing__(self, node_id):
+        """
+        This method is called, when node is not in the dictionary
+        """
+        return self.registry.materialize(node_id)
+
+    def __contains__(self, node_id):
+        """
+        This method returns True, when node exists as VerseNode object or
+        it is in the node registry
+        """
+        return dict.__contains__(self, node_id) or node_id in self.registry
+
+    def get(self, node_id, default=None):
+        """
+        This method returns node or default value. Node in the registry is
+        created as VerseNode object.
+        """
+        try:
+            return self[node_id]
+        except KeyError:
+            return default
+
+
+class VerseNodeRegistry(object):
+    """
+    Class representing columnar registry of nodes. Registry is indexed
+    by node ID. Removed row is replaced with last row of columns.
+    """
+
+    def __init__(self, session, lazy=False, subscribe=False):
+        """
+        Constructor of VerseNodeRegistry. When lazy is True, then nodes
+        created by other clients are not created as VerseNode objects
+        until they are accessed. When subscribe is True, then such nodes
+        are subscribed immediately.
+        """
+        self.session = session
+        self.lazy = lazy
+        self.subscribe = subscribe
+        # ID of node created by materialize(), which was already subscribed,
+        # when it was received. Automatic subscribing of this node is skipped.
+        self.skip_subscribe = None
+        # Nodes of these custom types are always created immediately
+        self.eager_custom_types = {vrs.AVATAR_NODE_CT, vrs.AVATAR_INFO_NODE_CT, vrs.USER_NODE_CT}
+        # The dictionary with row of node (node ID is used as key)
+        self.rows = {}
+        for name, type_code, dtype in COLUMNS:
+            setattr(self, name, array.array(type_code))
+        # The dictionary of permissions of nodes that were not created yet
+        self.perms = {}
+
+    def __len__(self):
+        """
+        This method returns count of nodes in registry
+        """
+        return len(self.ids)
+
+    def __contains__(self, node_id):
+        """
+        This method returns True, when node is in registry
+        """
+        return node_id in self.rows
+
+    def __iter__(self):
+        """
+        This method iterates over IDs of nodes in registry
+        """
+        return iter(self.ids)
+
+    def row(self, node_id):
+        """
+        This method returns dictionary with values of node in all columns
+        """
+        index = self.rows[node_id]
+        values = {}
+        for name, type_code, dtype in COLUMNS:
+            values[name[:-1]] = getattr(self, name)[index]
+        values['lock_state'] = LOCK_STATES[values['lock_state']]
+        for name in ('parent_id', 'user_id', 'locker_id'):
+            if values[name] == NO_ID:
+                values[name] = None
+        return values
+
+    def add(self, node_id, parent_id, user_id, custom_type, prio=vrs.DEFAULT_PRIORITY):
+        """
+        This method adds node to registry or it updates existing row
+        """
+        if node_id in self.rows:
+            index = self.rows[node_id]
+            self.parent_ids[index] = NO_ID if parent_id is None else parent_id
+            self.user_ids[index] = NO_ID if user_id is None else user_id
+            self.custom_types[index] = custom_type
+            return
+        self.rows[node_id] = len(self.ids)
+        self.ids.append(node_id)
+        self.parent_ids.append(NO_ID if parent_id is None else parent_id)
+        self.user_ids.append(NO_ID if user_id is None else user_id)
+        self.custom_types.append(custom_type)
+        self.prios.append(prio)
+        self.lock_states.append(LOCK_STATE_CODES['UNLOCKED'])
+        self.locker_ids.append(NO_ID)
+
+    def add_node(self, node):
+        """
+        This method adds existing VerseNode object to registry
+        """
+        if node.id is None:
+            return
+        parent_id = node.parent.id if node.parent is not None else None
+        self.add(node.id, parent_id, node.user_id, node.custom_type, node.prio)
+        index = self.rows[node.id]
+        self.lock_states[index] = LOCK_STATE_CODES[node._lock_state]
+        self.locker_ids[index] = NO_ID if node.locker_id is None else node.locker_id
+
+    def remove(self, node_id):
+        """
+        This method removes node from registry
+        """
+        try:
+            index = self.rows.pop(node_id)
+        except KeyError:
+            return
+        self.perms.pop(node_id, None)
+        last = len(self.ids) - 1
+        for name, type_code, dtype in COLUMNS:
+            column = getattr(self, name)
+            if index != last:
+                column[index] = column[last]
+            column.pop()
+        if index != last:
+            self.rows[self.ids[index]] = index
+
+    def _set(self, column, node_id, value):
+        """
+        This method sets value of node in column
+        """
+        try:
+            index = self.rows[node_id]
+        except KeyError:
+            return
+        getattr(self, column)[index] = value
+
+    def set_parent(self, node_id, parent_id):
+        """
+        This method changes parent node of node
+        """
+        self._set('parent_ids', node_id, parent_id)
+
+    def set_owner(self, node_id, user_id):
+        """
+        This method changes owner of node
+        """
+        self._set('user_ids', node_id, user_id)
+
+    def set_prio(self, node_id, prio):
+        """
+        This method changes priority of node
+        """
+        self._set('prios', node_id, prio)
+
+    def set_lock(self, node_id, avatar_id):
+        """
+        This method stores information about locking of node
+        """
+        self._set('lock_states', node_id, LOCK_STATE_CODES['LOCKED'])
+        self._set('locker_ids', node_id, avatar_id)
+
+    def set_unlock(self, node_id):
+        """
+        This method stores information about unlocking of node
+        """
+        self._set('lock_states', node_id, LOCK_STATE_CODES['UNLOCKED'])
+        self._set('locker_ids', node_id, NO_ID)
+
+    def set_perm(self, node_id, user_id, perm):
+        """
+        This method stores permission of node that was not created yet
+        """
+        if node_id in self.rows:
+            try:
+                self.perms[node_id][user_id] = perm
+            except KeyError:
+                self.perms[node_id] = {user_id: perm}
+
+    def is_lazy(self, node_id, parent_id, user_id, custom_type):
+        """
+        This method returns True, when new node does not have to be
+        created as VerseNode object
+        """
+        if self.lazy is not True or custom_type in self.eager_custom_types:
+            return False
+        # Nodes created by this client and nodes created in advance
+        # are always objects
+        if parent_id == self.session.avatar_id and user_id == self.session.user_id:
+            return False
+        return dict.__contains__(self.session.nodes, node_id) is not True
+
+    def is_materialized(self, node_id):
+        """
+        This method returns True, when node exists as VerseNode object
+        """
+        return dict.__contains__(self.session.nodes, node_id)
+
+    def materialize(self, node_id):
+        """
+        This method creates VerseNode object of node from registry
+        """
+        try:
+            values = self.row(node_id)
+        except KeyError:
+            raise KeyError(node_id)
+        parent = None
+        if values['parent_id'] is not None:
+            try:
+                parent = self.session.nodes[values['parent_id']]
+            except KeyError:
+                pass
+        cls = verse_node.custom_type_subclass(values['custom_type'])
+        # Node subscribed, when it was received, is not subscribed again
+        shard = self.session.shard
+        subscribed = self.subscribe is True and (shard is None or shard.is_local(node_id) is True)
+        self.skip_subscribe = node_id if subscribed is True else None
+        try:
+            node = cls(
+                session=self.session,
+                node_id=node_id,
+                parent=parent,
+                user_id=values['user_id'],
+                custom_type=values['custom_type'])
+        finally:
+            self.skip_subscribe = None
+        if subscribed is True:
+            node.subscribed = True
+        node.cb_receive_create()
+        node._prio = values['prio']
+        node._lock_state = values['lock_state']
+        node.locker_id = values['locker_id']
+        node.perms.update(self.perms.pop(node_id, {}))
+        return node
+
+    def children(self, node_id):
+        """
+        This method returns the list of IDs of child nodes
+        """
+        return self.select(parent_id=node_id)
+
+    def column(self, name):
+        """
+        This method returns copy of column as NumPy array
+        """
+        for column_name, type_code, dtype in COLUMNS:
+            if column_name == name:
+                return numpy.array(getattr(self, name), dtype=dtype)
+        raise KeyError(name)
+
+    def mask(self, custom_type=None, parent_id=None, user_id=None, locked=None, locker_id=None):
+        """
+        This method returns NumPy mask of nodes matching all specified
+        criteria. Columns are accessed without copying.
+        """
+        if numpy is None:
+            raise ImportError('NumPy is required for vectorized queries')
+        mask = numpy.ones(len(self.ids), dtype=bool)
+        if len(self.ids) == 0:
+            return mask
+        criteria = (
+            ('custom_types', custom_type),
+            ('parent_ids', parent_id),
+            ('user_ids', user_id),
+            ('locker_ids', locker_id))
+        for name, type_code, dtype in COLUMNS:
+            for column_name, value in criteria:
+                if column_name == name and value is not None:
+                    mask &= numpy.frombuffer(getattr(self, name), dtype=dtype) == value
+        if locked is not None:
+            states = numpy.frombuffer(self.lock_states, dtype='uint8')
+            if locked is True:
+                mask &= states == LOCK_STATE_CODES['LOCKED']
+            else:
+                mask &= states != LOCK_STATE_CODES['LOCKED']
+        return mask
+
+    def select(self, custom_type=None, parent_id=None, user_id=None, locked=None, locker_id=None):
+        """
+        This method returns IDs of nodes matching all specified criteria.
+        It returns NumPy array, when NumPy is available. Otherwise it
+        returns list.
+        """
+        if numpy is not None:
+            mask = self.mask(custom_type, parent_id, user_id, locked, locker_id)
+            return numpy.array(self.ids, dtype='uint32')[mask]
+        node_ids = []
+        locked_code = LOCK_STATE_CODES['LOCKED']
+        for index, node_id in enumerate(self.ids):
+            if custom_type is not None and self.custom_types[index] != custom_type:
+                continue
+            if parent_id is not None and self.parent_ids[index] != parent_id:
+                continue
+            if user_id is not None and self.user_ids[index] != user_id:
+                continue
+            if locker_id is not None and self.locker_ids[index] != locker_id:
+                continue
+            if locked is not None and (self.lock_states[index] == locked_code) != locked:
+                continue
+            node_ids.append(node_id)
+        return node_ids
@@ -0,0 +1,194 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+"""
+This module includes class VerseCreateScheduler that sends create commands
+of tag groups, tags and layers. Each entity depends on entity that has to
+be created first (tag group depends on node, tag depends on tag group and
+layer depends on parent layer or node). Create command is sent as soon as
+the dependency is created at Verse server.
+"""
+
+
+import collections
+import heapq
+import itertools
+import time
+
+
+class VerseCreateScheduler(object):
+    """
+    Class representing scheduler of create commands. Instance of this class
+    is created for each VerseSession and it is available as
+    session.create_scheduler
+    """
+
+    def __init__(self, session, max_in_flight=None, history_size=1000):
+        """
+        Constructor of VerseCreateScheduler. When max_in_flight is not None,
+        then it limits count of create commands waiting for confirmation.
+        """
+        self.session = session
+        self.max_in_flight = max_in_flight
+        # Heap of entities ready to be created sorted by priority of node
+        self.ready = []
+        # The dictionary of entities waiting for creating of dependency
+        # (dependency is used as key)
+        self.waiting = {}
+        # The set of entities with sent create command
+        self.in_flight = set()
+        # The set of cleaned entities, that are still in the heap of ready
+        # entities or in the list of waiting entities (they are skipped)
+        self.forgotten = set()
+        # The dictionary with time, when entity switched to CREATING state
+        self.creating_start = {}
+        # The history of entities with time spent in CREATING state
+        self.history = collections.deque(maxlen=history_size)
+        self.created = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self._counter = itertools.count()
+
+    def __str__(self):
+        """
+        String representation of VerseCreateScheduler
+        """
+        return 'VerseCreateScheduler, ready: ' + \
+            str(len(self.ready)) + \
+            ', waiting: ' + \
+            str(sum(len(entities) for entities in self.waiting.values())) + \
+            ', in_flight: ' + \
+            str(len(self.in_flight)) + \
+            ', created: ' + \
+            str(self.created) + \
+            ', avg_time: ' + \
+            str(self.avg_time) + \
+            ', max_time: ' + \
+            str(self.max_time)
+
+    @property
+    def avg_time(self):
+        """
+        Getter of average time spent in CREATING state
+        """
+        if self.created == 0:
+            return 0.0
+        else:
+            return self.total_time / self.created
+
+    def creating(self):
+        """
+        This method returns the list of entities in CREATING state with
+        time spent in this state. The longest waiting entities are first.
+        """
+        now = time.time()
+        return sorted(
+            ((entity, now - start) for entity, start in self.creating_start.items()),
+            key=lambda item: item[1],
+            reverse=True)
+
+    def _push(self, entity):
+        """
+        This method adds entity to the heap of entities ready to be created
+        """
+        heapq.heappush(self.ready, (-entity._create_prio(), next(self._counter), entity))
+
+    def schedule(self, entity):
+        """
+        This method schedules sending of create command of entity
+        """
+        self.creating_start[entity] = time.time()
+        dependency = entity._create_dependency()
+        if dependency is not None and dependency.id is None:
+            try:
+                self.waiting[dependency].append(entity)
+            except KeyError:
+                self.waiting[dependency] = [entity]
+        else:
+            self._push(entity)
+            self.flush()
+
+    def flush(self):
+        """
+        This method sends create commands of ready entities, when limit
+        of create commands waiting for confirmation is not reached
+        """
+        while len(self.ready) > 0 and \
+                (self.max_in_flight is None or len(self.in_flight) < self.max_in_flight):
+            entity = heapq.heappop(self.ready)[2]
+            if entity in self.forgotten:
+                self.forgotten.discard(entity)
+                continue
+            entity._send_create()
+            self.in_flight.add(entity)
+
+    def cb_receive_create(self, entity):
+        """
+        This method is called, when entity was created at Verse server.
+        Entities depending on this entity are ready to be created.
+        """
+        self.in_flight.discard(entity)
+        try:
+            start = self.creating_start.pop(entity)
+        except KeyError:
+            pass
+        else:
+            creating_time = time.time() - start
+            self.created += 1
+            self.total_time += creating_time
+            self.max_time = max(self.max_time, creating_time)
+            self.history.append((entity, creating_time))
+        try:
+            entities = self.waiting.pop(entity)
+        except KeyError:
+            pass
+        else:
+            for waiting_entity in entities:
+                if waiting_entity in self.forgotten:
+                    self.forgotten.discard(waiting_entity)
+                else:
+                    self._push(waiting_entity)
+        self.flush()
+
+    def _forget_waiting(self, entity):
+        """
+        This method removes entities waiting for cleaned entity. They will
+        never be created.
+        """
+        for waiting_entity in self.waiting.pop(entity, ()):
+            self.creating_start.pop(waiting_entity, None)
+            self.forgotten.discard(waiting_entity)
+            self._forget_waiting(waiting_entity)
+
+    def forget(self, entity):
+        """
+        This method removes all references at cleaned entity. Entities
+        waiting for this entity will never be created.
+        """
+        in_flight = entity in self.in_flight
+        if in_flight is True:
+            self.in_flight.discard(entity)
+        elif entity in self.creating_start:
+            # Entity is in the heap of ready entities or in the list of
+            # entities waiting for dependency
+            self.forgotten.add(entity)
+        self.creating_start.pop(entity, None)
+        self._forget_waiting(entity)
+        if in_flight is True:
+            self.flush()
@@ -24,7 +24,10 @@ at verse client.
 
 
 import verse as vrs
-from . import verse_node, verse_tag_group, verse_tag, verse_layer
+from . import verse_node, verse_tag_group, verse_tag, verse_layer, verse_lock, verse_scheduler, verse_registry, verse_lazy, verse_presence, verse_snapshot, verse_executor, verse_shared, verse_hub, verse_outbox, verse_checkpoint
+import collections
+import contextlib
+import functools
 import threading
 import time
 
@@ -67,9 +70,14 @@ class VerseSession(vrs.Session):
     def __init__(
             self, hostname="localhost", service="12345",
             flags=vrs.DGRAM_SEC_DTLS, callback_thread=False,
-            username=None, password=None):
+            username=None, password=None, thread_safe=False, multiplexer=None, shard=None):
         """
-        Constructor of VerseSession
+        Constructor of VerseSession. When thread_safe is True, then send
+        methods called from other threads than the thread calling
+        callback_update() are queued and sent in the next callback_update().
+        When multiplexer is not None, then callback_update() is called by
+        this VerseMultiplexer instead of own thread. When shard is not None,
+        then only nodes of partition of this VerseShard are subscribed.
         """
         # Call method of parent class to connect to Verse server
         super(VerseSession, self).__init__(hostname, service, flags)
@@ -78,6 +86,12 @@ class VerseSession(vrs.Session):
         self.password = password
         self.debug_print = False
         self.state = 'CONNECTING'
+        # Policy of suppressing of commands with unchanged values. It
+        # could be overridden in subclasses of VerseTag and VerseLayer
+        self.suppress_unchanged = False
+        self.suppress_epsilon = None
+        # The dictionary with counts of suppressed commands
+        self.suppressed_cmds = {}
         # Add this session from list of sessions
         self.__class__.__sessions[hostname + ':' + service] = self
         # The dictionary of nodes that belongs to this session
@@ -86,6 +100,9 @@ class VerseSession(vrs.Session):
         self.users = {}
         # The dictionary of avatars/client that belongs to this session
         self.avatars = {}
+        # Directory of avatars with information about avatars and users
+        self.presence = verse_presence.VersePresence(self)
+        self.presence.batch = True
         # The dictionary of avatar info nodes
         self._avatar_info_nodes = {}
         # The dictionary of nodes that were created by this client and Verse
@@ -95,8 +112,48 @@ class VerseSession(vrs.Session):
         self.user_id = None
         self.avatar_id = None
         self.root_node = None
+        # Manager of lock requests
+        self.lock_manager = verse_lock.VerseLockManager(self)
+        # Scheduler of create commands of tag groups, tags and layers
+        self.create_scheduler = verse_scheduler.VerseCreateScheduler(self)
+        # Optional columnar registry of nodes
+        self.node_registry = None
+        # Store of records of tag groups, tags and layers that were not accessed yet
+        self.lazy_store = None
+        # The list of unfinished uploads of layers
+        self.uploads = []
+        # Optional publisher of snapshots for other threads
+        self.snapshots = None
+        # Optional executor of handlers of received commands
+        self.executor = None
+        # Optional partition of nodes subscribed by this session
+        self.shard = shard
+        # Optional writer of snapshots to shared memory
+        self.shared_mirror = None
+        # Optional hub serving local clients
+        self.hub = None
+        # Optional journal of changes made, when session is not connected
+        self.outbox = None
+        # Optional writer of periodic checkpoints
+        self.checkpointer = None
+        # Lock held during processing of received commands in thread safe
+        # mode. Other threads should hold it, when they read several entities
+        # at once. Changes of entities do not need this lock.
+        if thread_safe is True:
+            self.lock = threading.RLock()
+        else:
+            self.lock = contextlib.nullcontext()
+        # Queue of send commands and other calls from other threads than
+        # the thread calling callback_update()
+        self.thread_safe = thread_safe
+        self.send_queue = collections.deque()
+        self._callback_thread = None
+        if thread_safe is True:
+            self._queue_sends()
         # Start callback_update thread
-        if callback_thread is True:
+        if multiplexer is not None:
+            multiplexer.add_session(self)
+        elif callback_thread is True:
             self.cb_thread = CallbackUpdate(self)
             self.cb_thread.start()
 
@@ -128,6 +185,79 @@ class VerseSession(vrs.Session):
             else:
                 print("Unsupported authenticate method")
 
+    def callback_update(self):
+        """
+        This method receives commands from Verse server, calls callback
+        methods, then it checks timeouts of pending lock requests and
+        sends next chunks of layer uploads and it replays changes from
+        outbox. Commands queued by other threads are sent first and
+        snapshot is published at the end. Handlers, that did not fit to
+        the queue of executor, are submitted after session.lock is released.
+        """
+        with self.lock:
+            self._callback_thread = threading.current_thread().ident
+            self.send_queued()
+            super(VerseSession, self).callback_update()
+            self.presence.flush()
+            self.lock_manager.update()
+            for upload in list(self.uploads):
+                upload.update()
+            if self.outbox is not None:
+                if self.state == 'CONNECTED':
+                    self.outbox.update()
+                else:
+                    self.outbox.sync()
+            if self.snapshots is not None:
+                self.snapshots.publish()
+        if self.executor is not None:
+            self.executor.drain()
+
+    def _queue_sends(self):
+        """
+        This method replaces all send methods of this session with
+        methods that queue commands called from other threads
+        """
+        for name in dir(self.__class__):
+            if name.startswith('send_') and name != 'send_queued':
+                setattr(self, name, functools.partial(self.call_in_callback, getattr(self, name)))
+
+    def in_callback_thread(self):
+        """
+        This method returns True, when session is not thread safe or when
+        it is called from the thread calling callback_update()
+        """
+        return self.thread_safe is False or threading.current_thread().ident == self._callback_thread
+
+    def call_in_callback(self, function, *args):
+        """
+        This method calls function at once, when it is called from the thread
+        calling callback_update(). Otherwise function is queued and it is
+        called at the beginning of next callback_update().
+        """
+        if self.in_callback_thread() is True:
+            return function(*args)
+        # Appending to the deque is atomic, then no lock is needed
+        self.send_queue.append((function, args))
+
+    def send_queued(self):
+        """
+        This method sends commands and calls functions queued by other threads
+        """
+        send_queue = self.send_queue
+        while len(send_queue) > 0:
+            function, args = send_queue.popleft()
+            function(*args)
+
+    def suppress_cmd(self, cmd_name):
+        """
+        This method counts command that was not sent, because
+        value was not changed
+        """
+        try:
+            self.suppressed_cmds[cmd_name] += 1
+        except KeyError:
+            self.suppressed_cmds[cmd_name] = 1
+
     @property
     def fps(self):
         """
@@ -153,6 +283,16 @@ class VerseSession(vrs.Session):
         except KeyError:
             return None
 
+    @property
+    def snapshot(self):
+        """
+        Getter of the latest published snapshot of nodes. It returns None,
+        when snapshots are not enabled
+        """
+        if self.snapshots is None:
+            return None
+        return self.snapshots.current
+
     # Connection
     def cb_receive_connect_accept(self, user_id, avatar_id):
         """
@@ -167,10 +307,12 @@ class VerseSession(vrs.Session):
         self.state = 'CONNECTED'
         # "Subscribe" to root node
         self.root_node = verse_node.VerseNode(session=self, node_id=0, parent=None, user_id=100, custom_type=0)
-        # Send pending node create commands
+        if self.node_registry is not None:
+            self.node_registry.add_node(self.root_node)
+        # Send pending node create commands (the oldest node first)
         for queue in self.my_node_queues.values():
-            for node in queue:
-                self.send_node_create(node.prio(), node.custom_type)
+            for node in reversed(queue):
+                self.send_node_create(node.prio, node.custom_type)
 
     def cb_receive_connect_terminate(self, error):
         """
@@ -183,6 +325,132 @@ class VerseSession(vrs.Session):
         # Remove this instance from the list of sessions
         self.__class__.__sessions.pop(self.hostname + ':' + self.service)
 
+    def create_nodes(self, cls, count, max_in_flight=None, **kwargs):
+        """
+        This method creates count of new nodes of class cls. Keyed arguments
+        are passed to the constructor of each node. When max_in_flight is
+        specified, then next nodes are created, when previous nodes are
+        confirmed by Verse server. It returns VerseNodeBatch.
+        """
+        return verse_node.VerseNodeBatch(self, cls, count, max_in_flight, **kwargs)
+
+    def enable_node_registry(self, lazy=False, subscribe=False):
+        """
+        This method enables columnar registry of nodes. When lazy is True,
+        then nodes created by other clients are created as VerseNode objects,
+        when they are accessed in the dictionary session.nodes. When subscribe
+        is True, then these nodes are subscribed immediately. Otherwise they
+        are subscribed, when they are accessed.
+        """
+        if self.node_registry is None:
+            self.node_registry = verse_registry.VerseNodeRegistry(self, lazy, subscribe)
+            for node in self.nodes.values():
+                self.node_registry.add_node(node)
+            self.nodes = verse_registry.VerseNodeDict(self.node_registry, self.nodes)
+        return self.node_registry
+
+    def enable_lazy_entities(self, subscribe=False):
+        """
+        This method enables lazy creating of nodes, tag groups, tags and
+        layers created by other clients. Only records of these entities are
+        stored until they are accessed in dictionaries session.nodes,
+        node.tag_groups, tg.tags or node.layers. It has to be called before
+        any node is received from Verse server. When subscribe is True, then
+        received nodes, tag groups and layers are subscribed immediately.
+        """
+        if self.lazy_store is None:
+            self.lazy_store = verse_lazy.VerseLazyStore(self, subscribe)
+            registry = self.enable_node_registry(lazy=True, subscribe=subscribe)
+            registry.lazy = True
+        return self.lazy_store
+
+    def enable_snapshots(self):
+        """
+        This method enables publishing of immutable snapshots of nodes,
+        tag groups, tags and layers at the end of each callback_update().
+        The latest snapshot is available as session.snapshot.
+        """
+        if self.snapshots is None:
+            with self.lock:
+                self.snapshots = verse_snapshot.VerseSnapshots(self)
+        return self.snapshots
+
+    def enable_shared_mirror(self, name=None, size=64 * 1024 * 1024, node_filter=None):
+        """
+        This method enables publishing of snapshots to shared memory with
+        name. Other processes could read it using VerseSharedMirrorReader.
+        """
+        if self.shared_mirror is None:
+            with self.lock:
+                self.shared_mirror = verse_shared.VerseSharedMirror(self, name, size, node_filter)
+        return self.shared_mirror
+
+    def enable_hub(self, path):
+        """
+        This method enables hub serving snapshots of nodes to local clients
+        connected to Unix domain socket at path
+        """
+        if self.hub is None:
+            with self.lock:
+                self.hub = verse_hub.VerseHub(self, path)
+        return self.hub
+
+    def enable_outbox(self, path, compact_ratio=2.0, fsync_interval=1.0, max_age=600.0):
+        """
+        This method enables journaling of changes made, when session is not
+        connected to Verse server, to the file at path. Changes are sent,
+        when session is connected again or when new session is created with
+        the same path after restart of client.
+        """
+        if self.outbox is None:
+            with self.lock:
+                self.outbox = verse_outbox.VerseOutbox(self, path, compact_ratio, fsync_interval, max_age)
+        return self.outbox
+
+    def enable_checkpoints(self, path, interval=10.0, compact_segments=16):
+        """
+        This method enables periodic checkpoints of nodes to the directory
+        at path. Checkpoints are written by background thread and they
+        could be read by verse_checkpoint.restore() after restart of client.
+        """
+        if self.checkpointer is None:
+            with self.lock:
+                self.checkpointer = verse_checkpoint.VerseCheckpointer(self, path, interval, compact_segments)
+            self.checkpointer.start()
+        return self.checkpointer
+
+    def enable_executor(self, pool=None, max_workers=4, max_queue=1000, key=verse_executor.KEY_NODE):
+        """
+        This method enables calling of handlers of received commands in
+        pool of threads or processes. Handlers are added by method
+        session.executor.add_handler() and they are called after object
+        model is updated. Handlers with the same key (node or entity) are
+        called in order of received commands.
+        """
+        if self.executor is None:
+            self.executor = verse_executor.VerseHandlerExecutor(self, pool, max_workers, max_queue, key)
+            for command in verse_executor.COMMAND_KEYS:
+                name = 'cb_receive_' + command
+                setattr(self, name, functools.partial(self._handle_command, command, getattr(self, name)))
+        return self.executor
+
+    def _handle_command(self, command, method, *args):
+        """
+        This method calls callback method of received command and then it
+        submits handlers of this command
+        """
+        result = method(*args)
+        self.executor.dispatch(command, args)
+        return result
+
+    def _is_lazy_node(self, node_id):
+        """
+        This method returns True, when node is only in the registry of nodes
+        """
+        return self.node_registry is not None and \
+            dict.__contains__(self.nodes, node_id) is not True and \
+            node_id in self.node_registry
+
     def send_connect_terminate(self):
         """
         send_connect_terminate() -> None
@@ -199,9 +467,25 @@ class VerseSession(vrs.Session):
         # Call parent method to print debug information
         if self.debug_print is True:
             super(VerseSession, self).cb_receive_node_create(node_id, parent_id, user_id, custom_type)
+        if self.snapshots is not None:
+            self.snapshots.node_changed(node_id)
+        if self.shard is not None:
+            self.shard.assign(node_id, parent_id, custom_type)
+        # Add node to the registry of nodes
+        if self.node_registry is not None:
+            registry = self.node_registry
+            if registry.is_lazy(node_id, parent_id, user_id, custom_type) is True:
+                registry.add(node_id, parent_id, user_id, custom_type)
+                if registry.subscribe is True and (self.shard is None or self.shard.is_local(node_id) is True):
+                    self.send_node_subscribe(vrs.DEFAULT_PRIORITY, node_id, 0, 0)
+                # VerseNode object will be created, when it will be accessed
+                return None
         # Call callback method of model
         cls = verse_node.custom_type_subclass(custom_type)
-        return cls.cb_receive_node_create(self, node_id, parent_id, user_id, custom_type)
+        node = cls.cb_receive_node_create(self, node_id, parent_id, user_id, custom_type)
+        if self.node_registry is not None:
+            self.node_registry.add_node(node)
+        return node
 
     def cb_receive_node_destroy(self, node_id):
         """
@@ -210,6 +494,17 @@ class VerseSession(vrs.Session):
         # Call parent method to print debug information
         if self.debug_print is True:
             super(VerseSession, self).cb_receive_node_destroy(node_id)
+        if self.snapshots is not None:
+            self.snapshots.node_changed(node_id)
+        if self.lazy_store is not None:
+            self.lazy_store.remove_node(node_id)
+        if self.shard is not None:
+            self.shard.remove(node_id)
+        if self.node_registry is not None:
+            lazy_node = self._is_lazy_node(node_id)
+            self.node_registry.remove(node_id)
+            if lazy_node is True:
+                return None
         # Call callback method of model
         cls = verse_node.custom_type_subclass(self.nodes[node_id].custom_type)
         return cls.cb_receive_node_destroy(self, node_id)
@@ -222,9 +517,19 @@ class VerseSession(vrs.Session):
         # Call parent method to print debug information
         if self.debug_print is True:
             super(VerseSession, self).cb_receive_node_link(parent_node_id, child_node_id)
+        if self.snapshots is not None:
+            self.snapshots.node_changed(child_node_id)
+        if self.node_registry is not None:
+            self.node_registry.set_parent(child_node_id, parent_node_id)
+            if self._is_lazy_node(child_node_id) is True:
+                return None
         # Call callback method of model and return child node
         cls = verse_node.custom_type_subclass(self.nodes[child_node_id].custom_type)
-        return cls.cb_receive_node_link(self, parent_node_id, child_node_id)
+        child_node = cls.cb_receive_node_link(self, parent_node_id, child_node_id)
+        # Subtree could be moved to other shard
+        if self.shard is not None:
+            self.shard.relink(self, parent_node_id, child_node_id)
+        return child_node
 
     def cb_receive_node_lock(self, node_id, avatar_id):
         """
@@ -233,9 +538,18 @@ class VerseSession(vrs.Session):
         # Call parent method to print debug information
         if self.debug_print is True:
             super(VerseSession, self).cb_receive_node_lock(node_id, avatar_id)
-        # Call callback method of corresponding class and return node
+        if self.snapshots is not None:
+            self.snapshots.node_changed(node_id)
+        if self.node_registry is not None:
+            self.node_registry.set_lock(node_id, avatar_id)
+            if self._is_lazy_node(node_id) is True:
+                return None
+        # Call callback method of corresponding class
         cls = verse_node.custom_type_subclass(self.nodes[node_id].custom_type)
-        return cls.cb_receive_node_lock(self, node_id, avatar_id)
+        node = cls.cb_receive_node_lock(self, node_id, avatar_id)
+        # Continue with pending lock requests and return node
+        self.lock_manager.cb_receive_node_lock(node_id, avatar_id)
+        return node
 
     def cb_receive_node_unlock(self, node_id, avatar_id):
         """
@@ -244,9 +558,18 @@ class VerseSession(vrs.Session):
         # Call parent method to print debug information
         if self.debug_print is True:
             super(VerseSession, self).cb_receive_node_unlock(node_id, avatar_id)
-        # Call callback method of coresponding class and return node
+        if self.snapshots is not None:
+            self.snapshots.node_changed(node_id)
+        if self.node_registry is not None:
+            self.node_registry.set_unlock(node_id)
+            if self._is_lazy_node(node_id) is True:
+                return None
+        # Call callback method of coresponding class
         cls = verse_node.custom_type_subclass(self.nodes[node_id].custom_type)
-        return cls.cb_receive_node_unlock(self, node_id, avatar_id)
+        node = cls.cb_receive_node_unlock(self, node_id, avatar_id)
+        # Repeat pending lock requests and return node
+        self.lock_manager.cb_receive_node_unlock(node_id, avatar_id)
+        return node
 
     def cb_receive_node_perm(self, node_id, user_id, perm):
         """
@@ -255,6 +578,11 @@ class VerseSession(vrs.Session):
         # Call parent method to print debug information
         if self.debug_print is True:
             super(VerseSession, self).cb_receive_node_perm(node_id, user_id, perm)
+        if self.snapshots is not None:
+            self.snapshots.node_changed(node_id)
+        if self._is_lazy_node(node_id) is True:
+            self.node_registry.set_perm(node_id, user_id, perm)
+            return None
         # Call callback method of model
         cls = verse_node.custom_type_subclass(self.nodes[node_id].custom_type)
         return cls.cb_receive_node_perm(self, node_id, user_id, perm)
@@ -266,6 +594,12 @@ class VerseSession(vrs.Session):
         # Call parent method to print debug information
         if self.debug_print is True:
             super(VerseSession, self).cb_receive_node_owner(node_id, user_id)
+        if self.snapshots is not None:
+            self.snapshots.node_changed(node_id)
+        if self.node_registry is not None:
+            self.node_registry.set_owner(node_id, user_id)
+            if self._is_lazy_node(node_id) is True:
+                return None
         # Call callback method of corresponding class and return node
         cls = verse_node.custom_type_subclass(self.nodes[node_id].custom_type)
         return cls.cb_receive_node_owner(self, node_id, user_id)
@@ -279,6 +613,13 @@ class VerseSession(vrs.Session):
         # Call parent method to print debug information
         if self.debug_print is True:
             super(VerseSession, self).cb_receive_taggroup_create(node_id, taggroup_id, custom_type)
+        if self.snapshots is not None:
+            self.snapshots.tag_group_changed(node_id, taggroup_id)
+        # Store only record of tag group, when it is not needed yet
+        if self.lazy_store is not None and \
+                self.lazy_store.is_lazy_tag_group(node_id, taggroup_id, custom_type) is True:
+            self.lazy_store.add_tag_group(node_id, taggroup_id, custom_type)
+            return None
         try:
             node_custom_type = self.nodes[node_id].custom_type
         except KeyError:
@@ -296,6 +637,11 @@ class VerseSession(vrs.Session):
         # Call parent method to print debug information
         if self.debug_print is True:
             super(VerseSession, self).cb_receive_taggroup_destroy(node_id, taggroup_id)
+        if self.snapshots is not None:
+            self.snapshots.tag_group_changed(node_id, taggroup_id)
+        if self.lazy_store is not None and self.lazy_store.has_tag_group(node_id, taggroup_id) is True:
+            self.lazy_store.remove_tag_group(node_id, taggroup_id)
+            return None
         try:
             node_custom_type = self.nodes[node_id].custom_type
             custom_type = self.nodes[node_id].tag_groups[taggroup_id].custom_type
@@ -314,6 +660,13 @@ class VerseSession(vrs.Session):
         # Call parent method to print debug information
         if self.debug_print is True:
             super(VerseSession, self).cb_receive_tag_create(node_id, taggroup_id, tag_id, data_type, count, custom_type)
+        if self.snapshots is not None:
+            self.snapshots.tag_group_changed(node_id, taggroup_id)
+        # Store only record of tag, when it is not needed yet
+        if self.lazy_store is not None and \
+                self.lazy_store.is_lazy_tag(node_id, taggroup_id, tag_id, custom_type) is True:
+            self.lazy_store.add_tag(node_id, taggroup_id, tag_id, data_type, count, custom_type)
+            return None
         try:
             node_custom_type = self.nodes[node_id].custom_type
             tg_custom_type = self.nodes[node_id].tag_groups[taggroup_id].custom_type
@@ -331,6 +684,11 @@ class VerseSession(vrs.Session):
         # Call parent method to print debug information
         if self.debug_print is True:
             super(VerseSession, self).cb_receive_tag_destroy(node_id, taggroup_id, tag_id)
+        if self.snapshots is not None:
+            self.snapshots.tag_group_changed(node_id, taggroup_id)
+        if self.lazy_store is not None and self.lazy_store.has_tag(node_id, taggroup_id, tag_id) is True:
+            self.lazy_store.remove_tag(node_id, taggroup_id, tag_id)
+            return None
         # Call callback method of model
         try:
             node_custom_type = self.nodes[node_id].custom_type
@@ -350,6 +708,11 @@ class VerseSession(vrs.Session):
         # Call method of parent class
         if self.debug_print is True:
             super(VerseSession, self).cb_receive_tag_set_values(node_id, taggroup_id, tag_id, value)
+        if self.snapshots is not None:
+            self.snapshots.tag_group_changed(node_id, taggroup_id)
+        if self.lazy_store is not None and self.lazy_store.has_tag(node_id, taggroup_id, tag_id) is True:
+            self.lazy_store.set_tag_value(node_id, taggroup_id, tag_id, value)
+            return None
         try:
             node_custom_type = self.nodes[node_id].custom_type
             tg_custom_type = self.nodes[node_id].tag_groups[taggroup_id].custom_type
@@ -375,6 +738,13 @@ class VerseSession(vrs.Session):
                 data_type,
                 count,
                 custom_type)
+        if self.snapshots is not None:
+            self.snapshots.layer_changed(node_id, layer_id)
+        # Store only record of layer, when it is not needed yet
+        if self.lazy_store is not None and \
+                self.lazy_store.is_lazy_layer(node_id, layer_id, custom_type) is True:
+            self.lazy_store.add_layer(node_id, parent_layer_id, layer_id, data_type, count, custom_type)
+            return None
         try:
             node_custom_type = self.nodes[node_id].custom_type
         except KeyError:
@@ -398,6 +768,11 @@ class VerseSession(vrs.Session):
         # Call method of parent class
         if self.debug_print is True:
             super(VerseSession, self).cb_receive_layer_destroy(node_id, layer_id)
+        if self.snapshots is not None:
+            self.snapshots.layer_changed(node_id, layer_id)
+        if self.lazy_store is not None and self.lazy_store.has_layer(node_id, layer_id) is True:
+            self.lazy_store.remove_layer(node_id, layer_id)
+            return None
         try:
             node_custom_type = self.nodes[node_id].custom_type
             custom_type = self.nodes[node_id].layers[layer_id].custom_type
@@ -415,6 +790,11 @@ class VerseSession(vrs.Session):
         # Call method of parent class
         if self.debug_print is True:
             super(VerseSession, self).cb_receive_layer_set_value(node_id, layer_id, item_id, value)
+        if self.snapshots is not None:
+            self.snapshots.layer_changed(node_id, layer_id)
+        if self.lazy_store is not None and self.lazy_store.has_layer(node_id, layer_id) is True:
+            self.lazy_store.set_layer_value(node_id, layer_id, item_id, value)
+            return None
         try:
             node_custom_type = self.nodes[node_id].custom_type
             custom_type = self.nodes[node_id].layers[layer_id].custom_type
@@ -432,6 +812,11 @@ class VerseSession(vrs.Session):
         # Call method of parent class
         if self.debug_print is True:
             super(VerseSession, self).cb_receive_layer_unset_value(node_id, layer_id, item_id)
+        if self.snapshots is not None:
+            self.snapshots.layer_changed(node_id, layer_id)
+        if self.lazy_store is not None and self.lazy_store.has_layer(node_id, layer_id) is True:
+            self.lazy_store.unset_layer_value(node_id, layer_id, item_id)
+            return None
         try:
             node_custom_type = self.nodes[node_id].custom_type
             custom_type = self.nodes[node_id].layers[layer_id].custom_type
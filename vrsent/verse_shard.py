@@ -0,0 +1,368 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+
+"""
+This module includes classes for sharded client. Nodes are partitioned
+between several sessions connected to the same Verse server. Each session
+(shard) subscribes only nodes of its partition. Class VerseShardedClient
+runs shards in worker processes. Each shard publishes nodes of its
+partition to own shared memory (see VerseSharedMirror) and class
+VerseShardedView merges them into one read view in the main process.
+"""
+
+
+import multiprocessing
+import time
+import uuid
+from . import verse_shared
+
+
+# Nodes with lower IDs are system nodes (root node, avatars, users, parent
+# of scene nodes, etc.) and they are subscribed by all shards
+FIRST_SHARDED_NODE_ID = 65536
+
+
+# Partition subtrees of nodes by ID of root node of subtree
+SHARD_BY_SUBTREE = 'SUBTREE'
+# Partition subtrees of nodes by custom_type of root node of subtree
+SHARD_BY_CUSTOM_TYPE = 'CUSTOM_TYPE'
+
+
+class VerseShard(object):
+    """
+    Class representing one partition of nodes. Root of subtree is node with
+    parent that is system node. Other nodes belong to the partition of their
+    parent node. Instance of this class is passed to VerseSession as shard
+    and it is available as session.shard.
+    """
+
+    def __init__(self, index, count, by=SHARD_BY_SUBTREE):
+        """
+        Constructor of VerseShard
+        """
+        if index < 0 or index >= count:
+            raise ValueError('Index of shard out of range: ' + str(index))
+        self.index = index
+        self.count = count
+        self.by = by
+        # The dictionary of indexes of shards owning nodes (node ID is used
+        # as key). System nodes are owned by all shards (None).
+        self.owners = {}
+
+    def __str__(self):
+        """
+        String representation of VerseShard
+        """
+        return 'VerseShard, index: ' + \
+            str(self.index) + \
+            ', count: ' + \
+            str(self.count) + \
+            ', by: ' + \
+            self.by
+
+    def partition(self, node_id, custom_type):
+        """
+        This method returns index of shard owning subtree with root node
+        """
+        if self.by == SHARD_BY_CUSTOM_TYPE:
+            return custom_type % self.count
+        return node_id % self.count
+
+    def _owner(self, node_id, parent_id, custom_type):
+        """
+        This method computes index of shard owning node
+        """
+        if node_id < FIRST_SHARDED_NODE_ID:
+            return None
+        owner = self.owners.get(parent_id)
+        if owner is None:
+            return self.partition(node_id, custom_type)
+        return owner
+
+    def assign(self, node_id, parent_id, custom_type):
+        """
+        This method assigns new node to the shard and it returns index of
+        shard owning node
+        """
+        owner = self.owners[node_id] = self._owner(node_id, parent_id, custom_type)
+        return owner
+
+    def remove(self, node_id):
+        """
+        This method removes destroyed node
+        """
+        self.owners.pop(node_id, None)
+
+    def is_local(self, node_id):
+        """
+        This method returns True, when node should be subscribed by this shard
+        """
+        owner = self.owners.get(node_id)
+        return owner is None or owner == self.index
+
+    def publishes(self, node_id):
+        """
+        This method returns True, when node is published by this shard.
+        System nodes are published only by the first shard. Nodes moved to
+        other shard by relink() are not published any more.
+        """
+        if node_id < FIRST_SHARDED_NODE_ID:
+            return self.index == 0
+        return self.is_local(node_id)
+
+    def relink(self, session, parent_id, child_id):
+        """
+        This method moves subtree of child node to the partition of new
+        parent node. Nodes moved to this shard are subscribed and nodes
+        moved to other shard are unsubscribed.
+        """
+        try:
+            child_node = session.nodes[child_id]
+        except KeyError:
+            return
+        owner = self._owner(child_id, parent_id, child_node.custom_type)
+        if owner == self.owners.get(child_id):
+            return
+        nodes = [child_node]
+        while len(nodes) > 0:
+            node = nodes.pop()
+            was_local = self.is_local(node.id)
+            self.owners[node.id] = owner
+            if self.is_local(node.id) is not was_local:
+                if was_local is True:
+                    node.unsubscribe()
+                else:
+                    node.subscribe()
+            nodes.extend(node.child_nodes.values())
+
+
+def run_shard(hostname, service, username, password, index, count, by, fps, name, size, stop_event):
+    """
+    This function is executed in worker process of shard. It connects to
+    Verse server and it publishes nodes of its partition to shared memory
+    with name after each callback_update()
+    """
+    from . import verse_session
+    shard = VerseShard(index, count, by)
+    session = verse_session.VerseSession(
+        hostname=hostname,
+        service=service,
+        username=username,
+        password=password,
+        shard=shard)
+    mirror = session.enable_shared_mirror(name, size, shard.publishes)
+    try:
+        while session.state != 'DISCONNECTED' and stop_event.is_set() is False:
+            session.callback_update()
+            time.sleep(1.0 / fps)
+        if session.state == 'CONNECTED':
+            session.send_connect_terminate()
+    finally:
+        mirror.close()
+
+
+class VerseShardedView(object):
+    """
+    Class representing merged read view of nodes published by shards to
+    shared memory. Nodes are unpickled on demand directly from shared
+    memory of shards.
+    """
+
+    def __init__(self, names):
+        """
+        Constructor of VerseShardedView. The names are names of shared
+        memory of shards.
+        """
+        self.names = names
+        # Readers of shards (None, when shard did not create shared memory yet)
+        self.readers = [None] * len(names)
+
+    def __str__(self):
+        """
+        String representation of VerseShardedView
+        """
+        return 'VerseShardedView, shards: ' + \
+            str(len(self.names)) + \
+            ', attached: ' + \
+            str(len([reader for reader in self.readers if reader is not None]))
+
+    def attach(self):
+        """
+        This method attaches shared memory of shards, which was created
+        since last call
+        """
+        for index, name in enumerate(self.names):
+            if self.readers[index] is not None:
+                continue
+            try:
+                self.readers[index] = verse_shared.VerseSharedMirrorReader(name)
+            except (FileNotFoundError, ValueError):
+                # Shared memory does not exist or its header is not written yet
+                pass
+
+    def keys(self):
+        """
+        This method returns the sorted list of IDs of nodes of all shards
+        """
+        node_ids = set()
+        for reader in self.readers:
+            if reader is not None:
+                node_ids.update(reader.keys())
+        return sorted(node_ids)
+
+    def __len__(self):
+        """
+        This method returns count of nodes
+        """
+        return len(self.keys())
+
+    def __iter__(self):
+        """
+        This method iterates over IDs of nodes
+        """
+        return iter(self.keys())
+
+    def __contains__(self, node_id):
+        """
+        This method returns True, when any shard publishes node
+        """
+        return self.get(node_id) is not None
+
+    def __getitem__(self, node_id):
+        """
+        This method returns snapshot of node
+        """
+        node_snapshot = self.get(node_id)
+        if node_snapshot is None:
+            raise KeyError(node_id)
+        return node_snapshot
+
+    def get(self, node_id, default=None):
+        """
+        This method returns snapshot of node or default value
+        """
+        for reader in self.readers:
+            if reader is not None:
+                node_snapshot = reader.get(node_id)
+                if node_snapshot is not None:
+                    return node_snapshot
+        return default
+
+    def close(self):
+        """
+        This method detaches shared memory of all shards
+        """
+        for index, reader in enumerate(self.readers):
+            if reader is not None:
+                reader.close()
+                self.readers[index] = None
+
+
+class VerseShardedClient(object):
+    """
+    Class representing client with several shards running in worker
+    processes. Each worker writes nodes of its partition to own shared
+    memory and the view nodes reads them without copying through pipes.
+    """
+
+    def __init__(self, hostname="localhost", service="12345", count=2, by=SHARD_BY_SUBTREE,
+                 username=None, password=None, fps=60, context=None, size=64 * 1024 * 1024):
+        """
+        Constructor of VerseShardedClient. The context is name of start
+        method of multiprocessing (e.g. 'spawn'). The size is size of shared
+        memory of each shard.
+        """
+        if context is not None:
+            context = multiprocessing.get_context(context)
+        else:
+            context = multiprocessing
+        self.count = count
+        prefix = 'vrsent_' + uuid.uuid4().hex[:12] + '_'
+        names = [prefix + str(index) for index in range(count)]
+        self.stop_event = context.Event()
+        self.processes = [
+            context.Process(
+                target=run_shard,
+                args=(hostname, service, username, password, index, count, by, fps, names[index], size, self.stop_event))
+            for index in range(count)]
+        for process in self.processes:
+            process.daemon = True
+        # Merged read view of snapshots of nodes
+        self.nodes = VerseShardedView(names)
+        # The list with the last tick published by each shard
+        self.ticks = [0] * count
+        self._seqs = [None] * count
+
+    def __str__(self):
+        """
+        String representation of VerseShardedClient
+        """
+        return 'VerseShardedClient, shards: ' + \
+            str(self.count) + \
+            ', nodes: ' + \
+            str(len(self.nodes))
+
+    def start(self):
+        """
+        This method starts worker processes
+        """
+        for process in self.processes:
+            process.start()
+
+    def _changed(self):
+        """
+        This method returns count of shards, which published new data since
+        last call
+        """
+        self.nodes.attach()
+        changed = 0
+        for index, reader in enumerate(self.nodes.readers):
+            if reader is None:
+                continue
+            seq = reader.seq
+            if seq != self._seqs[index] and seq % 2 == 0:
+                # Reading of count of nodes reads new index and tick
+                len(reader)
+                self._seqs[index] = seq
+                self.ticks[index] = reader.tick
+                changed += 1
+        return changed
+
+    def update(self, timeout=0.0, interval=0.001):
+        """
+        This method checks new data published by shards. It waits at most
+        timeout seconds for the first change. It returns count of shards
+        with new data.
+        """
+        end_time = time.time() + timeout
+        while True:
+            changed = self._changed()
+            if changed > 0 or time.time() >= end_time:
+                return changed
+            time.sleep(interval)
+
+    def stop(self, timeout=None):
+        """
+        This method stops worker processes and it detaches shared memory
+        """
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout)
+        self.nodes.close()
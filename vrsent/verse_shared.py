@@ -0,0 +1,345 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+
+"""
+This module includes class VerseSharedMirror that publishes snapshots of
+nodes mirrored by VerseSession into shared memory, and class
+VerseSharedMirrorReader used by other processes on the same host to read
+them without own connection to Verse server.
+
+Layout of shared memory (version 1):
+
+    header (64 bytes): magic, version, seq, tick, slot_size, active slot,
+                       length of data in active slot
+    slot 0, slot 1:    index table (count of nodes and sorted triples of
+                       node ID, offset and length) followed by pickled
+                       snapshots of nodes
+
+Writer writes new data to inactive slot and then it switches active slot.
+The seq is odd during switching. Reader retries reading, when seq was odd
+or it was changed during reading (sequence lock). Reader does not copy
+slot. It reads index and pickled snapshots of nodes directly from shared
+memory and it validates each read with the seq.
+"""
+
+
+import bisect
+import pickle
+import struct
+import time
+from multiprocessing import shared_memory
+from . import verse_snapshot
+
+
+MAGIC = b'VRSM'
+VERSION = 1
+HEADER = struct.Struct('<4sIQQQQQ')
+HEADER_SIZE = 64
+SEQ = struct.Struct('<Q')
+SEQ_OFFSET = 8
+COUNT = struct.Struct('<Q')
+INDEX_ENTRY = struct.Struct('<QQQ')
+
+
+class VerseSharedMirror(object):
+    """
+    Class representing writer of shared memory mirror. It is created by
+    VerseSession.enable_shared_mirror() and it writes new data, when
+    snapshot with changed nodes is published.
+    """
+
+    def __init__(self, session, name=None, size=64 * 1024 * 1024, node_filter=None):
+        """
+        Constructor of VerseSharedMirror. The size is size of shared memory
+        in bytes. Each of two slots has half of this size. When node_filter
+        is not None, then only nodes with IDs passing this function are
+        written.
+        """
+        self.session = session
+        self.node_filter = node_filter
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self.shm.name
+        self.slot_size = (self.shm.size - HEADER_SIZE) // 2
+        self.seq = 0
+        self.active = 1
+        # The dictionary of pickled nodes (node ID is used as key). Value is
+        # pair of snapshot of node and pickled data.
+        self._blobs = {}
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, self.seq, 0, self.slot_size, self.active, 0)
+        snapshots = session.enable_snapshots()
+        self.write(snapshots.current)
+        snapshots.add_listener(self.update)
+
+    def __str__(self):
+        """
+        String representation of VerseSharedMirror
+        """
+        return 'VerseSharedMirror, name: ' + \
+            self.name + \
+            ', seq: ' + \
+            str(self.seq)
+
+    def update(self, snapshot):
+        """
+        This method writes snapshot, when any node was changed
+        """
+        if len(self.session.snapshots.changed_ids) > 0:
+            self.write(snapshot)
+
+    def _blob(self, node_id, node_snapshot):
+        """
+        This method returns pickled snapshot of node. Unchanged snapshots
+        are not pickled again.
+        """
+        try:
+            cached_snapshot, blob = self._blobs[node_id]
+        except KeyError:
+            pass
+        else:
+            if cached_snapshot is node_snapshot:
+                return blob
+        blob = pickle.dumps(verse_snapshot.pack_node(node_snapshot), pickle.HIGHEST_PROTOCOL)
+        self._blobs[node_id] = (node_snapshot, blob)
+        return blob
+
+    def write(self, snapshot):
+        """
+        This method writes snapshot to inactive slot and then it makes
+        this slot active
+        """
+        if self.node_filter is not None:
+            node_ids = sorted(node_id for node_id in snapshot.nodes if self.node_filter(node_id) is True)
+        else:
+            node_ids = sorted(snapshot.nodes)
+        for node_id in list(self._blobs):
+            if node_id not in snapshot.nodes or \
+                    (self.node_filter is not None and self.node_filter(node_id) is not True):
+                self._blobs.pop(node_id)
+        blobs = [self._blob(node_id, snapshot.nodes[node_id]) for node_id in node_ids]
+        index_size = COUNT.size + INDEX_ENTRY.size * len(node_ids)
+        length = index_size + sum(len(blob) for blob in blobs)
+        if length > self.slot_size:
+            raise ValueError('Snapshot (' + str(length) + ' bytes) does not fit into slot of shared memory')
+        slot = 1 - self.active
+        base = HEADER_SIZE + slot * self.slot_size
+        buf = self.shm.buf
+        COUNT.pack_into(buf, base, len(node_ids))
+        offset = index_size
+        for index, node_id in enumerate(node_ids):
+            blob = blobs[index]
+            INDEX_ENTRY.pack_into(buf, base + COUNT.size + index * INDEX_ENTRY.size, node_id, offset, len(blob))
+            buf[base + offset:base + offset + len(blob)] = blob
+            offset += len(blob)
+        # Switch active slot
+        self.seq += 1
+        SEQ.pack_into(buf, SEQ_OFFSET, self.seq)
+        self.active = slot
+        HEADER.pack_into(buf, 0, MAGIC, VERSION, self.seq, snapshot.tick, self.slot_size, slot, length)
+        self.seq += 1
+        SEQ.pack_into(buf, SEQ_OFFSET, self.seq)
+
+    def close(self):
+        """
+        This method stops writing and it removes shared memory
+        """
+        snapshots = self.session.snapshots
+        if self.update in snapshots.listeners:
+            snapshots.remove_listener(self.update)
+        self.shm.close()
+        self.shm.unlink()
+
+
+def attach(name):
+    """
+    This function attaches existing shared memory without registering it
+    in resource tracker of this process
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class VerseSharedMirrorReader(object):
+    """
+    Class representing reader of shared memory mirror in other process
+    """
+
+    def __init__(self, name, retries=1000):
+        """
+        Constructor of VerseSharedMirrorReader
+        """
+        self.shm = attach(name)
+        self.name = name
+        self.retries = retries
+        magic, version = HEADER.unpack_from(self.shm.buf, 0)[:2]
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise ValueError('Unsupported layout of shared memory: ' + name)
+        self.tick = None
+        self._seq = None
+        self._node_ids = []
+        self._entries = []
+        self._base = HEADER_SIZE
+        self._nodes = {}
+
+    def __str__(self):
+        """
+        String representation of VerseSharedMirrorReader
+        """
+        return 'VerseSharedMirrorReader, name: ' + \
+            self.name + \
+            ', tick: ' + \
+            str(self.tick)
+
+    @property
+    def seq(self):
+        """
+        Getter of current sequence counter of writer. It is changed, when
+        new data are written.
+        """
+        return SEQ.unpack_from(self.shm.buf, SEQ_OFFSET)[0]
+
+    def _read_index(self, buf, seq):
+        """
+        This method reads header and index of active slot. It returns None,
+        when header or index was torn by writer.
+        """
+        magic, version, header_seq, tick, slot_size, active, length = HEADER.unpack_from(buf, 0)
+        # Header written during switching of slots has odd seq
+        if header_seq != seq or active > 1 or length > slot_size:
+            return None
+        base = HEADER_SIZE + active * slot_size
+        count = COUNT.unpack_from(buf, base)[0]
+        index_size = COUNT.size + INDEX_ENTRY.size * count
+        if index_size > length:
+            return None
+        with buf[base + COUNT.size:base + index_size] as view:
+            entries = list(INDEX_ENTRY.iter_unpack(view))
+        return tick, base, entries
+
+    def _read(self):
+        """
+        This method reads index of active slot, when writer wrote new data
+        """
+        buf = self.shm.buf
+        for retry in range(self.retries):
+            seq = SEQ.unpack_from(buf, SEQ_OFFSET)[0]
+            if seq == self._seq:
+                return
+            if seq % 2 == 1:
+                continue
+            index = self._read_index(buf, seq)
+            if index is not None and SEQ.unpack_from(buf, SEQ_OFFSET)[0] == seq:
+                break
+        else:
+            raise RuntimeError('Shared memory is changed too often: ' + self.name)
+        tick, base, entries = index
+        self._node_ids = [entry[0] for entry in entries]
+        self._entries = entries
+        self._base = base
+        self._nodes = {}
+        self._seq = seq
+        self.tick = tick
+
+    def keys(self):
+        """
+        This method returns the sorted list of IDs of nodes
+        """
+        self._read()
+        return list(self._node_ids)
+
+    def __len__(self):
+        """
+        This method returns count of nodes
+        """
+        self._read()
+        return len(self._node_ids)
+
+    def __contains__(self, node_id):
+        """
+        This method returns True, when node is in mirror
+        """
+        return self.get(node_id) is not None
+
+    def __getitem__(self, node_id):
+        """
+        This method returns snapshot of node
+        """
+        node_snapshot = self.get(node_id)
+        if node_snapshot is None:
+            raise KeyError(node_id)
+        return node_snapshot
+
+    def get(self, node_id, default=None):
+        """
+        This method returns snapshot of node or default value. Only this
+        node is unpickled directly from shared memory. When writer changed
+        data during unpickling, then new data are read again.
+        """
+        buf = self.shm.buf
+        for retry in range(self.retries):
+            self._read()
+            try:
+                return self._nodes[node_id]
+            except KeyError:
+                pass
+            index = bisect.bisect_left(self._node_ids, node_id)
+            if index == len(self._node_ids) or self._node_ids[index] != node_id:
+                return default
+            offset, length = self._entries[index][1:]
+            start = self._base + offset
+            try:
+                with buf[start:start + length] as view:
+                    packed = pickle.loads(view)
+            except Exception:
+                if SEQ.unpack_from(buf, SEQ_OFFSET)[0] == self._seq:
+                    raise
+                continue
+            if SEQ.unpack_from(buf, SEQ_OFFSET)[0] != self._seq:
+                continue
+            node_snapshot = verse_snapshot.unpack_node(packed)
+            self._nodes[node_id] = node_snapshot
+            return node_snapshot
+        raise RuntimeError('Shared memory is changed too often: ' + self.name)
+
+    def wait(self, seq, timeout=None, interval=0.001):
+        """
+        This method waits until writer writes data newer than seq. It
+        returns new seq or None after timeout.
+        """
+        end_time = None if timeout is None else time.time() + timeout
+        while True:
+            current_seq = self.seq
+            if current_seq > seq and current_seq % 2 == 0:
+                return current_seq
+            if end_time is not None and time.time() >= end_time:
+                return None
+            time.sleep(interval)
+
+    def close(self):
+        """
+        This method detaches shared memory
+        """
+        self._nodes = {}
+        self.shm.close()
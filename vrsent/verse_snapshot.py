@@ -0,0 +1,370 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+
+"""
+This module includes class VerseSnapshots that publishes immutable
+snapshots of nodes, tag groups, tags and layers mirrored by VerseSession.
+New snapshot is published at the end of each callback_update(). Snapshots
+share unchanged parts with previous snapshot. Thus only nodes, tag groups
+and layers changed during last update are copied. Other threads could read
+the latest snapshot without holding session.lock.
+"""
+
+
+import array
+import collections
+import types
+from . import verse_entity
+
+
+# Empty read-only dictionary
+EMPTY = types.MappingProxyType({})
+
+
+class VerseTagSnapshot(collections.namedtuple(
+        'VerseTagSnapshot',
+        'id custom_type data_type count value')):
+    """
+    Class representing immutable snapshot of tag
+    """
+    __slots__ = ()
+
+
+class VerseTagGroupSnapshot(collections.namedtuple(
+        'VerseTagGroupSnapshot',
+        'id custom_type tags')):
+    """
+    Class representing immutable snapshot of tag group
+    """
+    __slots__ = ()
+
+
+class VerseLayerSnapshot(collections.namedtuple(
+        'VerseLayerSnapshot',
+        'id parent_layer_id custom_type data_type count items')):
+    """
+    Class representing immutable snapshot of layer
+    """
+    __slots__ = ()
+
+
+class VerseNodeSnapshot(collections.namedtuple(
+        'VerseNodeSnapshot',
+        'id parent_id user_id custom_type locker_id perms tag_groups layers')):
+    """
+    Class representing immutable snapshot of node
+    """
+    __slots__ = ()
+
+
+class VerseSnapshot(object):
+    """
+    Class representing immutable snapshot of all nodes published after
+    one callback_update() of session
+    """
+
+    def __init__(self, tick, nodes):
+        """
+        Constructor of VerseSnapshot
+        """
+        self.tick = tick
+        self.nodes = types.MappingProxyType(nodes)
+
+    def __str__(self):
+        """
+        String representation of VerseSnapshot
+        """
+        return 'VerseSnapshot, tick: ' + \
+            str(self.tick) + \
+            ', nodes: ' + \
+            str(len(self.nodes))
+
+    def __len__(self):
+        """
+        This method returns count of nodes in snapshot
+        """
+        return len(self.nodes)
+
+    def __contains__(self, node_id):
+        """
+        This method returns True, when node is in snapshot
+        """
+        return node_id in self.nodes
+
+    def __getitem__(self, node_id):
+        """
+        This method returns snapshot of node
+        """
+        return self.nodes[node_id]
+
+    def get(self, node_id, default=None):
+        """
+        This method returns snapshot of node or default value
+        """
+        return self.nodes.get(node_id, default)
+
+
+def frozen_value(value):
+    """
+    This function returns immutable copy of value of tag or item of layer
+    """
+    if isinstance(value, (array.array, list)):
+        return tuple(value)
+    return value
+
+
+class VerseSnapshots(object):
+    """
+    Class publishing snapshots of session. Instance of this class is
+    created by VerseSession.enable_snapshots() and it is available as
+    session.snapshots. Entities changed during callback_update() are
+    marked and only snapshots of these entities are created again.
+    """
+
+    def __init__(self, session):
+        """
+        Constructor of VerseSnapshots
+        """
+        self.session = session
+        self.tick = 0
+        # The dictionary of changed nodes (node ID is used as key). Value
+        # is pair of sets of IDs of changed tag groups and layers
+        self.changed = {}
+        # Count of copied nodes, tag groups and layers during last publish()
+        self.copied = 0
+        # IDs of nodes changed in last published snapshot
+        self.changed_ids = ()
+        # The list of callbacks called with each published snapshot
+        self.listeners = []
+        # Mark all nodes, that already exist, as changed
+        for node_id in dict.keys(session.nodes):
+            self.node_changed(node_id)
+        # The latest published snapshot. Readers only read this reference
+        # and replacing of reference is atomic.
+        self.current = VerseSnapshot(self.tick, {})
+        self.publish()
+
+    def add_listener(self, callback):
+        """
+        This method adds callback that is called with each published
+        snapshot. The IDs of changed nodes are in changed_ids.
+        """
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """
+        This method removes callback
+        """
+        self.listeners.remove(callback)
+
+    def _notify(self):
+        """
+        This method calls all listeners with current snapshot
+        """
+        for callback in self.listeners:
+            callback(self.current)
+        return self.current
+
+    def node_changed(self, node_id):
+        """
+        This method marks node as changed and it returns sets of changed
+        tag groups and layers of node
+        """
+        try:
+            return self.changed[node_id]
+        except KeyError:
+            changes = self.changed[node_id] = (set(), set())
+            return changes
+
+    def tag_group_changed(self, node_id, tg_id):
+        """
+        This method marks tag group as changed
+        """
+        self.node_changed(node_id)[0].add(tg_id)
+
+    def layer_changed(self, node_id, layer_id):
+        """
+        This method marks layer as changed
+        """
+        self.node_changed(node_id)[1].add(layer_id)
+
+    def _tag_group_snapshot(self, tg):
+        """
+        This method creates snapshot of tag group
+        """
+        self.copied += 1
+        tags = {}
+        for tag_id, tag in dict.items(tg.tags):
+            if tag.state == verse_entity.ENTITY_DESTROYED:
+                continue
+            tags[tag_id] = VerseTagSnapshot(
+                tag_id,
+                tag.custom_type,
+                tag.data_type,
+                tag.count,
+                frozen_value(tag._value))
+        return VerseTagGroupSnapshot(tg.id, tg.custom_type, types.MappingProxyType(tags))
+
+    def _layer_snapshot(self, layer):
+        """
+        This method creates snapshot of layer
+        """
+        self.copied += 1
+        items = {}
+        for item_id, value in layer.items.items():
+            items[item_id] = frozen_value(value)
+        return VerseLayerSnapshot(
+            layer.id,
+            layer.parent_layer.id if layer.parent_layer is not None else None,
+            layer.custom_type,
+            layer.data_type,
+            layer.count,
+            types.MappingProxyType(items))
+
+    def _update_branches(self, entities, old_snapshots, changed_ids, snapshot_method):
+        """
+        This method returns read-only dictionary of snapshots of tag groups
+        or layers. Snapshots of unchanged entities are reused.
+        """
+        if len(changed_ids) == 0:
+            return old_snapshots
+        snapshots = dict(old_snapshots)
+        for entity_id in changed_ids:
+            entity = dict.get(entities, entity_id)
+            if entity is None or entity.state == verse_entity.ENTITY_DESTROYED:
+                snapshots.pop(entity_id, None)
+            else:
+                snapshots[entity_id] = snapshot_method(entity)
+        return types.MappingProxyType(snapshots)
+
+    def _node_snapshot(self, node, old_snapshot, tg_ids, layer_ids):
+        """
+        This method creates snapshot of node
+        """
+        self.copied += 1
+        if old_snapshot is None:
+            old_tag_groups, old_layers = EMPTY, EMPTY
+            tg_ids = set(dict.keys(node.tag_groups))
+            layer_ids = set(dict.keys(node.layers))
+        else:
+            old_tag_groups, old_layers = old_snapshot.tag_groups, old_snapshot.layers
+        parent = node.parent
+        return VerseNodeSnapshot(
+            node.id,
+            parent.id if parent is not None else None,
+            node.user_id,
+            node.custom_type,
+            node.locker_id,
+            types.MappingProxyType(dict(node.perms)),
+            self._update_branches(node.tag_groups, old_tag_groups, tg_ids, self._tag_group_snapshot),
+            self._update_branches(node.layers, old_layers, layer_ids, self._layer_snapshot))
+
+    def publish(self):
+        """
+        This method creates new snapshot from changed entities and makes it
+        current snapshot. It is called at the end of callback_update().
+        """
+        self.tick += 1
+        self.copied = 0
+        if len(self.changed) == 0:
+            self.changed_ids = ()
+            self.current = VerseSnapshot(self.tick, self.current.nodes)
+            return self._notify()
+        changed, self.changed = self.changed, {}
+        self.changed_ids = tuple(changed)
+        nodes = dict(self.current.nodes)
+        for node_id, (tg_ids, layer_ids) in changed.items():
+            node = dict.get(self.session.nodes, node_id)
+            if node is None or node.state == verse_entity.ENTITY_DESTROYED:
+                nodes.pop(node_id, None)
+            else:
+                nodes[node_id] = self._node_snapshot(node, nodes.get(node_id), tg_ids, layer_ids)
+        self.current = VerseSnapshot(self.tick, nodes)
+        return self._notify()
+
+
+def pack_node(node_snapshot):
+    """
+    This function returns copy of snapshot of node with plain dictionaries
+    instead of read-only dictionaries. The copy could be pickled and sent
+    to other process.
+    """
+    tag_groups = {}
+    for tg_id, tg in node_snapshot.tag_groups.items():
+        tag_groups[tg_id] = tg._replace(tags=dict(tg.tags))
+    layers = {}
+    for layer_id, layer in node_snapshot.layers.items():
+        layers[layer_id] = layer._replace(items=dict(layer.items))
+    return node_snapshot._replace(
+        perms=dict(node_snapshot.perms),
+        tag_groups=tag_groups,
+        layers=layers)
+
+
+def unpack_node(node_snapshot):
+    """
+    This function returns immutable snapshot of node from the copy created
+    by pack_node()
+    """
+    tag_groups = {}
+    for tg_id, tg in node_snapshot.tag_groups.items():
+        tag_groups[tg_id] = tg._replace(tags=types.MappingProxyType(tg.tags))
+    layers = {}
+    for layer_id, layer in node_snapshot.layers.items():
+        layers[layer_id] = layer._replace(items=types.MappingProxyType(layer.items))
+    return node_snapshot._replace(
+        perms=types.MappingProxyType(node_snapshot.perms),
+        tag_groups=types.MappingProxyType(tag_groups),
+        layers=types.MappingProxyType(layers))
+
+
+def plain_node(node_snapshot):
+    """
+    This function returns snapshot of node converted to tuples and
+    dictionaries of basic types, that could be serialized by marshal
+    """
+    tag_groups = {}
+    for tg_id, tg in node_snapshot.tag_groups.items():
+        tags = {}
+        for tag_id, tag in tg.tags.items():
+            tags[tag_id] = tuple(tag)
+        tag_groups[tg_id] = (tg.id, tg.custom_type, tags)
+    layers = {}
+    for layer_id, layer in node_snapshot.layers.items():
+        layers[layer_id] = tuple(layer[:-1]) + (dict(layer.items),)
+    return tuple(node_snapshot[:-3]) + (dict(node_snapshot.perms), tag_groups, layers)
+
+
+def node_from_plain(data):
+    """
+    This function returns immutable snapshot of node from data created
+    by plain_node()
+    """
+    tag_groups = {}
+    for tg_id, tg in data[-2].items():
+        tags = {tag_id: VerseTagSnapshot(*tag) for tag_id, tag in tg[2].items()}
+        tag_groups[tg_id] = VerseTagGroupSnapshot(tg[0], tg[1], types.MappingProxyType(tags))
+    layers = {}
+    for layer_id, layer in data[-1].items():
+        layers[layer_id] = VerseLayerSnapshot(*(tuple(layer[:-1]) + (types.MappingProxyType(layer[-1]),)))
+    return VerseNodeSnapshot(*(tuple(data[:-3]) + (
+        types.MappingProxyType(data[-3]),
+        types.MappingProxyType(tag_groups),
+        types.MappingProxyType(layers))))
@@ -0,0 +1,266 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+"""
+This module includes class VerseLayerGrid that is spatial index over
+items of VerseLayer storing positions (e.g. vertices of mesh). Index is
+uniform grid of cells and it supports radius, nearest neighbour and box
+queries returning IDs of items.
+"""
+
+
+import heapq
+import itertools
+import math
+from . import verse_layer
+
+
+class VerseLayerGrid(verse_layer.VerseLayerObserver):
+    """
+    Class representing uniform grid over positions stored in the layer.
+    Grid is updated incrementally after each change of items. When count
+    of changes since last query is bigger than rebuild_ratio multiplied by
+    count of items, then incremental updates are stopped and the whole grid
+    is rebuilt at once, when it is queried next time.
+    """
+
+    def __init__(self, cell_size=1.0, rebuild_ratio=0.25, min_rebuild=64):
+        """
+        Constructor of VerseLayerGrid
+        """
+        super(VerseLayerGrid, self).__init__()
+        self.cell_size = float(cell_size)
+        self.rebuild_ratio = rebuild_ratio
+        self.min_rebuild = min_rebuild
+        # The dictionary of sets of item IDs (cell coordinates are used as key)
+        self.cells = {}
+        # The dictionary of positions (item ID is used as key)
+        self.positions = {}
+        # Coordinates of min and max occupied cells. Bounds are extended,
+        # when item is added and they are computed again before query, when
+        # cell at the border of the grid was emptied.
+        self.min_cell = None
+        self.max_cell = None
+        self.shrunk = False
+        # Count of changes since last query
+        self.changes = 0
+        self.dirty = False
+        self.rebuilds = 0
+
+    def __len__(self):
+        """
+        This method returns count of items in the grid
+        """
+        self._update()
+        return len(self.positions)
+
+    def cell(self, position):
+        """
+        This method returns coordinates of cell containing position
+        """
+        return tuple(int(math.floor(item / self.cell_size)) for item in position)
+
+    def reset(self):
+        """
+        This method removes all items from the grid
+        """
+        self.cells = {}
+        self.positions = {}
+        self.min_cell = None
+        self.max_cell = None
+        self.shrunk = False
+        self.changes = 0
+        self.dirty = False
+
+    def rebuild(self):
+        """
+        This method builds the grid from all items of layer
+        """
+        self.reset()
+        if self.layer is not None:
+            for item_id, value in self.layer.items.items():
+                self._add(item_id, tuple(value))
+        self.rebuilds += 1
+
+    def _add(self, item_id, position):
+        """
+        This method adds item to the grid
+        """
+        self.positions[item_id] = position
+        key = self.cell(position)
+        try:
+            self.cells[key].add(item_id)
+        except KeyError:
+            self.cells[key] = {item_id}
+            if self.min_cell is None:
+                self.min_cell = self.max_cell = key
+            else:
+                self.min_cell = tuple(min(item, low) for item, low in zip(key, self.min_cell))
+                self.max_cell = tuple(max(item, high) for item, high in zip(key, self.max_cell))
+
+    def _remove(self, item_id):
+        """
+        This method removes item from the grid
+        """
+        position = self.positions.pop(item_id)
+        key = self.cell(position)
+        items = self.cells[key]
+        items.discard(item_id)
+        if len(items) == 0:
+            self.cells.pop(key)
+            if any(item in (low, high) for item, low, high in zip(key, self.min_cell, self.max_cell)):
+                self.shrunk = True
+
+    def _update_bounds(self):
+        """
+        This method computes bounds of occupied cells again
+        """
+        self.shrunk = False
+        if len(self.cells) == 0:
+            self.min_cell = self.max_cell = None
+            return
+        self.min_cell = tuple(min(items) for items in zip(*self.cells))
+        self.max_cell = tuple(max(items) for items in zip(*self.cells))
+
+    def _count_change(self):
+        """
+        This method returns True, when grid should be rebuilt at once
+        instead of incremental update
+        """
+        if self.dirty is True:
+            return True
+        self.changes += 1
+        if self.layer is not None and \
+                self.changes > max(self.min_rebuild, self.rebuild_ratio * len(self.positions)):
+            self.dirty = True
+        return self.dirty
+
+    def item_set(self, item_id, old_value, new_value):
+        """
+        This method moves item to the cell of new position
+        """
+        if self._count_change() is True:
+            return
+        if item_id in self.positions:
+            self._remove(item_id)
+        self._add(item_id, tuple(new_value))
+
+    def item_unset(self, item_id, old_value):
+        """
+        This method removes item from the grid
+        """
+        if self._count_change() is True:
+            return
+        if item_id in self.positions:
+            self._remove(item_id)
+
+    def _update(self):
+        """
+        This method rebuilds dirty grid and bounds of grid before query
+        """
+        if self.dirty is True:
+            self.rebuild()
+        if self.shrunk is True:
+            self._update_bounds()
+        self.changes = 0
+
+    def _distance2(self, position, point):
+        """
+        This method returns squared distance between two points
+        """
+        return sum((item1 - item2) ** 2 for item1, item2 in zip(position, point))
+
+    def box(self, min_corner, max_corner):
+        """
+        This method returns IDs of items inside the axis aligned box
+        """
+        self._update()
+        min_cell = self.cell(min_corner)
+        max_cell = self.cell(max_corner)
+        ranges = [range(low, high + 1) for low, high in zip(min_cell, max_cell)]
+        item_ids = []
+        # Iterate over cells in the box or over all occupied cells, when
+        # there are less occupied cells than cells in the box
+        cell_count = 1
+        for cell_range in ranges:
+            cell_count *= len(cell_range)
+        if cell_count < len(self.cells):
+            keys = (key for key in itertools.product(*ranges) if key in self.cells)
+        else:
+            keys = (key for key in self.cells
+                    if all(low <= item <= high for item, low, high in zip(key, min_cell, max_cell)))
+        for key in keys:
+            for item_id in self.cells[key]:
+                position = self.positions[item_id]
+                if all(low <= item <= high for item, low, high in zip(position, min_corner, max_corner)):
+                    item_ids.append(item_id)
+        return item_ids
+
+    def radius(self, center, radius):
+        """
+        This method returns IDs of items in the sphere with center and radius
+        """
+        min_corner = tuple(item - radius for item in center)
+        max_corner = tuple(item + radius for item in center)
+        radius2 = radius * radius
+        return [item_id for item_id in self.box(min_corner, max_corner)
+                if self._distance2(self.positions[item_id], center) <= radius2]
+
+    def _ring(self, center_cell, distance):
+        """
+        This method returns coordinates of cells in the distance
+        (Chebyshev distance measured in cells) from the center cell
+        """
+        ranges = [range(item - distance, item + distance + 1) for item in center_cell]
+        for key in itertools.product(*ranges):
+            if max(abs(item - center) for item, center in zip(key, center_cell)) == distance:
+                yield key
+
+    def nearest(self, point, count=1):
+        """
+        This method returns the list of IDs of count nearest items to the
+        point. The nearest item is first.
+        """
+        self._update()
+        if len(self.positions) == 0 or count <= 0:
+            return []
+        center_cell = self.cell(point)
+        # Max possible Chebyshev distance between point cell and occupied cell
+        max_distance = max(
+            max(center - low, high - center)
+            for center, low, high in zip(center_cell, self.min_cell, self.max_cell))
+        found = []
+        distance = 0
+        while distance <= max_distance:
+            # Scan all items, when the ring has more cells than occupied cells
+            if (2 * distance + 1) ** len(center_cell) > len(self.cells):
+                found = [(self._distance2(position, point), item_id)
+                         for item_id, position in self.positions.items()]
+                break
+            for key in self._ring(center_cell, distance):
+                for item_id in self.cells.get(key, ()):
+                    heapq.heappush(found, (self._distance2(self.positions[item_id], point), item_id))
+            # Items in further rings are at least in this distance from point
+            if len(found) >= count:
+                limit = distance * self.cell_size
+                kth = heapq.nsmallest(count, found)[-1][0]
+                if kth <= limit * limit:
+                    break
+            distance += 1
+        return [item_id for distance2, item_id in heapq.nsmallest(count, found)]
@@ -24,6 +24,7 @@ vector of values (2D, 3D or Quaternions).
 """
 
 
+import array
 from . import verse_entity
 
 
@@ -91,6 +92,20 @@ class VerseTag(verse_entity.VerseEntity):
     # custom_type, tg_custom_type and node_custom_type
     subclasses = {}
 
+    # When typed storage is enabled, then numeric values are stored in
+    # compact array instead of tuple of Python objects. Existing array
+    # is updated in place, when new value with same count is received.
+    # Tuple of value is created and cached only by getter of value.
+    # It could be enabled for single tag too, before its value is set.
+    typed_storage = False
+
+    # Mode of estimation of data_type, when data_type is not specified.
+    # Real values could be quantized to real_data_type, when error of
+    # all items of value is not bigger than max_quantization_error
+    data_type_mode = verse_entity.DATA_TYPE_WIDEST
+    real_data_type = None
+    max_quantization_error = 0.0
+
     def __new__(cls, *args, **kwargs):
         """
         Pre-constructor of new VerseTag. It can return subclass VerseTag
@@ -141,16 +156,23 @@ class VerseTag(verse_entity.VerseEntity):
         self.id = tag_id
 
         # If data type is not set, then try to estimate it. Only three
-        # Python data types are supported for Verse tags
+        # Python data types are supported for Verse tags. New values of
+        # tag with estimated data_type are checked.
+        self.estimated = False
         if data_type is None and value is None:
             raise TypeError("VerseTag value and VerseTag data_type are None")
         elif data_type is None:
             if issubclass(value.__class__, tuple):
-                # Set data_type with max possible precision
+                # Set data_type according mode of estimation
                 try:
-                    self.data_type = verse_entity.DATA_TYPE_DICT[type(value[0])]
+                    self.data_type = verse_entity.estimate_data_type(
+                        value,
+                        self.data_type_mode,
+                        self.real_data_type,
+                        self.max_quantization_error)
                 except KeyError:
                     raise TypeError("Unsupported data_type of VerseTag value: ", type(value[0]))
+                self.estimated = True
             else:
                 raise TypeError("VerseTag value is not tuple: ", type(value))
         else:
@@ -158,7 +180,13 @@ class VerseTag(verse_entity.VerseEntity):
             self.data_type = data_type
 
         # No need to do check of values and count of tuple items, because Verse module do this
-        self._value = value
+        self._value = None
+        # Tuple returned by getter of value stored in array
+        self._tuple = None
+        # Last sent or received value used for suppressing of unchanged
+        # values. It is stored only, when suppressing is enabled.
+        self._last_sent = None
+        self._store_value(value)
         if count is not None:
             self.count = count
         elif value is not None:
@@ -184,6 +212,12 @@ class VerseTag(verse_entity.VerseEntity):
                                 ' already exists in VerseTagGroup: ' +
                                 str(tg.id))
 
+        # Journal value of new tag, when session is not connected
+        session = self.tg.node.session
+        if tag_id is None and self._value is not None and \
+                session.outbox is not None and session.state != 'CONNECTED':
+            session.outbox.tag_set(self)
+
     def __str__(self):
         """
         String representation of VerseTag
@@ -206,30 +240,90 @@ class VerseTag(verse_entity.VerseEntity):
         # Change state and send destroy command to Verse server
         self._destroy()
 
-    @property
-    def value(self):
+    def _store_value(self, val):
         """
-        The value is property of VerseTag
+        This method stores value of tag. When typed storage is enabled,
+        then value is stored in array of corresponding data_type.
         """
-        return self._value
+        self._tuple = None
+        if val is not None and self.typed_storage is True:
+            try:
+                type_code = verse_entity.ARRAY_TYPE_CODES[self.data_type]
+            except KeyError:
+                # Strings are stored in tuple
+                pass
+            else:
+                # New array is created first, thus value with item out of
+                # range does not change existing array
+                new_buf = array.array(type_code, val)
+                buf = self._value
+                if isinstance(buf, array.array) and len(buf) == len(new_buf):
+                    # Update existing array in place
+                    buf[:] = new_buf
+                else:
+                    self._value = new_buf
+                return
+        self._value = val
 
-    @value.setter
-    def value(self, val):
+    def _send_value(self):
         """
-        The setter of value
+        This method sends current value of tag to Verse server. Value stored
+        in array is sent as temporary tuple, which is not cached.
         """
-        self._value = val
-        # Send value to Verse server
         if self.id is not None:
+            val = self._value
+            if isinstance(val, array.array):
+                val = tuple(val)
             self.tg.node.session.send_tag_set_values(
                 self.tg.node.prio,
                 self.tg.node.id,
                 self.tg.id,
                 self.id,
                 self.data_type,
-                self._value
+                val
             )
 
+    @property
+    def value(self):
+        """
+        The value is property of VerseTag
+        """
+        val = self._value
+        if isinstance(val, array.array):
+            # Tuple is created only once after each change of array
+            if self._tuple is None:
+                self._tuple = tuple(val)
+            return self._tuple
+        else:
+            return val
+
+    @value.setter
+    def value(self, val):
+        """
+        The setter of value. New value is checked at once, but in thread
+        safe session value is changed by the thread calling callback_update().
+        """
+        if self.estimated is True:
+            verse_entity.check_data_type(val, self.data_type, self.max_quantization_error)
+        self.tg.node.session.call_in_callback(self._set_value, val)
+
+    def _set_value(self, val):
+        """
+        This method stores new value and sends it to Verse server
+        """
+        session = self.tg.node.session
+        # Do not send value equal to last sent or received value, but new
+        # value is always stored locally
+        unchanged = self.id is not None and self._is_unchanged(session, self._last_sent, val)
+        self._store_value(val)
+        self._local_changed(session)
+        if unchanged is True:
+            session.suppress_cmd('tag_set_values')
+            return
+        self._last_sent = val if self._suppressing(session) is True else None
+        # Send value to Verse server
+        self._send_value()
+
     @value.deleter
     def value(self):
         """
@@ -238,6 +332,146 @@ class VerseTag(verse_entity.VerseEntity):
         # Send destroy command to Verse server
         self._send_destroy()
 
+    def as_array(self):
+        """
+        This method returns value of tag as array. When typed storage
+        is used, then no new object is allocated and returned array
+        should not be modified. TypeError is raised for string values.
+        """
+        val = self._value
+        if isinstance(val, array.array) or val is None:
+            return val
+        try:
+            type_code = verse_entity.ARRAY_TYPE_CODES[self.data_type]
+        except KeyError:
+            raise TypeError('Value of VerseTag with data_type: ' +
+                            str(self.data_type) +
+                            ' can not be returned as array')
+        return array.array(type_code, val)
+
+    def _get_item(self, index):
+        """
+        This method returns one item of value
+        """
+        try:
+            return self._value[index]
+        except (IndexError, TypeError):
+            return None
+
+    def _set_item(self, index, item):
+        """
+        This method changes one item of value and sends new value
+        to Verse server. When tag does not have any value yet, then
+        other items of new value are zeros. In thread safe session
+        item is changed by the thread calling callback_update().
+        """
+        if self.estimated is True:
+            verse_entity.check_data_type((item,), self.data_type, self.max_quantization_error)
+        self.tg.node.session.call_in_callback(self._store_item, index, item)
+
+    def _store_item(self, index, item):
+        """
+        This method stores one item of value and sends new value
+        """
+        session = self.tg.node.session
+        if isinstance(self._value, array.array):
+            self._value[index] = item
+            self._tuple = None
+        else:
+            if self._value is None:
+                val = [type(item)()] * self.count
+            else:
+                val = list(self._value)
+            val[index] = item
+            self._store_value(tuple(val))
+        self._last_sent = tuple(self._value) if self._suppressing(session) is True else None
+        self._local_changed(session)
+        self._send_value()
+
+    def _local_changed(self, session):
+        """
+        This method marks tag group of this tag as changed in snapshots and
+        it journals new value, when session is not connected
+        """
+        if session.snapshots is not None and self.id is not None:
+            session.snapshots.tag_group_changed(self.tg.node.id, self.tg.id)
+        if session.outbox is not None and session.state != 'CONNECTED':
+            session.outbox.tag_set(self)
+
+    @property
+    def x(self):
+        """
+        The getter of first item of value
+        """
+        return self._get_item(0)
+
+    @x.setter
+    def x(self, item):
+        """
+        The setter of first item of value
+        """
+        self._set_item(0, item)
+
+    @property
+    def y(self):
+        """
+        The getter of second item of value
+        """
+        return self._get_item(1)
+
+    @y.setter
+    def y(self, item):
+        """
+        The setter of second item of value
+        """
+        self._set_item(1, item)
+
+    @property
+    def z(self):
+        """
+        The getter of third item of value
+        """
+        return self._get_item(2)
+
+    @z.setter
+    def z(self, item):
+        """
+        The setter of third item of value
+        """
+        self._set_item(2, item)
+
+    @property
+    def w(self):
+        """
+        The getter of fourth item of value
+        """
+        return self._get_item(3)
+
+    @w.setter
+    def w(self, item):
+        """
+        The setter of fourth item of value
+        """
+        self._set_item(3, item)
+
+    def _create_dependency(self):
+        """
+        Tag could be created, when tag group is created
+        """
+        return self.tg
+
+    def _create_prio(self):
+        """
+        Priority of create command is priority of node
+        """
+        return self.tg.node.prio
+
+    def _schedule_create(self):
+        """
+        Create command is sent by scheduler of session
+        """
+        self.tg.node.session.create_scheduler.schedule(self)
+
     def _send_create(self):
         """
         Send tag create command to Verse server
@@ -269,11 +503,13 @@ class VerseTag(verse_entity.VerseEntity):
         This method try to clean content (value) of this tag
         """
         # Remove references on this tag from tag group
+        self.tg.node.session.create_scheduler.forget(self)
         if self.id is not None:
             self.tg.tags.pop(self.id)
         self.tg.tag_queue.pop(self.custom_type)
         # Remove value
         del self._value
+        self._tuple = None
 
     @classmethod
     def cb_receive_tag_create(cls, session, node_id, tg_id, tag_id, data_type, count, custom_type):
@@ -303,12 +539,13 @@ class VerseTag(verse_entity.VerseEntity):
             tag.id = tag_id
         # Update state
         tag.cb_receive_create()
+        session.create_scheduler.cb_receive_create(tag)
         # Send tag value, when it is tag created by this client
         # When this tag was created by some other Verse client,
         # then Verse server will send value, when received command
         # is acked to Verse server
         if tag._value is not None:
-            tag.value = tag._value
+            tag._send_value()
         # Return reference at tag object
         return tag
 
@@ -334,7 +571,8 @@ class VerseTag(verse_entity.VerseEntity):
         except KeyError:
             return
         # Set value, but don't send set_value command
-        tag._value = value
+        tag._store_value(value)
+        tag._last_sent = value if tag._suppressing(session) is True else None
         # Return reference at this tag
         return tag
 
@@ -110,7 +110,12 @@ class VerseTagGroup(verse_entity.VerseEntity):
 
         self.node = node
         self.id = tg_id
-        self.tags = {}
+        # Tags received from Verse server could be created, when they are accessed
+        lazy_store = self.node.session.lazy_store
+        if lazy_store is not None:
+            self.tags = verse_entity.VerseLazyDict(lazy_store, verse_entity.LAZY_TAG, self)
+        else:
+            self.tags = {}
         self.tag_queue = {}
 
         self._create()
@@ -140,6 +145,24 @@ class VerseTagGroup(verse_entity.VerseEntity):
             ', custom_type: ' + \
             str(self.custom_type)
 
+    def _create_dependency(self):
+        """
+        Tag group could be created, when node is created
+        """
+        return self.node
+
+    def _create_prio(self):
+        """
+        Priority of create command is priority of node
+        """
+        return self.node.prio
+
+    def _schedule_create(self):
+        """
+        Create command is sent by scheduler of session
+        """
+        self.node.session.create_scheduler.schedule(self)
+
     def _send_create(self):
         """
         Send tag group create command to Verse server
@@ -157,6 +180,18 @@ class VerseTagGroup(verse_entity.VerseEntity):
             self.node.session.send_taggroup_destroy(self.node.prio,
                                                     self.node.id, self.id)
 
+    def _auto_subscribe(self):
+        """
+        Tag group created from record of lazy store, which was already
+        subscribed, is not subscribed again
+        """
+        lazy_store = self.node.session.lazy_store
+        if lazy_store is not None and self.id is not None and \
+                lazy_store.is_subscribed(verse_entity.LAZY_TAG_GROUP, self.node.id, self.id) is True:
+            self.subscribed = True
+            return False
+        return True
+
     def subscribe(self):
         """
         This method tries to send tag group subscribe command
@@ -186,6 +221,7 @@ class VerseTagGroup(verse_entity.VerseEntity):
         This method clean all data from this tag group
         """
         # Remove references at all this taggroup
+        self.node.session.create_scheduler.forget(self)
         if self.id is not None:
             self.node.tag_groups.pop(self.id)
         self.node.tg_queue.pop(self.custom_type)
@@ -226,9 +262,7 @@ class VerseTagGroup(verse_entity.VerseEntity):
         tg.cb_receive_create()
 
         # Send tag_create commands for pending tags
-        for custom_type, tag in tg.tag_queue.items():
-            session.send_tag_create(node.prio, node.id, tg.id, tag.data_type,
-                                    tag.count, custom_type)
+        session.create_scheduler.cb_receive_create(tg)
         # Return reference at tag group object
         return tg
 
@@ -0,0 +1,136 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+"""
+This module includes class VerseLayerUpload that sends large amount of
+items of VerseLayer to Verse server in chunks. Only limited count of items
+is sent in each callback_update() of session. Thus other commands (e.g.
+changes of tags) are not queued behind the whole layer.
+"""
+
+
+import concurrent.futures
+from . import verse_entity
+
+
+class VerseLayerUpload(object):
+    """
+    Class representing streaming upload of items to the layer. Instance
+    of this class is created by VerseLayer.upload()
+    """
+
+    def __init__(self, layer, items, budget=10000, prio=None, on_progress=None):
+        """
+        Constructor of VerseLayerUpload. The items could be dictionary or
+        iterable of pairs (item ID and value). At most budget items is sent
+        in each update. When prio is None, then priority of node is used.
+        The on_progress is called with upload after each update.
+        """
+        self.layer = layer
+        try:
+            self.total = len(items)
+        except TypeError:
+            self.total = None
+        if isinstance(items, dict):
+            items = items.items()
+        self._items = iter(items)
+        self.budget = budget
+        self.prio = prio
+        self.on_progress = on_progress
+        self.sent = 0
+        self.future = concurrent.futures.Future()
+
+    def __str__(self):
+        """
+        String representation of VerseLayerUpload
+        """
+        return 'VerseLayerUpload, layer_id: ' + \
+            str(self.layer.id) + \
+            ', sent: ' + \
+            str(self.sent) + \
+            ', total: ' + \
+            str(self.total)
+
+    @property
+    def progress(self):
+        """
+        Getter of progress of upload (0.0 - 1.0). It returns None,
+        when count of items is not known
+        """
+        if self.future.done() is True and self.future.cancelled() is False:
+            return 1.0
+        if self.total is None:
+            return None
+        elif self.total == 0:
+            return 1.0
+        return float(self.sent) / self.total
+
+    @property
+    def done(self):
+        """
+        Getter of state of upload
+        """
+        return self.future.done()
+
+    def cancel(self):
+        """
+        This method stops upload. Items that were already sent are kept.
+        """
+        self.future.cancel()
+
+    def _finish(self):
+        """
+        This method removes upload from the list of uploads of session
+        """
+        try:
+            self.layer.node.session.uploads.remove(self)
+        except ValueError:
+            pass
+
+    def update(self):
+        """
+        This method sends next chunk of items. It is called in each
+        callback_update() of session.
+        """
+        if self.future.cancelled() is True or \
+                self.layer.state in (verse_entity.ENTITY_DESTROYING, verse_entity.ENTITY_DESTROYED):
+            self.future.cancel()
+            self._finish()
+            return
+        # Items are sent, when layer is created at Verse server
+        if self.layer.id is None:
+            return
+        node = self.layer.node
+        session = node.session
+        prio = self.prio if self.prio is not None else node.prio
+        count = 0
+        for item_id, value in self._items:
+            # Store value, but send it with priority of upload
+            self.layer.items._set_value(item_id, value, False)
+            session.send_layer_set_value(prio, node.id, self.layer.id, item_id, self.layer.data_type, value)
+            count += 1
+            if count >= self.budget:
+                break
+        self.sent += count
+        if count < self.budget:
+            self._finish()
+            if self.future.cancelled() is False:
+                self.future.set_result(self.sent)
+        if self.on_progress is not None:
+            self.on_progress(self)
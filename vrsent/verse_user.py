@@ -18,7 +18,12 @@
 
 
 """
-This module includes class VerseUser representing verse user
+This module includes class VerseUser representing verse user and mixin
+classes of specialized path of receiving of well-known system nodes (user,
+avatar and avatar info), their tag groups and tags. These entities are
+created only by Verse server and class of entity is already resolved by
+session. Thus resolution of subclass in __new__() and scheduling of create
+commands are skipped.
 """
 
 import verse as vrs
@@ -30,7 +35,73 @@ TG_INFO_CT = 0
 TAG_USERNAME_CT = 0
 
 
-class UserNameTag(verse_tag.VerseTag):
+class SystemNode(object):
+    """
+    Mixin class of VerseNode subclasses of system nodes
+    """
+
+    @classmethod
+    def cb_receive_node_create(cls, session, node_id, parent_id, user_id, custom_type):
+        """
+        This method creates node of this class received from Verse server
+        """
+        if node_id in session.nodes or \
+                (parent_id == session.avatar_id and user_id == session.user_id):
+            return super(SystemNode, cls).cb_receive_node_create(session, node_id, parent_id, user_id, custom_type)
+        node = object.__new__(cls)
+        node.__init__(
+            session=session,
+            node_id=node_id,
+            parent=session.nodes.get(parent_id),
+            user_id=user_id,
+            custom_type=custom_type)
+        node.cb_receive_create()
+        return node
+
+
+class SystemTagGroup(object):
+    """
+    Mixin class of VerseTagGroup subclasses of tag groups of system nodes
+    """
+
+    @classmethod
+    def cb_receive_tg_create(cls, session, node_id, tg_id, custom_type):
+        """
+        This method creates tag group of this class received from Verse server
+        """
+        node = session.nodes.get(node_id)
+        if node is None or custom_type in node.tg_queue:
+            return super(SystemTagGroup, cls).cb_receive_tg_create(session, node_id, tg_id, custom_type)
+        tg = object.__new__(cls)
+        tg.__init__(node, tg_id=tg_id, custom_type=custom_type)
+        tg.cb_receive_create()
+        return tg
+
+
+class SystemTag(object):
+    """
+    Mixin class of VerseTag subclasses of tags of system nodes
+    """
+
+    @classmethod
+    def cb_receive_tag_create(cls, session, node_id, tg_id, tag_id, data_type, count, custom_type):
+        """
+        This method creates tag of this class received from Verse server
+        """
+        try:
+            tg = session.nodes[node_id].tag_groups[tg_id]
+        except KeyError:
+            tg = None
+        if tg is None or custom_type in tg.tag_queue:
+            return super(SystemTag, cls).cb_receive_tag_create(
+                session, node_id, tg_id, tag_id, data_type, count, custom_type)
+        tag = object.__new__(cls)
+        tag.__init__(tg, tag_id=tag_id, data_type=data_type, count=count, custom_type=custom_type)
+        tag.cb_receive_create()
+        return tag
+
+
+class UserNameTag(SystemTag, verse_tag.VerseTag):
     """
     Custom VerseTag subclass used for storing username
     """
@@ -52,10 +123,55 @@ class UserNameTag(verse_tag.VerseTag):
             custom_type=custom_type,
             value=value)
 
+    @classmethod
+    def cb_receive_tag_set_values(cls, session, node_id, tg_id, tag_id, value):
+        """
+        This method stores received name of user in the presence
+        directory of session
+        """
+        tag = super(UserNameTag, cls).cb_receive_tag_set_values(session, node_id, tg_id, tag_id, value)
+        if tag is not None:
+            session.presence.set_username(node_id, value[0])
+        return tag
+
+    @classmethod
+    def cb_receive_tag_create(cls, session, node_id, tg_id, tag_id, data_type, count, custom_type):
+        """
+        This method adds reference at received tag to the info tag group
+        """
+        tag = super(UserNameTag, cls).cb_receive_tag_create(
+            session, node_id, tg_id, tag_id, data_type, count, custom_type)
+        if tag is not None:
+            tag.tg.tag_name = tag
+        return tag
+
+
+class UserInfoTagGroup(SystemTagGroup, verse_tag_group.VerseTagGroup):
+    """
+    VerseTagGroup subclass of tag group with information about user
+    """
+
+    custom_type = TG_INFO_CT
+    node_custom_type = vrs.USER_NODE_CT
+
+    @classmethod
+    def cb_receive_tg_create(cls, session, node_id, tg_id, custom_type):
+        """
+        This method adds reference at received tag group to the user node
+        """
+        tg = super(UserInfoTagGroup, cls).cb_receive_tg_create(session, node_id, tg_id, custom_type)
+        if tg is not None:
+            tg.node._tg_info = tg
+        return tg
 
-class VerseUser(verse_node.VerseNode):
+
+class VerseUser(SystemNode, verse_node.VerseNode):
     """
-    A VerseUser is class representing user
+    A VerseUser is class representing user. The tag group with username is
+    not created by client, but it is received from Verse server. Thus the
+    tag group is None until it is received and the property name returns
+    empty string until username is stored in the presence directory of
+    session (session.presence).
     """
 
     custom_type = vrs.USER_NODE_CT
@@ -68,12 +184,9 @@ class VerseUser(verse_node.VerseNode):
         # Call parent init method
         super(VerseUser, self).__init__(*args, **kwargs)
 
-        # Create tag group and tag due to specification
-        self._tg_info = verse_tag_group.VerseTagGroup(
-            node=self,
-            custom_type=TG_INFO_CT
-        )
-        self._tg_info.tag_name = UserNameTag(tg=self._tg_info)
+        # Tag group and tag are created by Verse server. They are
+        # bound to this node, when they are received
+        self._tg_info = None
 
         # Add this verse user to the dictionary of users
         self.session.users[self.id] = self
@@ -92,15 +205,7 @@ class VerseUser(verse_node.VerseNode):
         """
         The name is property of VerseUser
         """
-        try:
-            name = self._tg_info.tag_name.value
-        except AttributeError:
-            return ""
-        else:
-            try:
-                return name[0]
-            except TypeError:
-                return ""
+        return self.session.presence.usernames.get(self.id, "")
 
     @classmethod
     def cb_receive_node_destroy(cls, session, node_id):
@@ -111,4 +216,5 @@ class VerseUser(verse_node.VerseNode):
         # Remove verse user from the dictionary of users
         if node_id in session.users:
             del session.users[node_id]
+        session.presence.remove_user(node_id)
         return super(VerseUser, cls).cb_receive_node_destroy(session, node_id)